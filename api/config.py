@@ -1,4 +1,5 @@
 from datetime import timedelta
+from pathlib import Path
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,10 +11,98 @@ class Settings(BaseSettings):
     ALBERT_AI_API_KEY: str
     ALBERT_AI_EMBEDDINGS_MODEL: str
     ALBERT_AI_LLM_MODEL: str
+
+    # Albert AI HTTP client settings
+    ALBERT_AI_HTTP2: bool = True
+    ALBERT_AI_MAX_CONNECTIONS: int = 100
+    ALBERT_AI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    ALBERT_AI_KEEPALIVE_EXPIRY: float = 30.0
+    ALBERT_AI_CONNECT_TIMEOUT: float = 5.0
+    ALBERT_AI_READ_TIMEOUT: float = 120.0
+    ALBERT_AI_POOL_TIMEOUT: float = 10.0
+
+    # Albert AI retries, circuit breaker and hedging
+    ALBERT_AI_RETRY_ATTEMPTS: int = 3
+    ALBERT_AI_RETRY_BASE_DELAY: float = 0.2
+    ALBERT_AI_RETRY_MAX_DELAY: float = 5.0
+    ALBERT_AI_RETRY_AFTER_MAX: float = 30.0
+    ALBERT_AI_BREAKER_FAILURES: int = 5
+    ALBERT_AI_BREAKER_RESET_SECONDS: float = 30.0
+    ALBERT_AI_HEDGE_SEARCH: bool = True
+
+    # Albert AI adaptive concurrency limits (per endpoint class: chat, search, files, other)
+    ALBERT_AI_LIMIT_INITIAL: int = 10
+    ALBERT_AI_LIMIT_MIN: int = 2
+    ALBERT_AI_LIMIT_MAX: int = 80
+    ALBERT_AI_FILES_LIMIT_MAX: int = 10
+    ALBERT_AI_LIMIT_QUEUE_SIZE: int = 200
+    ALBERT_AI_LIMIT_MAX_WAIT: float = 10.0
+
+    # Distinct assistants given their own label in Albert AI metrics (others: "other")
+    ALBERT_METRICS_MAX_ASSISTANTS: int = 50
+
+    # Quotas (0 disables a limit) and how often usage counters are flushed to the database
+    QUOTA_USER_REQUESTS_PER_MINUTE: int = 20
+    QUOTA_USER_TOKENS_PER_DAY: int = 200000
+    QUOTA_ASSISTANT_REQUESTS_PER_MINUTE: int = 120
+    QUOTA_ASSISTANT_TOKENS_PER_DAY: int = 2000000
+    QUOTA_FLUSH_INTERVAL_SECONDS: float = 10.0
+
+    # Search result cache
+    SEARCH_CACHE_MAX_ENTRIES: int = 1024
+    SEARCH_CACHE_TTL_SECONDS: float = 300.0
+
+    # Chat prompt window
+    CHAT_CONTEXT_TOKEN_BUDGET: int = 6000
+    CHAT_HISTORY_MAX_MESSAGES: int = 30
+    CHAT_HISTORY_TOKEN_SHARE: float = 0.4
+    CHAT_SUMMARY_REFRESH_EVERY: int = 10
+
+    # Retrieved context selection
+    CONTEXT_CANDIDATES: int = 12
+    CONTEXT_MAX_CHUNKS: int = 8
+
+    # Batch queries: items per request and items processed at once
+    BATCH_MAX_ITEMS: int = 50
+    BATCH_CONCURRENCY: int = 4
+
+    # Bulk uploads: files per request (after expanding zip archives), extracted
+    # archive size and rows per commit (ingestion runs on the job queue)
+    BULK_UPLOAD_MAX_FILES: int = 500
+    BULK_UPLOAD_MAX_EXTRACTED_BYTES: int = 1024 * 1024 * 1024
+    BULK_UPLOAD_COMMIT_SIZE: int = 50
+
+    # Ingestion job queue: worker coroutines per API process (0 to run them
+    # with `python -m worker` only), files ingested at once per assistant,
+    # attempts before a file is marked failed, retry backoff, how long a
+    # claimed job may run before another worker takes it over and how long
+    # finished jobs are kept
+    INGESTION_WORKERS: int = 2
+    INGESTION_MAX_PER_ASSISTANT: int = 2
+    INGESTION_MAX_ATTEMPTS: int = 5
+    INGESTION_RETRY_BASE_SECONDS: float = 5.0
+    INGESTION_RETRY_MAX_SECONDS: float = 300.0
+    INGESTION_JOB_TIMEOUT_SECONDS: float = 600.0
+    INGESTION_POLL_INTERVAL_SECONDS: float = 2.0
+    INGESTION_JOB_RETENTION_SECONDS: float = 7 * 86400.0
+
+    # Reconciliation of files with Albert AI documents: run interval (0 disables),
+    # maximum age of a "nothing changed" skip, collections processed at once,
+    # documents per listing page, repairs per commit and the age below which
+    # an unreferenced document may still be an upload in progress
+    RECONCILE_INTERVAL_SECONDS: float = 3600.0
+    RECONCILE_FULL_INTERVAL_SECONDS: float = 86400.0
+    RECONCILE_CONCURRENCY: int = 2
+    RECONCILE_PAGE_SIZE: int = 100
+    RECONCILE_BATCH_SIZE: int = 50
+    RECONCILE_ORPHAN_GRACE_SECONDS: float = 3600.0
     
     # Application settings
     DEBUG: bool = True
     API_V1_PREFIX: str = "/api/v1"
+    UPLOAD_DIR: str = str(Path(__file__).parent / "uploads")
+    # Largest accepted file (uploads and zip archive members)
+    UPLOAD_MAX_FILE_BYTES: int = 50 * 1024 * 1024
     
     # JWT Settings
     SECRET_KEY: str
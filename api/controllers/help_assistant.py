@@ -9,6 +9,7 @@ from models.help_assistant import (
     ToneType
 )
 from fastapi import HTTPException
+from services.welcome_service import WelcomeMessageService
 from utils.exceptions import UserNotFoundException, EmailAlreadyExistsException
 import logging
 
@@ -31,6 +32,9 @@ class HelpAssistantController:
         db.add(db_help_assistant)
         await db.commit()
         await db.refresh(db_help_assistant)
+
+        # Tone-adjusted welcome message is generated off the request path
+        WelcomeMessageService.schedule(db_help_assistant)
         return db_help_assistant
 
     @staticmethod
@@ -103,6 +107,9 @@ class HelpAssistantController:
             await db.commit()
             await db.refresh(db_help_assistant)
             logger.info("Successfully updated help assistant")
+
+            # Only regenerates when operator_name, name, mission or tone changed
+            WelcomeMessageService.schedule(db_help_assistant)
             return db_help_assistant
         except Exception as e:
             logger.error(f"Error updating help assistant: {e}", exc_info=True)
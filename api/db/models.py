@@ -42,6 +42,9 @@ class HelpAssistant(Base):
     message = Column(String)
     response = Column(String)
     tone = Column(String, nullable=False, default="PROFESSIONAL") 
+    welcome_message = Column(String, nullable=True)  # Tone-adjusted welcome, precomputed in background
+    welcome_fingerprint = Column(String, nullable=True)  # Hash of the fields welcome_message was built from
+    retrieval_method = Column(String, nullable=False, default="SEMANTIC", server_default="SEMANTIC")  # SEMANTIC, LEXICAL or HYBRID
 
     # Update relationship definition
     collection = relationship("Collection", back_populates="help_assistant", uselist=False)
@@ -70,6 +73,9 @@ class AssistantFile(Base):
     help_assistant_id = Column(Integer, ForeignKey("help_assistant.id", ondelete="CASCADE"))
     assistant_collection_id = Column(String, nullable=True)
     albert_ai_id = Column(String, nullable=True)
+    sha256 = Column(String, nullable=True, index=True)  # Hash of the stored file
+    status = Column(String, nullable=False, default="pending")  # pending, indexing, ready or failed
+    error = Column(String, nullable=True)  # Last ingestion error
 
 class Collection(Base):
     __tablename__ = "collections"
@@ -0,0 +1,6 @@
+import uvicorn
+
+from fake_albert.app import settings
+
+if __name__ == "__main__":
+    uvicorn.run("fake_albert.app:app", host=settings.HOST, port=settings.PORT)
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from fake_albert.settings import FakeAlbertSettings
+from fake_albert.store import CollectionStore
+
+settings = FakeAlbertSettings()
+store = CollectionStore()
+
+app = FastAPI(title="Fake Albert AI", description="Local stand-in for the Albert AI API, for offline runs and load tests")
+
+_in_flight = 0
+
+
+async def simulate_latency(median_ms: float):
+    """Sleep for a log-normally distributed time around median_ms"""
+    if median_ms <= 0:
+        return
+    delay = median_ms / 1000 * math.exp(random.gauss(0, settings.LATENCY_SIGMA)) if settings.LATENCY_SIGMA > 0 else median_ms / 1000
+    await asyncio.sleep(delay)
+
+
+def count_tokens(text: str) -> int:
+    return max(len(text.split()), math.ceil(len(text) / 4)) if text else 0
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    """Concurrency cap, 429 and 500 injection for the /v1 API"""
+    global _in_flight
+    if not request.url.path.startswith("/v1/"):
+        return await call_next(request)
+
+    if settings.MAX_CONCURRENCY and _in_flight >= settings.MAX_CONCURRENCY:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many concurrent requests"},
+            headers={"Retry-After": str(settings.RETRY_AFTER_SECONDS)}
+        )
+    roll = random.random()
+    if roll < settings.RATE_LIMIT_RATE:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Rate limit exceeded"},
+            headers={"Retry-After": str(settings.RETRY_AFTER_SECONDS)}
+        )
+    if roll < settings.RATE_LIMIT_RATE + settings.ERROR_RATE:
+        return JSONResponse(status_code=500, content={"detail": "Injected failure"})
+
+    _in_flight += 1
+    try:
+        return await call_next(request)
+    finally:
+        _in_flight -= 1
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "in_flight": _in_flight}
+
+
+@app.get("/_config")
+async def get_config():
+    return settings.model_dump()
+
+
+@app.put("/_config")
+async def update_config(changes: Dict[str, Any]):
+    """Change latencies, rates or faults at runtime, e.g. in the middle of a load test"""
+    unknown = set(changes) - set(FakeAlbertSettings.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown settings: {sorted(unknown)}")
+    for name, value in changes.items():
+        setattr(settings, name, type(getattr(settings, name))(value))
+    return settings.model_dump()
+
+
+@app.get("/v1/models")
+async def list_models():
+    await simulate_latency(settings.DEFAULT_LATENCY_MS)
+    return {
+        "object": "list",
+        "data": [
+            {"id": settings.LLM_MODEL, "object": "model", "type": "text-generation", "owned_by": "fake-albert"},
+            {"id": settings.EMBEDDINGS_MODEL, "object": "model", "type": "text-embeddings-inference", "owned_by": "fake-albert"},
+        ]
+    }
+
+
+@app.get("/v1/collections")
+async def list_collections():
+    await simulate_latency(settings.DEFAULT_LATENCY_MS)
+    return {"object": "list", "data": store.list_collections()}
+
+
+@app.post("/v1/collections")
+async def create_collection(body: Dict[str, Any]):
+    await simulate_latency(settings.DEFAULT_LATENCY_MS)
+    collection = store.create_collection(body.get("name", ""), body.get("model", settings.EMBEDDINGS_MODEL))
+    return {"id": collection["id"]}
+
+
+@app.delete("/v1/collections/{collection_id}")
+async def delete_collection(collection_id: str):
+    await simulate_latency(settings.DEFAULT_LATENCY_MS)
+    if not store.delete_collection(collection_id):
+        raise HTTPException(status_code=404, detail="Collection not found")
+    return {}
+
+
+@app.post("/v1/files", status_code=201)
+async def upload_file(file: UploadFile = File(...), request: str = Form(...)):
+    collection_id = json.loads(request).get("collection")
+    if store.get_collection(collection_id) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    content = await file.read()
+    await simulate_latency(settings.FILES_LATENCY_MS)
+    document = store.add_document(collection_id, file.filename, content)
+    return {"id": document["id"]}
+
+
+@app.get("/v1/documents/{collection_id}")
+async def get_documents(collection_id: str, limit: Optional[int] = None, offset: int = 0):
+    await simulate_latency(settings.DEFAULT_LATENCY_MS)
+    if store.get_collection(collection_id) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    return {"object": "list", "data": store.list_documents(collection_id, limit, offset)}
+
+
+@app.delete("/v1/documents/{collection_id}/{document_id}")
+async def delete_document(collection_id: str, document_id: str):
+    await simulate_latency(settings.DEFAULT_LATENCY_MS)
+    if not store.delete_document(collection_id, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {}
+
+
+@app.post("/v1/search")
+async def search(body: Dict[str, Any]):
+    collection_ids = body.get("collections") or []
+    missing = [c for c in collection_ids if store.get_collection(c) is None]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Collection not found: {missing[0]}")
+    await simulate_latency(settings.SEARCH_LATENCY_MS)
+    return {"object": "list", "data": store.search(collection_ids, body.get("prompt", ""), int(body.get("k", 6)))}
+
+
+def _answer_words(messages: List[Dict[str, str]]) -> List[str]:
+    """Deterministic filler answer built from the words of the last user message"""
+    question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    source = question.split() or ["réponse"]
+    words = ["Réponse", "simulée", ":"]
+    while len(words) < settings.COMPLETION_WORDS:
+        words.append(source[len(words) % len(source)])
+    return words[:max(settings.COMPLETION_WORDS, 1)]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    messages = body.get("messages") or []
+    model = body.get("model") or settings.LLM_MODEL
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    words = _answer_words(messages)
+    usage = {
+        "prompt_tokens": sum(count_tokens(m.get("content", "")) for m in messages),
+        "completion_tokens": len(words),
+    }
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    token_delay = 1 / settings.TOKENS_PER_SECOND if settings.TOKENS_PER_SECOND > 0 else 0
+
+    await simulate_latency(settings.CHAT_LATENCY_MS)
+
+    if not body.get("stream"):
+        await asyncio.sleep(len(words) * token_delay)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    async def events():
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else f" {word}"}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(token_delay)
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
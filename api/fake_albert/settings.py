@@ -0,0 +1,36 @@
+from pydantic_settings import BaseSettings
+
+
+class FakeAlbertSettings(BaseSettings):
+    """Behaviour of the fake Albert AI server, from FAKE_ALBERT_* environment variables.
+
+    Latencies are log-normal: the median is in milliseconds and sigma spreads
+    the tail (0 makes every call take exactly the median).
+    """
+
+    HOST: str = "0.0.0.0"
+    PORT: int = 8090
+
+    LLM_MODEL: str = "fake-llm"
+    EMBEDDINGS_MODEL: str = "fake-embeddings"
+
+    # Latency before a response (or the first streamed token) per endpoint
+    CHAT_LATENCY_MS: float = 400.0
+    SEARCH_LATENCY_MS: float = 80.0
+    FILES_LATENCY_MS: float = 300.0
+    DEFAULT_LATENCY_MS: float = 20.0
+    LATENCY_SIGMA: float = 0.5
+
+    # Generated answers: length in words and streaming speed
+    COMPLETION_WORDS: int = 120
+    TOKENS_PER_SECOND: float = 40.0
+
+    # Fault injection: share of requests answered 500 or 429, and the Retry-After of a 429
+    ERROR_RATE: float = 0.0
+    RATE_LIMIT_RATE: float = 0.0
+    RETRY_AFTER_SECONDS: int = 1
+    # Requests beyond this many in flight are answered 429 (0: unlimited)
+    MAX_CONCURRENCY: int = 0
+
+    class Config:
+        env_prefix = "FAKE_ALBERT_"
@@ -0,0 +1,152 @@
+import io
+import math
+import re
+import unicodedata
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pypdf import PdfReader
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+CHUNK_WORDS = 200
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text.lower())
+
+
+def extract_text(filename: str, content: bytes) -> str:
+    if filename.lower().endswith(".pdf"):
+        try:
+            reader = PdfReader(io.BytesIO(content))
+            return "\n".join(page.extract_text() or "" for page in reader.pages)
+        except Exception:
+            return ""
+    return content.decode("utf-8", errors="replace")
+
+
+class CollectionStore:
+    """In-memory collections, documents and chunks.
+
+    Search scores chunks by TF-IDF overlap with the query whatever the
+    requested method; the point is plausible, deterministic results, not
+    retrieval quality.
+    """
+
+    def __init__(self):
+        self.collections: Dict[str, Dict[str, Any]] = {}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+
+    def create_collection(self, name: str, model: str) -> Dict[str, Any]:
+        collection_id = str(uuid.uuid4())
+        self.collections[collection_id] = {
+            "id": collection_id,
+            "name": name,
+            "model": model,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        return self.collections[collection_id]
+
+    def delete_collection(self, collection_id: str) -> bool:
+        if self.collections.pop(collection_id, None) is None:
+            return False
+        for document_id in [d["id"] for d in self.documents.values() if d["collection"] == collection_id]:
+            del self.documents[document_id]
+        return True
+
+    def add_document(self, collection_id: str, filename: str, content: bytes) -> Dict[str, Any]:
+        words = extract_text(filename, content).split()
+        chunks = [
+            " ".join(words[start:start + CHUNK_WORDS])
+            for start in range(0, len(words), CHUNK_WORDS)
+        ]
+        document_id = str(uuid.uuid4())
+        self.documents[document_id] = {
+            "id": document_id,
+            "name": filename,
+            "collection": collection_id,
+            "created_at": datetime.utcnow().isoformat(),
+            "chunks": [
+                {"id": f"{document_id}-{i}", "content": chunk, "terms": Counter(tokenize(chunk))}
+                for i, chunk in enumerate(chunks)
+            ],
+        }
+        return self.documents[document_id]
+
+    def list_documents(self, collection_id: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        documents = [
+            {
+                "id": d["id"],
+                "name": d["name"],
+                "collection_id": collection_id,
+                "created_at": d["created_at"],
+                "chunks": len(d["chunks"]),
+            }
+            for d in self.documents.values()
+            if d["collection"] == collection_id
+        ]
+        end = None if limit is None else offset + limit
+        return documents[offset:end]
+
+    def list_collections(self) -> List[Dict[str, Any]]:
+        counts = Counter(d["collection"] for d in self.documents.values())
+        return [
+            {**collection, "object": "collection", "documents": counts.get(collection_id, 0)}
+            for collection_id, collection in self.collections.items()
+        ]
+
+    def delete_document(self, collection_id: str, document_id: str) -> bool:
+        document = self.documents.get(document_id)
+        if document is None or document["collection"] != collection_id:
+            return False
+        del self.documents[document_id]
+        return True
+
+    def search(self, collection_ids: List[str], prompt: str, k: int) -> List[Dict[str, Any]]:
+        candidates = [
+            (document, chunk)
+            for document in self.documents.values()
+            if document["collection"] in collection_ids
+            for chunk in document["chunks"]
+        ]
+        if not candidates:
+            return []
+
+        query_terms = set(tokenize(prompt))
+        document_frequency = Counter(
+            term for _, chunk in candidates for term in query_terms if term in chunk["terms"]
+        )
+        results = []
+        for document, chunk in candidates:
+            score = sum(
+                (1 + math.log(chunk["terms"][term])) * math.log(1 + len(candidates) / document_frequency[term])
+                for term in query_terms
+                if term in chunk["terms"]
+            )
+            results.append((score, document, chunk))
+        results.sort(key=lambda result: result[0], reverse=True)
+        top = results[0][0] or 1.0
+
+        return [
+            {
+                "score": round(score / top, 4),
+                "chunk": {
+                    "id": chunk["id"],
+                    "content": chunk["content"],
+                    "metadata": {
+                        "document_id": document["id"],
+                        "document_name": document["name"],
+                        "collection_id": document["collection"],
+                    },
+                },
+            }
+            for score, document, chunk in results[:k]
+        ]
+
+    def get_collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        return self.collections.get(collection_id)
@@ -0,0 +1,87 @@
+"""
+Load test the chat flow end to end.
+
+    python -m loadtest --users 50 --duration 120 --ramp 30 --output run.json
+    python -m loadtest --users 50 --duration 120 --ramp 30 --output new.json --compare run.json
+
+Each virtual user signs up, logs in, creates an assistant, uploads the given
+files, then holds conversations until the duration has elapsed. The JSON report
+has throughput, error rates and p50/p95/p99 latency per stage and endpoint;
+--compare prints the change against a previous report and exits with status 1
+on regressions. Run it against the fake Albert server to avoid using quota.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from loadtest.report import build_report, compare_reports, load_report
+from loadtest.runner import LoadTestConfig, run_load_test
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="End-to-end chat load test")
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1", help="API base URL")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of steady load after the ramp")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which users start")
+    parser.add_argument("--turns", type=int, default=5, help="Messages per conversation")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between messages")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming message endpoint")
+    parser.add_argument("--file", dest="files", action="append", default=[], help="File to upload to each assistant (repeatable)")
+    parser.add_argument("--questions", help="Text file with one question per line")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, help="Random seed for questions and think time")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument("--latency-threshold", type=float, default=0.10, help="Relative p95/p99 increase counted as a regression")
+    parser.add_argument("--error-threshold", type=float, default=0.01, help="Absolute error rate increase counted as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    config = LoadTestConfig(
+        base_url=args.base_url.rstrip("/"),
+        users=args.users,
+        duration=args.duration,
+        ramp=args.ramp,
+        turns=args.turns,
+        think_time=args.think_time,
+        stream=args.stream,
+        files=args.files,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            config.questions = [line.strip() for line in f if line.strip()]
+
+    recorder = asyncio.run(run_load_test(config))
+    report = build_report(recorder, config.describe())
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        summary = report["summary"]
+        print(
+            f"{summary['requests']} requests, {summary['throughput_rps']} req/s, "
+            f"{summary['turns_per_second']} turns/s, error rate {summary['error_rate'] * 100:.2f}% -> {args.output}",
+            file=sys.stderr
+        )
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        lines, regressions = compare_reports(
+            load_report(args.compare), report, args.latency_threshold, args.error_threshold
+        )
+        print("\n".join(lines), file=sys.stderr)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
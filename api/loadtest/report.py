@@ -0,0 +1,155 @@
+import json
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+REPORT_FORMAT_VERSION = 1
+
+
+@dataclass
+class Sample:
+    stage: str
+    endpoint: str
+    duration: float
+    ok: bool
+    status: Optional[int]
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(max(math.ceil(q * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+
+class Recorder:
+    """Collects one sample per timed request or stage"""
+
+    def __init__(self):
+        self.samples: List[Sample] = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.sessions_completed = 0
+        self.turns_completed = 0
+
+    def record(self, stage: str, endpoint: str, duration: float, ok: bool, status: Optional[int] = None):
+        self.samples.append(Sample(stage, endpoint, duration, ok, status))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+
+def build_report(recorder: Recorder, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Summarize samples into a machine-readable report.
+
+    Latencies are in milliseconds; each "stage endpoint" key has its count,
+    throughput, error rate and latency percentiles.
+    """
+    elapsed = recorder.elapsed()
+    groups: Dict[Tuple[str, str], List[Sample]] = defaultdict(list)
+    for sample in recorder.samples:
+        groups[(sample.stage, sample.endpoint)].append(sample)
+
+    endpoints = {}
+    for (stage, endpoint), samples in sorted(groups.items()):
+        durations = sorted(s.duration * 1000 for s in samples)
+        errors = sum(1 for s in samples if not s.ok)
+        statuses: Dict[str, int] = defaultdict(int)
+        for s in samples:
+            statuses[str(s.status) if s.status is not None else "error"] += 1
+        endpoints[f"{stage} {endpoint}"] = {
+            "stage": stage,
+            "endpoint": endpoint,
+            "count": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4),
+            "throughput_rps": round(len(samples) / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(durations, 0.50), 1),
+                "p95": round(percentile(durations, 0.95), 1),
+                "p99": round(percentile(durations, 0.99), 1),
+                "mean": round(sum(durations) / len(durations), 1),
+                "max": round(durations[-1], 1),
+            },
+            "statuses": dict(statuses),
+        }
+
+    requests = [s for s in recorder.samples if s.status is not None or not s.ok]
+    errors = sum(1 for s in requests if not s.ok)
+    return {
+        "format_version": REPORT_FORMAT_VERSION,
+        "started_at": recorder.started_at,
+        "duration_s": round(elapsed, 2),
+        "config": config,
+        "summary": {
+            "requests": len(requests),
+            "errors": errors,
+            "error_rate": round(errors / len(requests), 4) if requests else 0.0,
+            "throughput_rps": round(len(requests) / elapsed, 3) if elapsed > 0 else 0.0,
+            "sessions_completed": recorder.sessions_completed,
+            "turns_completed": recorder.turns_completed,
+            "turns_per_second": round(recorder.turns_completed / elapsed, 3) if elapsed > 0 else 0.0,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    latency_threshold: float = 0.10,
+    error_threshold: float = 0.01
+) -> Tuple[List[str], List[str]]:
+    """
+    Compare a run against a baseline report.
+
+    A key regresses when its p95 or p99 grows by more than latency_threshold
+    (relative) or its error rate grows by more than error_threshold (absolute).
+
+    Returns:
+        (table lines, regression descriptions)
+    """
+    lines = [f"{'stage endpoint':<55} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'errors':>14}"]
+    regressions = []
+
+    def cell(before: float, after: float) -> str:
+        change = (after - before) / before * 100 if before else 0.0
+        return f"{after:>8.1f} {change:+6.1f}%"
+
+    for key in sorted(set(baseline["endpoints"]) | set(current["endpoints"])):
+        before = baseline["endpoints"].get(key)
+        after = current["endpoints"].get(key)
+        if before is None or after is None:
+            lines.append(f"{key:<55} {'only in ' + ('current' if before is None else 'baseline'):>16}")
+            continue
+
+        b, a = before["latency_ms"], after["latency_ms"]
+        lines.append(
+            f"{key:<55} {cell(b['p50'], a['p50']):>16} {cell(b['p95'], a['p95']):>16} {cell(b['p99'], a['p99']):>16} "
+            f"{after['error_rate'] * 100:>6.2f}% ({(after['error_rate'] - before['error_rate']) * 100:+.2f})"
+        )
+        for q in ("p95", "p99"):
+            if b[q] and (a[q] - b[q]) / b[q] > latency_threshold:
+                regressions.append(f"{key}: {q} {b[q]:.1f} ms -> {a[q]:.1f} ms")
+        if after["error_rate"] - before["error_rate"] > error_threshold:
+            regressions.append(
+                f"{key}: error rate {before['error_rate'] * 100:.2f}% -> {after['error_rate'] * 100:.2f}%"
+            )
+
+    b_sum, a_sum = baseline["summary"], current["summary"]
+    lines.append(
+        f"turns/s {b_sum['turns_per_second']:.3f} -> {a_sum['turns_per_second']:.3f}, "
+        f"requests/s {b_sum['throughput_rps']:.3f} -> {a_sum['throughput_rps']:.3f}"
+    )
+    return lines, regressions
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    if report.get("format_version") != REPORT_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported report format {report.get('format_version')}")
+    return report
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from loadtest.report import Recorder
+
+DEFAULT_QUESTIONS = [
+    "Comment faire une demande de carte d'identité ?",
+    "Quels documents dois-je fournir pour mon dossier ?",
+    "Quel est le délai de traitement d'une demande ?",
+    "Puis-je faire la démarche en ligne ?",
+    "Combien coûte cette démarche ?",
+    "Que faire si ma demande est refusée ?",
+]
+
+
+@dataclass
+class LoadTestConfig:
+    base_url: str = "http://localhost:8000/api/v1"
+    users: int = 10
+    duration: float = 60.0
+    ramp: float = 10.0
+    turns: int = 5
+    think_time: float = 2.0
+    stream: bool = False
+    files: List[str] = field(default_factory=list)
+    questions: List[str] = field(default_factory=lambda: list(DEFAULT_QUESTIONS))
+    timeout: float = 120.0
+    seed: Optional[int] = None
+
+    def describe(self) -> Dict[str, Any]:
+        """Settings recorded in the report (questions are summarized)"""
+        return {
+            "base_url": self.base_url,
+            "users": self.users,
+            "duration": self.duration,
+            "ramp": self.ramp,
+            "turns": self.turns,
+            "think_time": self.think_time,
+            "stream": self.stream,
+            "files": [os.path.basename(path) for path in self.files],
+            "questions": len(self.questions),
+            "seed": self.seed,
+        }
+
+
+class RequestFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    """One simulated end user: signs up, sets up an assistant, then chats until the deadline"""
+
+    def __init__(self, index: int, run_id: str, config: LoadTestConfig, client: httpx.AsyncClient, recorder: Recorder):
+        self.index = index
+        self.run_id = run_id
+        self.config = config
+        self.client = client
+        self.recorder = recorder
+        self.random = random.Random(None if config.seed is None else config.seed + index)
+        self.headers: Dict[str, str] = {}
+
+    async def call(self, stage: str, endpoint: str, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a timed request; non-2xx answers are recorded as errors and raise RequestFailed"""
+        start_time = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, f"{self.config.base_url}{path}", headers=self.headers, **kwargs
+            )
+        except httpx.HTTPError as e:
+            self.recorder.record(stage, endpoint, time.perf_counter() - start_time, ok=False)
+            raise RequestFailed(f"{method} {path}: {e!r}") from e
+        ok = response.is_success
+        self.recorder.record(stage, endpoint, time.perf_counter() - start_time, ok=ok, status=response.status_code)
+        if not ok:
+            raise RequestFailed(f"{method} {path}: {response.status_code} {response.text[:200]}")
+        return response
+
+    async def setup(self) -> int:
+        email = f"loadtest+{self.run_id}-{self.index}@example.com"
+        password = f"loadtest-{self.run_id}"
+        await self.call("setup", "POST /users", "POST", "/users/", json={
+            "email": email,
+            "full_name": f"Load test user {self.index}",
+            "password": password,
+        })
+        response = await self.call("setup", "POST /auth/login", "POST", "/auth/login", json={
+            "email": email,
+            "password": password,
+        })
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        response = await self.call("setup", "POST /help-assistant", "POST", "/help-assistant/", json={
+            "name": f"Assistant de charge {self.index}",
+            "url": "https://www.service-public.fr",
+            "mission": "répondre aux questions des usagers sur leurs démarches",
+            "operator_name": "Camille",
+            "tone": "PROFESSIONAL",
+        })
+        assistant_id = response.json()["id"]
+
+        for path in self.config.files:
+            with open(path, "rb") as f:
+                await self.call(
+                    "setup", "POST /help-assistant/{id}/files", "POST", f"/help-assistant/{assistant_id}/files",
+                    files={"file": (os.path.basename(path), f, "application/pdf")}
+                )
+        return assistant_id
+
+    async def think(self):
+        if self.config.think_time > 0:
+            await asyncio.sleep(self.random.expovariate(1 / self.config.think_time))
+
+    async def send_message(self, assistant_id: int, chat_id: int, question: str):
+        if not self.config.stream:
+            await self.call(
+                "chat", "POST chat/{id}/message", "POST",
+                f"/help-assistant/{assistant_id}/chat/{chat_id}/message",
+                json={"content": question}
+            )
+            return
+
+        endpoint = "POST chat/{id}/message/stream"
+        path = f"/help-assistant/{assistant_id}/chat/{chat_id}/message/stream"
+        start_time = time.perf_counter()
+        first_token = None
+        event = None
+        try:
+            async with self.client.stream(
+                "POST", f"{self.config.base_url}{path}", headers=self.headers, json={"content": question}
+            ) as response:
+                if not response.is_success:
+                    await response.aread()
+                    self.recorder.record("chat", endpoint, time.perf_counter() - start_time, ok=False, status=response.status_code)
+                    raise RequestFailed(f"POST {path}: {response.status_code} {response.text[:200]}")
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                        if event == "token" and first_token is None:
+                            first_token = time.perf_counter() - start_time
+                    elif line.startswith("data:") and event == "error":
+                        self.recorder.record("chat", endpoint, time.perf_counter() - start_time, ok=False, status=response.status_code)
+                        raise RequestFailed(f"POST {path}: {json.loads(line[len('data:'):]).get('detail')}")
+        except httpx.HTTPError as e:
+            self.recorder.record("chat", endpoint, time.perf_counter() - start_time, ok=False)
+            raise RequestFailed(f"POST {path}: {e!r}") from e
+
+        self.recorder.record("chat", endpoint, time.perf_counter() - start_time, ok=event == "done", status=response.status_code)
+        if first_token is not None:
+            self.recorder.record("chat", "time to first token", first_token, ok=True)
+
+    async def run(self, deadline: float):
+        try:
+            assistant_id = await self.setup()
+        except RequestFailed:
+            return
+
+        while time.perf_counter() < deadline:
+            session_start = time.perf_counter()
+            try:
+                response = await self.call(
+                    "chat", "POST chat/init", "POST", f"/help-assistant/{assistant_id}/chat/init"
+                )
+                chat_id = response.json()["chat_id"]
+                for _ in range(self.config.turns):
+                    if time.perf_counter() >= deadline:
+                        return
+                    await self.think()
+                    await self.send_message(assistant_id, chat_id, self.random.choice(self.config.questions))
+                    self.recorder.turns_completed += 1
+            except RequestFailed:
+                # Start a fresh conversation after a failure, as a real user would
+                await self.think()
+                continue
+            self.recorder.record("session", "full conversation", time.perf_counter() - session_start, ok=True)
+            self.recorder.sessions_completed += 1
+
+
+async def run_load_test(config: LoadTestConfig) -> Recorder:
+    """
+    Drive config.users virtual users against the API.
+
+    Users start evenly over the ramp period, then each one holds conversations
+    (chat/init followed by config.turns messages separated by exponentially
+    distributed think time) until the duration has elapsed.
+    """
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    limits = httpx.Limits(max_connections=config.users * 2, max_keepalive_connections=config.users)
+    async with httpx.AsyncClient(timeout=config.timeout, limits=limits) as client:
+        deadline = time.perf_counter() + config.ramp + config.duration
+
+        async def start(index: int):
+            if config.users > 1:
+                await asyncio.sleep(config.ramp * index / config.users)
+            await VirtualUser(index, run_id, config, client, recorder).run(deadline)
+
+        await asyncio.gather(*(start(i) for i in range(config.users)))
+    return recorder
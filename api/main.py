@@ -9,9 +9,45 @@ import asyncio
 from prometheus_client import generate_latest
 from fastapi.responses import Response
 from views import help_assistant
+from services.http_client import AlbertHTTPClient
+from utils.background import spawn, cancel_all as cancel_background_tasks
+from services.lexical_index import lexical_indexes
+from services.quota import quota_tracker
+from services.search_cache import search_cache
+from services.ingestion_queue import ingestion_queue
+from services.reconciliation import reconciler
+from config import settings
+from contextlib import asynccontextmanager
 import logging
 
-app = FastAPI(title="Albert AI Integration Demo", version="1.0.0", description="This is a demo application that demonstrates the integration of Albert AI, a French government initiative that provides state agencies with access to open-source AI models. Albert AI is designed to democratize access to artificial intelligence technologies within French public services. This project showcases how public services can integrate with Albert AI's APIs using a modern web stack. It provides a simple interface to interact with AI services while following French government security and accessibility guidelines.")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    # One keep-alive connection pool to Albert AI for the whole process
+    await AlbertHTTPClient.start()
+    # Load persisted lexical indexes without delaying startup
+    spawn(lexical_indexes.load_all(), name="lexical-index-warmup")
+    # Search results cached here are invalidated by uploads and deletes in any process
+    spawn(search_cache.listen(), name="search-cache-listener")
+    # Quota windows are warmed from usage_records, then flushed periodically
+    spawn(quota_tracker.run(), name="quota-flusher")
+    # Uploaded files are ingested into Albert AI from the ingestion_jobs queue
+    if settings.INGESTION_WORKERS > 0:
+        spawn(ingestion_queue.run(settings.INGESTION_WORKERS), name="ingestion-workers")
+    # Drift between file rows and Albert AI documents is repaired periodically
+    if settings.RECONCILE_INTERVAL_SECONDS > 0:
+        spawn(reconciler.run(), name="reconciler")
+    try:
+        yield
+    finally:
+        await cancel_background_tasks()
+        try:
+            await quota_tracker.flush()
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Failed to flush usage records on shutdown: {e}")
+        await AlbertHTTPClient.stop()
+
+app = FastAPI(lifespan=lifespan, title="Albert AI Integration Demo", version="1.0.0", description="This is a demo application that demonstrates the integration of Albert AI, a French government initiative that provides state agencies with access to open-source AI models. Albert AI is designed to democratize access to artificial intelligence technologies within French public services. This project showcases how public services can integrate with Albert AI's APIs using a modern web stack. It provides a simple interface to interact with AI services while following French government security and accessibility guidelines.")
 
 # Initialize monitoring first
 MonitoringService.init_monitoring(app)
@@ -34,10 +70,6 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-@app.on_event("startup")
-async def startup_event():
-    await init_db()
-
 # Add health check endpoint
 @app.get("/health")
 async def health_check():
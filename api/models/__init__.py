@@ -6,10 +6,16 @@ from .help_assistant import (
     HelpAssistantCreate, 
     HelpAssistantUpdate, 
     HelpAssistantResponse,
-    ToneType
+    ToneType,
+    RetrievalMethod
 )
 from .chat import Chat, Message, EmitterType
 from .assistant_file import AssistantFile
+from .usage import UsageRecord
+from .ingestion_job import IngestionJob, JobStatus
+from .albert_document import AlbertDocument
+from .file_blob import FileBlob
+from .collection_sync_state import CollectionSyncState
 
 # This ensures models are only defined once
 __all__ = [
@@ -18,5 +24,11 @@ __all__ = [
     'HelpAssistant', 'HelpAssistantBase', 'HelpAssistantCreate', 'HelpAssistantUpdate', 'HelpAssistantResponse',
     'Chat', 'Message', 'EmitterType',
     'AssistantFile',
-    'ToneType'
+    'UsageRecord',
+    'IngestionJob', 'JobStatus',
+    'AlbertDocument',
+    'FileBlob',
+    'CollectionSyncState',
+    'ToneType',
+    'RetrievalMethod'
 ] 
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from db.database import Base
+from datetime import datetime
+
+class AlbertDocument(Base):
+    """Local copy of the documents held by an Albert AI collection"""
+    __tablename__ = "albert_documents"
+    __table_args__ = (
+        UniqueConstraint("collection_id", "document_id", name="uq_albert_documents_collection_document"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    collection_id = Column(String, nullable=False, index=True)  # Albert AI collection id
+    document_id = Column(String, nullable=False)  # Albert AI document id
+    name = Column(String, nullable=False)
+    sha256 = Column(String, nullable=True, index=True)  # Hash of the uploaded file
+    file_id = Column(Integer, nullable=True, index=True)  # assistant_files.id
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,6 +1,13 @@
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from enum import Enum
+
+class FileStatus(str, Enum):
+    PENDING = "pending"    # Stored locally, waiting for an ingestion worker
+    INDEXING = "indexing"  # Being ingested into Albert AI
+    READY = "ready"        # Searchable
+    FAILED = "failed"      # Ingestion gave up, see error
 
 class AssistantFileBase(BaseModel):
     filename: str
@@ -9,6 +16,9 @@ class AssistantFileBase(BaseModel):
     file_path: str
     assistant_collection_id: Optional[str] = None
     albert_ai_id: Optional[str] = None
+    sha256: Optional[str] = None
+    status: FileStatus = FileStatus.PENDING
+    error: Optional[str] = None
 
 class AssistantFileCreate(AssistantFileBase):
     help_assistant_id: int
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from enum import Enum
+
+# Most chunks a search item may ask for
+MAX_K = 50
+
+class BatchMode(str, Enum):
+    SEARCH = "search"  # Retrieved chunks only
+    ANSWER = "answer"  # Retrieval followed by a generated answer
+
+class BatchRequest(BaseModel):
+    queries: List[str]
+    mode: BatchMode = BatchMode.ANSWER
+    k: Optional[int] = Field(None, ge=1, le=MAX_K)  # Chunks per search result (search mode)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
 from sqlalchemy.orm import relationship
 from db.database import Base
 from datetime import datetime
@@ -16,6 +16,9 @@ class Chat(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))  # Changed from "user" to "users"
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    summary = Column(Text, nullable=True)  # Rolling summary of turns older than the live window
+    summary_message_id = Column(Integer, nullable=True)  # Last message folded into the summary
+    summary_updated_at = Column(DateTime, nullable=True)
 
     # Relationships
     assistant = relationship("HelpAssistant", back_populates="chats")
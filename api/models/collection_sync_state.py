@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from db.database import Base
+
+class CollectionSyncState(Base):
+    """Watermark of the last reconciliation of a collection with Albert AI"""
+    __tablename__ = "collection_sync_states"
+
+    collection_id = Column(String, primary_key=True)  # Albert AI collection id
+    local_fingerprint = Column(String, nullable=True)  # Hash of the collection's file rows when last found in sync
+    remote_documents = Column(Integer, nullable=True)  # Document count reported by Albert AI at that time
+    checked_at = Column(DateTime, nullable=False)  # Last full comparison
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from db.database import Base
+from datetime import datetime
+
+class FileBlob(Base):
+    """Content-addressed stored file, shared by every AssistantFile with the same bytes"""
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(String, primary_key=True)
+    extension = Column(String, primary_key=True)  # Kept in the blob name for text extraction
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # AssistantFile rows using the blob
+    created_at = Column(DateTime, default=datetime.utcnow)
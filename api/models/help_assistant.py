@@ -55,6 +55,11 @@ class ToneType(str, Enum):
         """Get all tone descriptions in the specified language"""
         return {tone: cls.get_description(tone, language) for tone in cls}
 
+class RetrievalMethod(str, Enum):
+    SEMANTIC = "SEMANTIC"  # Albert AI embeddings search
+    LEXICAL = "LEXICAL"    # Keyword (BM25) search
+    HYBRID = "HYBRID"      # Both, fused with reciprocal rank fusion
+
 class HelpAssistantBase(BaseModel):
     name: str
     url: str
@@ -64,6 +69,7 @@ class HelpAssistantBase(BaseModel):
     operator_name: str
     operator_pic: Optional[str] = None
     tone: ToneType = ToneType.PROFESSIONAL
+    retrieval_method: RetrievalMethod = RetrievalMethod.SEMANTIC
 
     @validator('operator_pic', pre=True, always=True)
     def set_operator_pic(cls, v, values):
@@ -155,6 +161,9 @@ class HelpAssistant(Base):
     message: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     response: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     tone: Mapped[str] = mapped_column(String, default=ToneType.PROFESSIONAL)  # Make sure this exists
+    welcome_message: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    welcome_fingerprint: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    retrieval_method: Mapped[str] = mapped_column(String, default=RetrievalMethod.SEMANTIC)
     
     # Relationships
     collection = relationship("Collection", back_populates="help_assistant", uselist=False)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from db.database import Base
+from datetime import datetime
+from enum import Enum
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class IngestionJob(Base):
+    """Ingestion of an uploaded file into Albert AI, consumed by the ingestion workers"""
+    __tablename__ = "ingestion_jobs"
+    __table_args__ = (
+        # Workers claim the oldest runnable job
+        Index("ix_ingestion_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(Integer, nullable=False, index=True)  # assistant_files.id
+    help_assistant_id = Column(Integer, nullable=False, index=True)
+    status = Column(String, nullable=False, default=JobStatus.QUEUED.value)
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)  # Set while a worker runs the job
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
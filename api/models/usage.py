@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, UniqueConstraint
+from db.database import Base
+from datetime import datetime
+
+class UsageRecord(Base):
+    """Hourly Albert AI consumption of one user or assistant (flushed by the quota tracker)"""
+    __tablename__ = "usage_records"
+    __table_args__ = (
+        UniqueConstraint("scope", "subject_id", "period_start", name="uq_usage_records_subject_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # "user" or "assistant"
+    subject_id = Column(Integer, nullable=False, index=True)
+    period_start = Column(DateTime, nullable=False, index=True)  # Start of the hour (UTC)
+    requests = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
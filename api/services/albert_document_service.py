@@ -0,0 +1,72 @@
+from typing import List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.albert_document import AlbertDocument
+
+
+class AlbertDocumentService:
+    """Local index of the documents of Albert AI collections.
+
+    Rows are written when ingestion uploads a file and removed with the file
+    or the collection, so finding a document never needs to list a whole
+    collection from Albert AI. Changes are added to the caller's transaction.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def record(
+        self,
+        collection_id: str,
+        document_id: str,
+        name: str,
+        sha256: Optional[str] = None,
+        file_id: Optional[int] = None
+    ) -> AlbertDocument:
+        document = AlbertDocument(
+            collection_id=collection_id,
+            document_id=document_id,
+            name=name,
+            sha256=sha256,
+            file_id=file_id
+        )
+        self.db.add(document)
+        return document
+
+    async def find_for_file(self, collection_id: str, file_id: int) -> Optional[AlbertDocument]:
+        """The document uploaded for a file, if any"""
+        result = await self.db.execute(
+            select(AlbertDocument)
+            .filter(AlbertDocument.collection_id == collection_id, AlbertDocument.file_id == file_id)
+            .order_by(AlbertDocument.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def find_by_hash(self, collection_id: str, sha256: str) -> Optional[AlbertDocument]:
+        """A document of the collection uploaded from identical content, if any"""
+        result = await self.db.execute(
+            select(AlbertDocument)
+            .filter(AlbertDocument.collection_id == collection_id, AlbertDocument.sha256 == sha256)
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def list(self, collection_id: str) -> List[AlbertDocument]:
+        result = await self.db.execute(
+            select(AlbertDocument).filter(AlbertDocument.collection_id == collection_id)
+        )
+        return result.scalars().all()
+
+    async def remove(self, collection_id: str, document_id: str):
+        await self.db.execute(
+            delete(AlbertDocument).where(
+                AlbertDocument.collection_id == collection_id,
+                AlbertDocument.document_id == document_id
+            )
+        )
+
+    async def remove_collection(self, collection_id: str):
+        await self.db.execute(delete(AlbertDocument).where(AlbertDocument.collection_id == collection_id))
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from controllers.help_assistant import HelpAssistantController
+from models.batch import BatchMode, BatchRequest
+from models.help_assistant import RetrievalMethod
+from models.user import User
+from services.chat_pipeline import ChatTurnPipeline
+from services.collection_service import CollectionService
+from services.context_window import ContextWindowPolicy
+from services.external_api import AlbertAIService
+from services.monitoring import BATCH_ITEMS, BATCH_ITEM_DURATION
+from services.quota import quota_tracker
+from services.stage_timing import stage
+
+logger = logging.getLogger(__name__)
+
+
+class BatchQueryService:
+    """Run many searches or questions against one assistant.
+
+    The assistant and its collection are resolved once for the whole batch;
+    items then run at most BATCH_CONCURRENCY at a time and are yielded in
+    completion order, so a slow item does not hold back the others. Identical
+    queries in a batch are processed once.
+    """
+
+    def __init__(self, db: AsyncSession, albert_service: AlbertAIService):
+        self.db = db
+        self.albert_service = albert_service
+        self.pipeline = ChatTurnPipeline(db, albert_service)
+        self.window_policy = ContextWindowPolicy()
+
+    async def prepare(self, assistant_id: int, current_user: User, request: BatchRequest) -> Tuple[Any, Optional[Any]]:
+        """Validate the batch and load the assistant and its collection (None if it has none yet)"""
+        if not request.queries:
+            raise HTTPException(status_code=400, detail="At least one query is required")
+        if any(not query.strip() for query in request.queries):
+            raise HTTPException(status_code=400, detail="Queries must not be empty")
+        if len(request.queries) > settings.BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch is limited to {settings.BATCH_MAX_ITEMS} queries"
+            )
+
+        with stage("assistant_lookup"):
+            help_assistant = await HelpAssistantController.get_help_assistant(assistant_id, self.db)
+        if help_assistant.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized to query this assistant")
+
+        with stage("collection_lookup"):
+            collection = await CollectionService(self.db, self.albert_service).find_by_help_assistant(assistant_id)
+        if collection is None and request.mode == BatchMode.SEARCH:
+            raise HTTPException(status_code=404, detail="No collection found for this assistant")
+
+        if request.mode == BatchMode.ANSWER:
+            # Every distinct question is a completion; the whole batch is
+            # admitted up front so it cannot run out of quota partway through
+            items = len({query.strip() for query in request.queries})
+            rpm = min(quota_tracker.limits(scope)["requests_per_minute"] or items for scope in ("user", "assistant"))
+            if items > rpm:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"An answer batch is limited to {rpm} distinct questions by the requests per minute quota"
+                )
+            quota_tracker.admit(current_user.id, help_assistant.id, requests=items)
+        return help_assistant, collection
+
+    async def _search(self, help_assistant, collection, query: str, k: Optional[int]) -> Dict[str, Any]:
+        with stage("retrieval"):
+            results = await self.pipeline.collection_tool.retrieve(
+                collection_id=collection.albert_id,
+                query=query,
+                k=k or 10,
+                retrieval_method=help_assistant.retrieval_method or RetrievalMethod.SEMANTIC,
+                help_assistant_id=help_assistant.id
+            )
+        return {"results": results}
+
+    async def _answer(self, help_assistant, collection, query: str, user_id: int) -> Dict[str, Any]:
+        # Requests were admitted with the batch; the token quota may still run
+        # out partway, which fails the remaining items one by one
+        quota_tracker.check(user_id, help_assistant.id, requests=0)
+        quota_tracker.bind_user(user_id)
+        chunks = []
+        if collection is not None:
+            with stage("retrieval"):
+                chunks = await self.pipeline.retrieve(help_assistant, collection, query)
+
+        system_context = self.pipeline.build_system_context(help_assistant)
+        _, chunks = self.window_policy.fit(system=system_context, prompt=query, history=[], chunks=chunks)
+        messages = self.albert_service.build_context_messages(
+            prompt=query,
+            context={"system": system_context, "chat_history": []},
+            search_results=chunks if collection is not None else None
+        )
+        with stage("generation"):
+            response = await self.albert_service.chat_completion(messages, assistant_id=help_assistant.id)
+        return {
+            "answer": response["choices"][0]["message"]["content"],
+            "sources": chunks
+        }
+
+    async def run(
+        self,
+        help_assistant,
+        collection,
+        request: BatchRequest,
+        current_user: User
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process the batch items, yielding one result per query as it completes.
+
+        Args:
+            help_assistant: Assistant returned by prepare
+            collection: Its collection, or None (answers then use no documents)
+            request: The batch
+            current_user: User the completions are charged to
+
+        Returns:
+            Async iterator of {"index", "query", "status", ...} dicts: "results"
+            (search) or "answer" and "sources" (answer) when status is "ok",
+            "error" and "status_code" otherwise
+        """
+        semaphore = asyncio.Semaphore(max(settings.BATCH_CONCURRENCY, 1))
+        mode = request.mode.value
+
+        async def process(query: str) -> Dict[str, Any]:
+            start_time = time.perf_counter()
+            status = "ok"
+            try:
+                async with semaphore:
+                    if request.mode == BatchMode.SEARCH:
+                        return {"status": "ok", **await self._search(help_assistant, collection, query, request.k)}
+                    return {"status": "ok", **await self._answer(help_assistant, collection, query, current_user.id)}
+            except HTTPException as e:
+                status = "error"
+                return {"status": "error", "status_code": e.status_code, "error": e.detail}
+            except Exception as e:
+                status = "error"
+                logger.error(f"Batch item failed for assistant {help_assistant.id}: {e}")
+                return {"status": "error", "status_code": 500, "error": f"Failed to process query: {str(e)}"}
+            finally:
+                BATCH_ITEM_DURATION.labels(mode=mode).observe(time.perf_counter() - start_time)
+                BATCH_ITEMS.labels(mode=mode, status=status).inc()
+
+        # One task per distinct query; duplicates are answered from the same task
+        indexes: Dict[str, List[int]] = {}
+        for index, query in enumerate(request.queries):
+            indexes.setdefault(query.strip(), []).append(index)
+        tasks = {asyncio.create_task(process(query)): query for query in indexes}
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    query = tasks[task]
+                    for index in indexes[query]:
+                        yield {"index": index, "query": request.queries[index], **task.result()}
+        finally:
+            # The client went away or the stream failed: stop the remaining items
+            for task in tasks:
+                task.cancel()
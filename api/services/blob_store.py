@@ -0,0 +1,147 @@
+import logging
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+import aiofiles.os
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.file_blob import FileBlob
+from services.monitoring import UPLOAD_DEDUP_FILES, UPLOAD_DEDUP_BYTES_SAVED
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """Content-addressed storage of uploaded files.
+
+    Files are written to a temporary path first (hashing on the way), then
+    stored once per content as blobs/<sha256[:2]>/<sha256><extension>. The
+    file_blobs row of a blob counts the AssistantFile rows that use it.
+
+    Every change to a blob (adding a reference, removing the file) holds a
+    transaction-level advisory lock on its content, and blob files are only
+    removed by collect(), after the transaction that dropped (or failed to
+    create) the last reference has ended, and only if no row references the
+    blob then. An upload adopting a blob can therefore never see its file
+    disappear.
+    """
+
+    def __init__(self, base_dir: Optional[Path] = None):
+        self.base_dir = Path(base_dir or settings.UPLOAD_DIR)
+        self.blob_dir = self.base_dir / "blobs"
+        self.tmp_dir = self.base_dir / "tmp"
+
+    async def prepare(self):
+        """Create the temporary upload directory"""
+        await aiofiles.os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def temp_path(self) -> Path:
+        """A fresh path to stream an upload to before it is stored (after prepare())"""
+        return self.tmp_dir / uuid.uuid4().hex
+
+    def blob_path(self, sha256: str, extension: str) -> Path:
+        return self.blob_dir / sha256[:2] / f"{sha256}{extension}"
+
+    def is_blob(self, file_path: str) -> bool:
+        return Path(file_path).is_relative_to(self.blob_dir)
+
+    @staticmethod
+    async def _lock(session: AsyncSession, sha256: str, extension: str):
+        """Serialize changes to one blob until the session's transaction ends"""
+        await session.execute(
+            text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))"),
+            {"key": f"blob:{sha256}{extension}"}
+        )
+
+    async def store(self, session: AsyncSession, temp_path: Path, sha256: str, extension: str, size: int) -> Tuple[Path, bool]:
+        """
+        Add a reference to the blob of a temporary file, moving it into place
+        if the content is new. Part of the caller's transaction.
+
+        Args:
+            session: Session whose transaction holds the reference
+            temp_path: File written by the upload (consumed)
+            sha256: Its hex SHA-256
+            extension: Its file extension
+            size: Its size in bytes
+
+        Returns:
+            (blob path, whether the blob was created); if the transaction is
+            rolled back, a created blob must be passed to collect()
+        """
+        await self._lock(session, sha256, extension)
+        statement = insert(FileBlob).values(sha256=sha256, extension=extension, size=size, ref_count=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[FileBlob.sha256, FileBlob.extension],
+            set_={"ref_count": FileBlob.ref_count + 1}
+        )
+        await session.execute(statement)
+
+        blob_path = self.blob_path(sha256, extension)
+        if await aiofiles.os.path.exists(blob_path):
+            await aiofiles.os.remove(temp_path)
+            UPLOAD_DEDUP_FILES.labels(layer="disk", result="duplicate").inc()
+            UPLOAD_DEDUP_BYTES_SAVED.labels(layer="disk").inc(size)
+            return blob_path, False
+
+        await aiofiles.os.makedirs(blob_path.parent, exist_ok=True)
+        await aiofiles.os.replace(temp_path, blob_path)
+        UPLOAD_DEDUP_FILES.labels(layer="disk", result="new").inc()
+        return blob_path, True
+
+    async def discard(self, file_path: Path):
+        """Remove a temporary file"""
+        try:
+            await aiofiles.os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+    async def release(self, session: AsyncSession, sha256: str, extension: str) -> bool:
+        """
+        Drop a reference to a blob (in the caller's transaction).
+
+        Returns:
+            Whether that was the last reference; the blob file must then be
+            passed to collect() once the transaction has committed
+        """
+        await self._lock(session, sha256, extension)
+        result = await session.execute(
+            select(FileBlob).filter(FileBlob.sha256 == sha256, FileBlob.extension == extension)
+        )
+        blob = result.scalar_one_or_none()
+        if blob is None:
+            return False
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            return False
+        await session.delete(blob)
+        return True
+
+    async def collect(self, session: AsyncSession, sha256: str, extension: str):
+        """
+        Remove a blob file unless a committed row references it (own transaction).
+
+        Called after a transaction released the last reference or failed to
+        create the blob. Failures are logged: an orphaned file only wastes
+        disk space.
+        """
+        try:
+            await self._lock(session, sha256, extension)
+            result = await session.execute(
+                select(FileBlob.sha256).filter(FileBlob.sha256 == sha256, FileBlob.extension == extension)
+            )
+            if result.scalar_one_or_none() is None:
+                try:
+                    await aiofiles.os.remove(self.blob_path(sha256, extension))
+                except FileNotFoundError:
+                    pass
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Failed to collect blob {sha256}{extension}: {e}")
+
+blob_store = BlobStore()
@@ -0,0 +1,179 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from config import settings
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import AsyncSessionLocal
+from controllers.help_assistant import HelpAssistantController
+from models.chat import EmitterType
+from models.help_assistant import RetrievalMethod
+from models.user import User
+from services.chat_service import ChatService
+from services.collection_service import CollectionService
+from services.context_window import ContextWindowPolicy
+from services.context_selection import select_context
+from services.summary_service import summary_context
+from services.external_api import AlbertAIService
+from services.quota import quota_tracker
+from services.stage_timing import stage, timed_stage
+from tools.collection_tool import CollectionTool
+from utils.task_graph import TaskGraph
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatTurnContext:
+    """Everything needed to generate the assistant reply of a chat turn"""
+    help_assistant: Any
+    messages: List[Dict[str, str]]
+    collection: Optional[Any]
+    search_results: Optional[List[Dict[str, Any]]]
+
+
+class ChatTurnPipeline:
+    """Prepare a chat turn as a dependency graph of concurrent stages.
+
+        chat -> assistant -> persist_user -> history ----+
+                     |                                    +--> prompt assembly
+        collection --+--> search ------------------------+
+        (own session)
+
+    Retrieval only needs the prompt, the collection id and the assistant's
+    retrieval method, so it runs while the request session saves the user
+    message and loads the history. An AsyncSession cannot run concurrent
+    queries, which is why the collection lookup uses a session of its own.
+    """
+
+    def __init__(self, db: AsyncSession, albert_service: AlbertAIService):
+        self.db = db
+        self.albert_service = albert_service
+        self.chat_service = ChatService(db)
+        self.collection_tool = CollectionTool(albert_service)
+        self.window_policy = ContextWindowPolicy()
+
+    @staticmethod
+    def build_system_context(help_assistant) -> str:
+        """Build system context with assistant details"""
+        return (
+            f"Tu es {help_assistant.operator_name}, un assistant virtuel de {help_assistant.name}. "
+            f"Ta mission est {help_assistant.mission}. "
+            f"Ton ton de communication est {help_assistant.tone or 'professionnel'}. "
+            "Réponds toujours en français de manière naturelle et cohérente avec ton rôle."
+        )
+
+    async def retrieve(self, help_assistant, collection, query: str):
+        """Search the collection with the assistant's retrieval method, then compact the candidates"""
+        candidates = await self.collection_tool.retrieve(
+            collection_id=collection.albert_id,
+            query=query,
+            k=settings.CONTEXT_CANDIDATES,
+            retrieval_method=getattr(help_assistant, "retrieval_method", None) or RetrievalMethod.SEMANTIC,
+            help_assistant_id=help_assistant.id
+        )
+        return select_context(candidates)
+
+    async def prepare(self, assistant_id: int, chat_id: int, current_user: User, content: str) -> ChatTurnContext:
+        """Authorize the chat, admit the turn against the quotas, save the user message and build the completion messages"""
+
+        async def load_chat():
+            # Verify user has access to this chat
+            chat = await self.chat_service.get_chat(chat_id)
+            if not chat or chat.user_id != current_user.id:
+                raise HTTPException(status_code=403, detail="Not authorized to access this chat")
+            if chat.assistant_id != assistant_id:
+                raise HTTPException(status_code=404, detail="Chat not found for this assistant")
+            # Counted once the turn is authorized, against the chat's assistant;
+            # rejected before any Albert AI work when over quota
+            quota_tracker.admit(current_user.id, chat.assistant_id)
+            return chat
+
+        async def load_assistant(chat):
+            return await HelpAssistantController.get_help_assistant(assistant_id, self.db)
+
+        async def persist_user(assistant):
+            return await self.chat_service.add_message(
+                chat_id=chat_id,
+                content=content,
+                emitter=EmitterType.USER
+            )
+
+        async def load_history(chat, persist_user):
+            # Only the latest turns can fit the token budget; one extra row
+            # accounts for the message just saved, which is sent as the prompt.
+            # Turns already folded into the chat summary are skipped.
+            chat_history = await self.chat_service.get_recent_messages(
+                chat_id, settings.CHAT_HISTORY_MAX_MESSAGES + 1, after_id=chat.summary_message_id
+            )
+            return [
+                {"role": "assistant" if msg.emitter == EmitterType.ASSISTANT else "user", "content": msg.content}
+                for msg in chat_history
+                if msg.id != persist_user.id
+            ][-settings.CHAT_HISTORY_MAX_MESSAGES:]
+
+        async def find_collection():
+            async with AsyncSessionLocal() as session:
+                return await CollectionService(session, self.albert_service).find_by_help_assistant(assistant_id)
+
+        async def search(collection, assistant):
+            if collection is None:
+                return None
+            return await self.retrieve(assistant, collection, content)
+
+        graph = (
+            TaskGraph()
+            .add("chat", timed_stage("chat_lookup", load_chat))
+            .add("assistant", timed_stage("assistant_lookup", load_assistant), depends_on=["chat"])
+            .add("persist_user", timed_stage("persist_user", persist_user), depends_on=["assistant"])
+            .add("history", timed_stage("history", load_history), depends_on=["chat", "persist_user"])
+            .add("collection", timed_stage("collection_lookup", find_collection))
+            .add("search", timed_stage("retrieval", search), depends_on=["collection", "assistant"])
+        )
+        results = await graph.run()
+        # Stages run in tasks of their own: bind the user in this context too,
+        # so the completion's tokens are charged to them
+        quota_tracker.bind_user(current_user.id)
+
+        help_assistant = results["assistant"]
+        collection = results["collection"]
+        search_results = results["search"]
+
+        if collection is None:
+            # First turn of an assistant without a collection yet: creating it
+            # goes through the request session once authorization has passed
+            with stage("collection_create"):
+                collection = await CollectionService(self.db, self.albert_service).get_by_help_assistant(assistant_id)
+            if collection:
+                with stage("retrieval"):
+                    search_results = await self.retrieve(help_assistant, collection, content)
+
+        if collection:
+            logger.info(f"Using collection: {collection.albert_id}")
+        else:
+            logger.info("No collection found, using fallback")
+
+        with stage("context_assembly"):
+            system_context = self.build_system_context(help_assistant)
+            if results["chat"].summary:
+                system_context += summary_context(results["chat"].summary)
+            history, chunks = self.window_policy.fit(
+                system=system_context,
+                prompt=content,
+                history=results["history"],
+                chunks=search_results or []
+            )
+            messages = self.albert_service.build_context_messages(
+                prompt=content,
+                context={
+                    "system": system_context,
+                    "chat_history": history
+                },
+                search_results=chunks if collection else None
+            )
+        return ChatTurnContext(
+            help_assistant=help_assistant,
+            messages=messages,
+            collection=collection,
+            search_results=chunks
+        )
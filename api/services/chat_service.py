@@ -1,9 +1,9 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from models.chat import Chat, Message, EmitterType
 from models.user import User
 from models.help_assistant import HelpAssistant
-from typing import Optional, List
+from typing import Optional, List, Any
 import json
 
 class ChatService:
@@ -63,6 +63,43 @@ class ChatService:
         result = await self.db.execute(query)
         return result.scalars().all() 
 
+    async def get_recent_messages(self, chat_id: int, limit: int, after_id: Optional[int] = None) -> List[Any]:
+        """Get the latest messages of a chat, oldest first, projected to id/emitter/content.
+
+        Messages up to after_id (already folded into the chat summary) are skipped.
+        """
+        query = (
+            select(Message.id, Message.emitter, Message.content)
+            .where(Message.chat_id == chat_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit)
+        )
+        if after_id is not None:
+            query = query.where(Message.id > after_id)
+        result = await self.db.execute(query)
+        return list(reversed(result.all()))
+
+    async def count_messages(self, chat_id: int, after_id: Optional[int] = None) -> int:
+        """Count the messages of a chat, optionally only those after a message id"""
+        query = select(func.count(Message.id)).where(Message.chat_id == chat_id)
+        if after_id is not None:
+            query = query.where(Message.id > after_id)
+        result = await self.db.execute(query)
+        return result.scalar_one()
+
+    async def get_messages_after(self, chat_id: int, after_id: Optional[int], limit: int) -> List[Any]:
+        """Get the oldest messages after a message id, oldest first, projected to id/emitter/content"""
+        query = (
+            select(Message.id, Message.emitter, Message.content)
+            .where(Message.chat_id == chat_id)
+            .order_by(Message.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            query = query.where(Message.id > after_id)
+        result = await self.db.execute(query)
+        return result.all()
+
     async def get_chat(self, chat_id: int):
         """Get a chat by its ID"""
         query = select(Chat).where(Chat.id == chat_id)
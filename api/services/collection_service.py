@@ -2,36 +2,57 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from db.models import Collection
 from models.collection import CollectionCreate
-from services.external_api import AlbertAIService
+from db.database import AsyncSessionLocal
+from services.external_api import AlbertAIService, get_albert_service
+from services.single_flight import SingleFlight
+from services.albert_document_service import AlbertDocumentService
+from typing import Optional
+
+# Concurrent first requests for one assistant (e.g. several open tabs) create a single collection
+_creations = SingleFlight("create_collection")
 
 class CollectionService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, albert_service: Optional[AlbertAIService] = None):
         self.db = db
-        self.albert_service = AlbertAIService()
+        self.albert_service = albert_service or get_albert_service()
 
-    async def get_by_help_assistant(self, help_assistant_id: int) -> Collection:
-        """Get or create collection for a help assistant"""
-        # Check if collection exists
+    async def find_by_help_assistant(self, help_assistant_id: int) -> Optional[Collection]:
+        """Get the collection of a help assistant without creating it"""
         result = await self.db.execute(
             select(Collection).filter(Collection.help_assistant_id == help_assistant_id)
         )
-        collection = result.scalar_one_or_none()
+        return result.scalar_one_or_none()
+
+    async def get_by_help_assistant(self, help_assistant_id: int) -> Collection:
+        """Get or create collection for a help assistant"""
+        # Check if collection exists
+        collection = await self.find_by_help_assistant(help_assistant_id)
         
         if not collection:
+            await _creations.do(help_assistant_id, lambda: self._create(help_assistant_id))
+            collection = await self.find_by_help_assistant(help_assistant_id)
+        
+        return collection
+
+    async def _create(self, help_assistant_id: int):
+        """Create the collection in its own session, shared by concurrent callers"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Collection).filter(Collection.help_assistant_id == help_assistant_id)
+            )
+            if result.scalar_one_or_none():
+                return
+
             # Create new collection in Albert AI
             collection_name = f"assistant_{help_assistant_id}_collection"
             albert_response = await self.albert_service.create_collection(collection_name)
             
             # Create local collection record
-            collection = Collection(
+            session.add(Collection(
                 albert_id=albert_response["id"],
                 help_assistant_id=help_assistant_id
-            )
-            self.db.add(collection)
-            await self.db.commit()
-            await self.db.refresh(collection)
-        
-        return collection
+            ))
+            await session.commit()
 
     async def delete_collection(self, collection_id: int):
         """Delete collection both locally and in Albert AI"""
@@ -44,6 +65,7 @@ class CollectionService:
             # Delete from Albert AI
             await self.albert_service.delete_collection(collection.albert_id)
             
-            # Delete local record
+            # Delete local records
+            await AlbertDocumentService(self.db).remove_collection(collection.albert_id)
             await self.db.delete(collection)
             await self.db.commit() 
\ No newline at end of file
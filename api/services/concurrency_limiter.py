@@ -0,0 +1,208 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from config import settings
+from services.monitoring import (
+    ALBERT_LIMITER_LIMIT, ALBERT_LIMITER_IN_FLIGHT, ALBERT_LIMITER_QUEUE_DEPTH,
+    ALBERT_LIMITER_WAIT_TIME, ALBERT_LIMITER_REJECTIONS
+)
+from utils.exceptions import UpstreamUnavailableException
+
+# Multiplicative decrease when Albert AI signals overload (429/503, errors)
+OVERLOAD_BACKOFF = 0.75
+# Gentler decrease when latency climbs well above the baseline
+LATENCY_BACKOFF = 0.9
+# Latency above this multiple of the baseline means queueing upstream
+LATENCY_TOLERANCE = 2.0
+# The baseline (minimum) latency is re-measured over windows of this many samples,
+# so it follows lasting changes instead of sticking to one lucky fast call
+BASELINE_WINDOW = 100
+
+# Classes whose latency grows with the work asked for rather than with load: a
+# chat completion takes as long as its answer, so only overload signals
+# (429/503, 502/504, errors and timeouts) shrink their limit
+LENGTH_BOUND_CLASSES = {"chat"}
+
+# Albert AI endpoint -> limiter class; ingestion endpoints share one class so
+# upload bursts queue among themselves instead of starving chat and search
+ENDPOINT_CLASSES = {
+    "chat": "chat",
+    "search": "search",
+    "files": "files",
+    "documents": "files",
+    "collections": "files",
+}
+
+
+class _Slot:
+    __slots__ = ("limiter", "start_time", "recorded")
+
+    def __init__(self, limiter: "AdaptiveLimiter"):
+        self.limiter = limiter
+        self.start_time = time.perf_counter()
+        self.recorded = False
+
+    def record(self, overloaded: bool = False):
+        """Feed this call's latency (and whether Albert AI pushed back) to the limit"""
+        if not self.recorded:
+            self.recorded = True
+            self.limiter.on_sample(time.perf_counter() - self.start_time, overloaded)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one class of Albert AI calls.
+
+    The limit grows by about one per limit's worth of healthy calls while the
+    limit is actually in use, shrinks gently when latency climbs past
+    LATENCY_TOLERANCE times the baseline (unless latency_backoff is off) and
+    sharply when Albert AI answers 429/503/502/504 or fails. Callers beyond the limit wait in a bounded FIFO queue
+    for at most max_wait seconds; beyond that they are rejected with a 503.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        queue_size: int,
+        max_wait: float,
+        latency_backoff: bool = True
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.latency_backoff = latency_backoff
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._baseline: Optional[float] = None
+        self._window_min = float("inf")
+        self._window_samples = 0
+        ALBERT_LIMITER_LIMIT.labels(endpoint_class=name).set(self.limit)
+
+    def on_sample(self, latency: float, overloaded: bool):
+        self._window_min = min(self._window_min, latency)
+        self._window_samples += 1
+        if self._baseline is None or self._window_samples >= BASELINE_WINDOW:
+            self._baseline = self._window_min
+            self._window_min = float("inf")
+            self._window_samples = 0
+
+        if overloaded:
+            self.limit = max(self.min_limit, self.limit * OVERLOAD_BACKOFF)
+        elif self.latency_backoff and latency > self._baseline * LATENCY_TOLERANCE:
+            self.limit = max(self.min_limit, self.limit * LATENCY_BACKOFF)
+        elif self.in_flight >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        ALBERT_LIMITER_LIMIT.labels(endpoint_class=self.name).set(self.limit)
+        self._wake()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def has_capacity(self) -> bool:
+        """Whether a slot is free right now, with nobody queued for one"""
+        return self._has_capacity() and not self._waiters
+
+    def _wake(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot is handed over directly so a newcomer cannot take it first
+                self.in_flight += 1
+                waiter.set_result(None)
+        self._update_gauges()
+
+    def _update_gauges(self):
+        ALBERT_LIMITER_IN_FLIGHT.labels(endpoint_class=self.name).set(self.in_flight)
+        ALBERT_LIMITER_QUEUE_DEPTH.labels(endpoint_class=self.name).set(len(self._waiters))
+
+    async def _acquire(self):
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            self._update_gauges()
+            ALBERT_LIMITER_WAIT_TIME.labels(endpoint_class=self.name).observe(0)
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            ALBERT_LIMITER_REJECTIONS.labels(endpoint_class=self.name, reason="queue_full").inc()
+            raise UpstreamUnavailableException(retry_after=1)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we gave up: hand it back
+                self.in_flight -= 1
+            else:
+                waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            self._wake()
+            if isinstance(e, asyncio.TimeoutError):
+                ALBERT_LIMITER_REJECTIONS.labels(endpoint_class=self.name, reason="timeout").inc()
+                raise UpstreamUnavailableException(retry_after=self.max_wait)
+            raise
+        finally:
+            ALBERT_LIMITER_WAIT_TIME.labels(endpoint_class=self.name).observe(time.perf_counter() - start_time)
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[_Slot]:
+        """
+        Hold one unit of concurrency for the duration of the block.
+
+        The latency sample is taken when the caller calls slot.record(), or at
+        the end of the block otherwise; a block ending in an error counts as
+        overload, a cancelled one is not sampled.
+        """
+        await self._acquire()
+        slot = _Slot(self)
+        try:
+            yield slot
+        except asyncio.CancelledError:
+            slot.recorded = True
+            raise
+        except Exception:
+            slot.record(overloaded=True)
+            raise
+        else:
+            slot.record()
+        finally:
+            self._release()
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def limiter_for(endpoint: str) -> AdaptiveLimiter:
+    """Process-wide limiter of the class an Albert AI endpoint belongs to"""
+    endpoint_class = ENDPOINT_CLASSES.get(endpoint, "other")
+    limiter = _limiters.get(endpoint_class)
+    if limiter is None:
+        limiter = AdaptiveLimiter(
+            endpoint_class,
+            initial_limit=settings.ALBERT_AI_LIMIT_INITIAL,
+            min_limit=settings.ALBERT_AI_LIMIT_MIN,
+            max_limit=settings.ALBERT_AI_FILES_LIMIT_MAX if endpoint_class == "files" else settings.ALBERT_AI_LIMIT_MAX,
+            queue_size=settings.ALBERT_AI_LIMIT_QUEUE_SIZE,
+            max_wait=settings.ALBERT_AI_LIMIT_MAX_WAIT,
+            latency_backoff=endpoint_class not in LENGTH_BOUND_CLASSES
+        )
+        _limiters[endpoint_class] = limiter
+    return limiter
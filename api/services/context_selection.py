@@ -0,0 +1,152 @@
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from config import settings
+from services.context_window import estimate_tokens
+from services.lexical_index import tokenize
+from services.monitoring import CONTEXT_SAVED_BYTES, CONTEXT_SAVED_TOKENS, CONTEXT_DROPPED_CHUNKS
+
+SHINGLE_SIZE = 3
+# Jaccard similarity above which two chunks are near-duplicates
+DUPLICATE_THRESHOLD = 0.8
+# Share of the smaller chunk found in the other above which it is an overlap
+CONTAINMENT_THRESHOLD = 0.9
+# MMR trade-off between relevance (1.0) and diversity (0.0)
+MMR_LAMBDA = 0.7
+# Adaptive k: drop chunks scoring below this share of the best score...
+MIN_RELATIVE_SCORE = 0.5
+# ...and cut at the largest score drop when it exceeds this share of the score range
+ELBOW_MIN_GAP = 0.25
+
+
+def shingles(text: str) -> FrozenSet[int]:
+    """Hashed word 3-grams of a chunk (single tokens for very short chunks)"""
+    tokens = tokenize(text)
+    if len(tokens) < SHINGLE_SIZE:
+        return frozenset(hash(token) for token in tokens)
+    return frozenset(
+        hash(tuple(tokens[i:i + SHINGLE_SIZE]))
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    )
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def containment(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def adaptive_k(scores: List[float], min_k: int, max_k: int) -> int:
+    """Pick how many chunks to keep from their scores (best first).
+
+    Keeps chunks within MIN_RELATIVE_SCORE of the best one (when no score is
+    negative, so the ratio means something), then cuts at the elbow (largest
+    drop between consecutive scores) if that drop is large enough to separate
+    relevant chunks from the tail.
+    """
+    if len(scores) <= min_k:
+        return len(scores)
+
+    top = scores[0]
+    k = len(scores)
+    if top > 0 and min(scores) >= 0:
+        k = sum(1 for score in scores if score >= top * MIN_RELATIVE_SCORE)
+    k = min(max(k, min_k), max_k)
+
+    score_range = scores[0] - scores[k - 1]
+    if k > min_k and score_range > 0:
+        gaps = [(scores[i - 1] - scores[i], i) for i in range(min_k, k)]
+        gap, cut = max(gaps)
+        if gap >= ELBOW_MIN_GAP * score_range:
+            k = cut
+    return k
+
+
+def fused_k(chunks: List[Dict[str, Any]], min_k: int, max_k: int) -> int:
+    """Adaptive k for results merged by reciprocal rank fusion (see services.rank_fusion).
+
+    Fused scores only reflect ranks: a chunk of a document found by both
+    sources scores about twice as much as one found by a single source, so
+    thresholds on them would keep little beyond the overlap. Each source's own
+    scores are used instead; each source is cut as if it had been retrieved
+    alone, and a chunk counts when it is kept by any source.
+    """
+    kept = set()
+    sources = {source for chunk in chunks for source in chunk["ranks"]}
+    for source in sources:
+        ranked = sorted(
+            (chunk["ranks"][source], float(chunk["scores"].get(source) or 0.0), i)
+            for i, chunk in enumerate(chunks) if source in chunk["ranks"]
+        )
+        source_k = adaptive_k([score for _, score, _ in ranked], min_k, max_k)
+        kept.update(i for _, _, i in ranked[:source_k])
+    return min(len(kept), max_k)
+
+
+def select_context(chunks: List[Dict[str, Any]], min_k: int = 2, max_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Compact retrieved chunks before prompt assembly.
+
+    Drops near-duplicate and overlapping chunks (keeping the better-ranked one),
+    chooses k from the score distribution, then picks the k chunks by maximal
+    marginal relevance so the prompt covers distinct passages.
+
+    Args:
+        chunks: Retrieved chunks, best first, each with "content" and "score"
+            (plus "scores" and "ranks" per source when fused)
+        min_k: Minimum chunks to keep when available
+        max_k: Maximum chunks to keep (default: CONTEXT_MAX_CHUNKS)
+
+    Returns:
+        Selected chunks, in selection order
+    """
+    max_k = max_k or settings.CONTEXT_MAX_CHUNKS
+    if not chunks:
+        return []
+
+    # 1. Near-duplicate and overlap removal, in rank order
+    candidates = []
+    for chunk in chunks:
+        chunk_shingles = shingles(chunk["content"])
+        duplicate = any(
+            jaccard(chunk_shingles, kept_shingles) >= DUPLICATE_THRESHOLD
+            or containment(chunk_shingles, kept_shingles) >= CONTAINMENT_THRESHOLD
+            for _, kept_shingles in candidates
+        )
+        if duplicate:
+            CONTEXT_DROPPED_CHUNKS.labels(reason="duplicate").inc()
+        else:
+            candidates.append((chunk, chunk_shingles))
+
+    # 2. Adaptive k from the score distribution
+    scores = [float(chunk.get("score") or 0.0) for chunk, _ in candidates]
+    if all("ranks" in chunk for chunk, _ in candidates):
+        k = fused_k([chunk for chunk, _ in candidates], min_k, max_k)
+    else:
+        k = adaptive_k(scores, min_k, max_k)
+    CONTEXT_DROPPED_CHUNKS.labels(reason="low_score").inc(len(candidates) - k)
+
+    # 3. MMR over relevance normalized to [0, 1]
+    low, high = min(scores), max(scores)
+    relevance = [(score - low) / (high - low) if high > low else 1.0 for score in scores]
+    selected: List[int] = []
+    remaining = list(range(len(candidates)))
+    while remaining and len(selected) < k:
+        def mmr(i: int) -> float:
+            redundancy = max((jaccard(candidates[i][1], candidates[j][1]) for j in selected), default=0.0)
+            return MMR_LAMBDA * relevance[i] - (1 - MMR_LAMBDA) * redundancy
+        best = max(remaining, key=mmr)
+        selected.append(best)
+        remaining.remove(best)
+
+    result = [candidates[i][0] for i in selected]
+
+    dropped = [chunk["content"] for chunk in chunks if not any(chunk is kept for kept in result)]
+    CONTEXT_SAVED_BYTES.observe(sum(len(text.encode("utf-8")) for text in dropped))
+    CONTEXT_SAVED_TOKENS.observe(sum(estimate_tokens(text) for text in dropped))
+    return result
@@ -0,0 +1,94 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from services.monitoring import PROMPT_TOKENS
+
+# Role markers and separators added around each chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Fixed instructions wrapped around the question and the documents
+PROMPT_TEMPLATE_TOKENS = 30
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Llama-style tokenizers on French text.
+
+    About four characters per token, but never fewer tokens than words,
+    which keeps short-word and numeric text from being underestimated.
+    """
+    if not text:
+        return 0
+    return max(len(text.split()), math.ceil(len(text) / 4))
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ContextWindowPolicy:
+    """Fit chat history and retrieved chunks into a shared token budget.
+
+    Chunks may use up to (1 - history_share) of what is left after the system
+    prompt and the question; history takes the newest turns that fit in the
+    rest, and any history budget left unused goes back to lower-ranked chunks.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, history_share: Optional[float] = None):
+        self.token_budget = token_budget if token_budget is not None else settings.CHAT_CONTEXT_TOKEN_BUDGET
+        self.history_share = history_share if history_share is not None else settings.CHAT_HISTORY_TOKEN_SHARE
+
+    def fit(
+        self,
+        system: str,
+        prompt: str,
+        history: List[Dict[str, str]],
+        chunks: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """
+        Trim history and chunks to the budget.
+
+        Args:
+            system: System prompt
+            prompt: The user's question
+            history: Previous messages, oldest first
+            chunks: Retrieved chunks, best first
+
+        Returns:
+            The kept history (oldest first, contiguous up to the latest turn)
+            and the kept chunks (in rank order)
+        """
+        fixed = message_tokens(system) + message_tokens(prompt) + PROMPT_TEMPLATE_TOKENS
+        history_costs = [message_tokens(message["content"]) for message in history]
+        chunk_costs = [estimate_tokens(chunk["content"]) for chunk in chunks]
+        PROMPT_TOKENS.labels(stage="before").observe(fixed + sum(history_costs) + sum(chunk_costs))
+
+        remaining = max(self.token_budget - fixed, 0)
+
+        # First pass: chunks within their share, in rank order
+        chunk_budget = int(remaining * (1 - self.history_share))
+        kept_chunks = set()
+        used = 0
+        for i, cost in enumerate(chunk_costs):
+            if used + cost <= chunk_budget:
+                kept_chunks.add(i)
+                used += cost
+
+        # History: newest turns first, stopping at the first one that does not fit
+        history_budget = remaining - used
+        kept_from = len(history)
+        history_used = 0
+        for i in range(len(history) - 1, -1, -1):
+            if history_used + history_costs[i] > history_budget:
+                break
+            history_used += history_costs[i]
+            kept_from = i
+
+        # Second pass: leftover budget goes to chunks skipped in the first pass
+        used += history_used
+        for i, cost in enumerate(chunk_costs):
+            if i not in kept_chunks and used + cost <= remaining:
+                kept_chunks.add(i)
+                used += cost
+
+        PROMPT_TOKENS.labels(stage="after").observe(fixed + used)
+        return history[kept_from:], [chunk for i, chunk in enumerate(chunks) if i in kept_chunks]
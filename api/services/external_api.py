@@ -1,232 +1,533 @@
+import asyncio
 import httpx
-import os
+import time
 from config import settings
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Tuple
+from contextlib import asynccontextmanager, AsyncExitStack
 import json
+from services.http_client import AlbertHTTPClient
+from services.monitoring import ALBERT_RETRIES, ALBERT_HEDGED_REQUESTS
+from services.concurrency_limiter import limiter_for
+from services.resilience import (
+    REFUSED_STATUSES, TRANSIENT_STATUSES, CONNECT_ERRORS,
+    CircuitBreaker, backoff_delay, breaker_for, latency_for, parse_retry_after
+)
+from services.search_cache import search_cache
+from services.single_flight import SingleFlight
+from services.upstream_metrics import observe_request, observe_size, record_usage, messages_size
+from services.quota import quota_tracker
+from utils.exceptions import UpstreamUnavailableException
+from utils.file_streams import multipart_file_upload
+
+# Process-wide single-flight groups for idempotent calls, shared by every AlbertAIService instance
+_flights = {
+    "search": SingleFlight("search"),
+    "models": SingleFlight("models"),
+    "documents": SingleFlight("documents"),
+    "rephrase": SingleFlight("rephrase"),
+}
+
+_IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+# Answers that mean Albert AI (or its gateway) is overloaded; they shrink the concurrency limit
+OVERLOAD_STATUSES = REFUSED_STATUSES + TRANSIENT_STATUSES
+
+
+def _endpoint_of(path: str) -> str:
+    """Endpoint label of an Albert AI path, e.g. /documents/<id> -> documents"""
+    return path.strip("/").split("/")[0] or "root"
+
 
 class AlbertAIService:
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.base_url = f"{settings.ALBERT_AI_BASE_URL}/v1"
         self.api_key = settings.ALBERT_AI_API_KEY
         self.embeddings_model = settings.ALBERT_AI_EMBEDDINGS_MODEL
         self.llm_model = settings.ALBERT_AI_LLM_MODEL
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared pooled client, unless one was injected explicitly"""
+        return self._client or AlbertHTTPClient.get_client()
+
+    def _headers(self, kwargs: Dict[str, Any]) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}", **kwargs.pop("headers", {})}
+
+    def _outcome(
+        self,
+        breaker: CircuitBreaker,
+        idempotent: bool,
+        response: Optional[httpx.Response] = None,
+        error: Optional[Exception] = None
+    ) -> Tuple[bool, str, Optional[float]]:
+        """Record an attempt on the breaker and decide whether to retry it.
+
+        Returns:
+            (retryable, reason, retry_after)
+        """
+        if error is not None:
+            breaker.record_failure()
+            if isinstance(error, CONNECT_ERRORS):
+                return True, "connect", None
+            return idempotent, "transport", None
+
+        status = response.status_code
+        if status >= 500 or status == 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        retryable = status in REFUSED_STATUSES or (idempotent and status in TRANSIENT_STATUSES)
+        return retryable, str(status), parse_retry_after(response.headers.get("Retry-After"))
+
+    async def _hedged(self, endpoint: str, send: Callable) -> httpx.Response:
+        """Send a request, racing a second copy once it runs past the endpoint's p95.
+
+        Called with a concurrency slot held for the first copy; the second copy
+        takes a slot of its own, and is only sent when one is free right away.
+        Both copies are cancelled when the caller stops waiting.
+        """
+        tracker = latency_for(endpoint)
+        limiter = limiter_for(endpoint)
+        threshold = tracker.percentile(0.95) if settings.ALBERT_AI_HEDGE_SEARCH else None
+        start_time = time.perf_counter()
+        primary = asyncio.ensure_future(send())
+        primary.add_done_callback(lambda _: tracker.observe(time.perf_counter() - start_time))
+        tasks = [primary]
+        try:
+            if threshold is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if done:
+                return primary.result()
+            if not limiter.has_capacity():
+                ALBERT_HEDGED_REQUESTS.labels(endpoint=endpoint, outcome="skipped").inc()
+                return await primary
+
+            async def send_hedge() -> httpx.Response:
+                async with limiter.slot() as slot:
+                    response = await send()
+                    slot.record(overloaded=response.status_code in OVERLOAD_STATUSES)
+                    return response
+
+            ALBERT_HEDGED_REQUESTS.labels(endpoint=endpoint, outcome="launched").inc()
+            hedge = asyncio.ensure_future(send_hedge())
+            tasks.append(hedge)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            ALBERT_HEDGED_REQUESTS.labels(endpoint=endpoint, outcome="won").inc()
+                        return task.result()
+            # Both copies failed
+            return primary.result()
+        finally:
+            # Losing copies, and every copy when the caller was cancelled
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        idempotent: Optional[bool] = None,
+        hedge: bool = False,
+        request_factory: Optional[Callable[[], Dict[str, Any]]] = None,
+        assistant_id: Optional[int] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request to Albert AI over the shared connection pool.
+
+        Failed attempts are retried with jittered exponential backoff: always
+        when Albert AI refused the request (429/503, connection errors), and
+        also on 502/504 and read errors when the call is idempotent. Each
+        endpoint has a circuit breaker that fails fast while it is degraded,
+        and each attempt holds a slot of the endpoint class's adaptive
+        concurrency limit (see services.concurrency_limiter).
+
+        Args:
+            method: HTTP method
+            path: Path under /v1
+            idempotent: Whether the call may be repeated safely (default: by method)
+            hedge: Race a second copy of slow requests (see _hedged)
+            request_factory: Returns fresh request kwargs for each attempt, for
+                bodies that can only be sent once (e.g. open files)
+            assistant_id: Assistant the call is made for (metrics label)
+
+        Raises:
+            UpstreamUnavailableException: the breaker is open, the concurrency
+                queue is full or timed out, or Albert AI kept failing until
+                retries ran out
+        """
+        endpoint = _endpoint_of(path)
+        breaker = breaker_for(endpoint)
+        limiter = limiter_for(endpoint)
+        if idempotent is None:
+            idempotent = method.upper() in _IDEMPOTENT_METHODS
+        headers = self._headers(kwargs)
+        model = (kwargs.get("json") or {}).get("model")
+        attempts = max(settings.ALBERT_AI_RETRY_ATTEMPTS, 1)
+
+        for attempt in range(1, attempts + 1):
+            breaker.before_call()
+            request_kwargs = {**kwargs, **(request_factory() if request_factory else {})}
+
+            def send():
+                return self.client.request(method, f"{self.base_url}{path}", headers=headers, **request_kwargs)
+
+            start_time = time.perf_counter()
+            try:
+                async with limiter.slot() as slot:
+                    response = await (self._hedged(endpoint, send) if hedge else send())
+                    slot.record(overloaded=response.status_code in OVERLOAD_STATUSES)
+            except httpx.TransportError as e:
+                observe_request(endpoint, model, assistant_id, "error", time.perf_counter() - start_time)
+                retryable, reason, retry_after = self._outcome(breaker, idempotent, error=e)
+                if not retryable or attempt == attempts:
+                    raise UpstreamUnavailableException() from e
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                observe_request(endpoint, model, assistant_id, str(response.status_code), time.perf_counter() - start_time)
+                retryable, reason, retry_after = self._outcome(breaker, idempotent, response=response)
+                if not retryable:
+                    return response
+                if attempt == attempts:
+                    raise UpstreamUnavailableException(retry_after=retry_after)
+
+            ALBERT_RETRIES.labels(endpoint=endpoint, reason=reason).inc()
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+    @asynccontextmanager
+    async def _stream(
+        self,
+        method: str,
+        path: str,
+        idempotent: Optional[bool] = None,
+        assistant_id: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Open a streaming request to Albert AI over the shared connection pool.
+
+        Retries and the circuit breaker apply as in _request, but only until
+        the response starts; a stream that fails midway is not replayed. The
+        latency recorded (as "<endpoint>_stream") is the time to response start.
+        """
+        endpoint = _endpoint_of(path)
+        breaker = breaker_for(endpoint)
+        limiter = limiter_for(endpoint)
+        if idempotent is None:
+            idempotent = method.upper() in _IDEMPOTENT_METHODS
+        headers = self._headers(kwargs)
+        model = (kwargs.get("json") or {}).get("model")
+        attempts = max(settings.ALBERT_AI_RETRY_ATTEMPTS, 1)
+
+        for attempt in range(1, attempts + 1):
+            breaker.before_call()
+            async with AsyncExitStack() as stack:
+                slot = None
+                start_time = time.perf_counter()
+                try:
+                    # The slot is held until the stream is closed, but sampled
+                    # once the response starts, so long answers do not read as latency
+                    slot = await stack.enter_async_context(limiter.slot())
+                    response = await stack.enter_async_context(
+                        self.client.stream(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+                    )
+                    slot.record(overloaded=response.status_code in OVERLOAD_STATUSES)
+                except httpx.TransportError as e:
+                    slot.record(overloaded=True)
+                    observe_request(f"{endpoint}_stream", model, assistant_id, "error", time.perf_counter() - start_time)
+                    retryable, reason, retry_after = self._outcome(breaker, idempotent, error=e)
+                    if not retryable or attempt == attempts:
+                        raise UpstreamUnavailableException() from e
+                except BaseException:
+                    breaker.release()
+                    raise
+                else:
+                    observe_request(
+                        f"{endpoint}_stream", model, assistant_id, str(response.status_code), time.perf_counter() - start_time
+                    )
+                    retryable, reason, retry_after = self._outcome(breaker, idempotent, response=response)
+                    if not retryable:
+                        yield response
+                        return
+                    if attempt == attempts:
+                        raise UpstreamUnavailableException(retry_after=retry_after)
+
+            ALBERT_RETRIES.labels(endpoint=endpoint, reason=reason).inc()
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
 
     async def query_ai_model(self, prompt: str):
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/query",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                json={"prompt": prompt}
-            )
-            return response.json()
+        response = await self._request("POST", "/query", json={"prompt": prompt})
+        return response.json()
 
     async def list_models(self):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/models",
-                headers={"Authorization": f"Bearer {self.api_key}"}
-            )
+        async def fetch():
+            response = await self._request("GET", "/models")
             return response.json()
 
+        return await _flights["models"].do(self.api_key, fetch)
+
     async def create_collection(self, collection_name: str) -> dict:
         """Create a new collection for embeddings"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/collections",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "name": collection_name,
-                    "model": self.embeddings_model
-                }
-            )
-            return response.json()
+        response = await self._request(
+            "POST",
+            "/collections",
+            json={
+                "name": collection_name,
+                "model": self.embeddings_model
+            }
+        )
+        return response.json()
 
     async def delete_collection(self, collection_id: str) -> dict:
         """Delete a collection by its ID"""
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{self.base_url}/collections/{collection_id}",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-            )
-            return response.json()
+        response = await self._request("DELETE", f"/collections/{collection_id}")
+        return response.json()
 
-    async def upload_file(self, file_path: str, collection_id: str) -> dict:
-        """Upload a file to Albert AI and associate it with a collection"""
-        async with httpx.AsyncClient() as client:
-            try:
-                with open(file_path, "rb") as f:
-                    request_json = {"collection": collection_id}
-                    files = {
-                        "file": (
-                            os.path.basename(file_path),
-                            f,
-                            "application/pdf"
-                        ),
-                        "request": (
-                            None,
-                            json.dumps(request_json),
-                            "application/json"
-                        )
-                    }
+    async def upload_file(
+        self,
+        file_path: str,
+        collection_id: str,
+        assistant_id: Optional[int] = None,
+        filename: Optional[str] = None
+    ) -> dict:
+        """Upload a file to Albert AI and associate it with a collection.
 
-                    response = await client.post(
-                        f"{self.base_url}/files",
-                        headers={
-                            "Authorization": f"Bearer {self.api_key}"
-                        },
-                        files=files
-                    )
-                    
-                    # Accept both 200 and 201 as success
-                    if response.status_code not in (200, 201):
-                        raise ValueError(f"Upload failed with status {response.status_code}: {response.text}")
+        The multipart body is streamed from disk in chunks, so memory use does
+        not grow with the file and the event loop never blocks on file reads.
+        The document is named filename, or after the file on disk.
+        """
+        headers, build_request = await multipart_file_upload(
+            file_path, "application/pdf", {"request": {"collection": collection_id}}, filename=filename
+        )
+        response = await self._request(
+            "POST", "/files", request_factory=build_request, assistant_id=assistant_id, headers=headers
+        )
 
-                    # Handle empty response
-                    if not response.text:
-                        return {"status": "success", "code": response.status_code}
-                    return response.json()
+        # Accept both 200 and 201 as success
+        if response.status_code not in (200, 201):
+            raise ValueError(f"Upload failed with status {response.status_code}: {response.text}")
 
-            except Exception as e:
-                raise
+        # Handle empty response
+        if not response.text:
+            return {"status": "success", "code": response.status_code}
+        return response.json()
 
     async def get_documents(self, collection_id: str) -> List[Dict[str, Any]]:
         """Get all documents for a collection"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/documents/{collection_id}",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-            )
+        async def fetch():
+            response = await self._request("GET", f"/documents/{collection_id}")
             data = response.json()
             return data.get("data", [])  # Return just the data array from response
 
+        # The collection version is bumped after uploads and deletes, so a call
+        # made after a change never joins a listing started before it
+        key = (collection_id, search_cache.collection_version(collection_id))
+        return list(await _flights["documents"].do(key, fetch))
+
+    async def get_documents_page(self, collection_id: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get one page of the documents of a collection"""
+        response = await self._request(
+            "GET", f"/documents/{collection_id}", params={"limit": limit, "offset": offset}
+        )
+        if response.status_code != 200:
+            raise ValueError(f"Listing documents failed with status {response.status_code}: {response.text}")
+        return response.json().get("data", [])
+
+    async def list_collections(self) -> List[Dict[str, Any]]:
+        """Get the collections of the API key, with their document counts"""
+        response = await self._request("GET", "/collections")
+        if response.status_code != 200:
+            raise ValueError(f"Listing collections failed with status {response.status_code}: {response.text}")
+        return response.json().get("data", [])
+
     async def delete_document(self, collection_id: str, document_id: str) -> dict:
         """Delete a document from a collection"""
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{self.base_url}/documents/{collection_id}/{document_id}",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-            )
-            return response.json()
+        response = await self._request("DELETE", f"/documents/{collection_id}/{document_id}")
+        return response.json()
 
-    async def search_collection(self, collection_id: str, query: str, k: int = 6) -> List[Dict[str, Any]]:
+    async def search_collection(
+        self,
+        collection_id: str,
+        query: str,
+        k: int = 6,
+        method: str = "semantic",
+        assistant_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         Search a collection for relevant chunks based on a query.
+
+        Results are cached per collection version; see services.search_cache.
+        Concurrent identical searches that miss the cache share one request.
         
         Args:
             collection_id: The ID of the collection to search
             query: The search query
             k: Number of results to return (default: 6)
+            method: Albert AI search method (semantic, lexical or hybrid)
+            assistant_id: Assistant the search is made for (metrics label)
             
         Returns:
             List of dictionaries containing chunk content and metadata
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/search",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
+        cache_key = search_cache.make_key(collection_id, query, k, method)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        async def fetch():
+            response = await self._request(
+                "POST",
+                "/search",
+                idempotent=True,
+                hedge=True,
+                assistant_id=assistant_id,
                 json={
                     "collections": [collection_id],
                     "prompt": query,
                     "k": k,
-                    "method": "semantic"
+                    "method": method
                 }
             )
-            
+
             if response.status_code == 200:
                 results = response.json()
-                return [
+                chunks = [
                     {
                         "content": result["chunk"]["content"],
                         "metadata": result["chunk"]["metadata"],
                         "score": result["score"]
-                    } 
+                    }
                     for result in results.get("data", [])
                 ]
+                search_cache.put(cache_key, chunks)
+                observe_size("chunks", sum(len(chunk["content"].encode("utf-8")) for chunk in chunks), assistant_id)
+                return chunks
             else:
                 raise ValueError(f"Search failed with status {response.status_code}: {response.text}")
 
-    async def chat_with_context(self, collection_id: str, prompt: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        return list(await _flights["search"].do(cache_key, fetch))
+
+    def build_context_messages(
+        self,
+        prompt: str,
+        context: Dict[str, Any],
+        search_results: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, str]]:
         """
-        Search collection for relevant chunks and use them to answer the prompt.
-        
+        Assemble the chat/completions messages for a turn.
+
         Args:
-            collection_id: The ID of the collection to search
             prompt: The user's question
-            
+            context: "system" prompt and "chat_history" (list of role/content dicts)
+            search_results: Chunks returned by search_collection; when None the
+                prompt is sent as-is (no knowledge base)
+
         Returns:
-            Dict containing the response and source documents
+            List of role/content messages
         """
-        async with httpx.AsyncClient() as client:
-            # Get relevant chunks using existing search method
-            search_results = await client.post(
-                f"{self.base_url}/search",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "collections": [collection_id],
-                    "prompt": prompt,
-                    "k": 6,
-                    "method": "semantic"
-                }
-            )
-            
-            chat_history = context.get("chat_history", "")
-            messages = []
-            # add system {"role": "system", "content": context.get("system", "")}
-            messages.append({"role": "system", "content": context.get("system", "")})
-            #a add history 
-            for message in chat_history:
-                messages.append({"role": message['role'] , "content": message['content']})
+        chat_history = context.get("chat_history", [])
+        messages = []
+        # add system {"role": "system", "content": context.get("system", "")}
+        messages.append({"role": "system", "content": context.get("system", "")})
+        #a add history 
+        for message in chat_history:
+            messages.append({"role": message['role'] , "content": message['content']})
+        if search_results is not None:
             prompt_template = "Réponds à la question suivante en te basant sur les documents ci-dessous : {prompt}\n\nDocuments :\n\n{chunks}"
-            chunks = "\n\n\n".join([result["chunk"]["content"] for result in search_results.json()["data"]])
-            sources = set([result["chunk"]["metadata"]["document_name"] for result in search_results.json()["data"]])
+            chunks = "\n\n\n".join([result["content"] for result in search_results])
             prompt = prompt_template.format(prompt=prompt, chunks=chunks)
-            messages.append({"role": "user", "content": prompt})
-            data = {
-                "model": self.llm_model,
-                "messages": messages,
-                "stream": False,
-                "n": 1,
-                "temperature": 0.7,
+        messages.append({"role": "user", "content": prompt})
+        return messages
 
-            }
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                json=data
-            )
+    def _account_completion(self, messages: List[Dict[str, str]], result: Dict[str, Any], assistant_id: Optional[int]):
+        """Record prompt/response sizes and token usage of a /chat/completions response"""
+        observe_size("prompt", messages_size(messages), assistant_id)
+        record_usage(result.get("usage"), result.get("model") or self.llm_model, assistant_id)
+        quota_tracker.record_usage(result.get("usage"), assistant_id)
+        choices = result.get("choices") or []
+        if choices:
+            content = (choices[0].get("message") or {}).get("content") or ""
+            observe_size("response", len(content.encode("utf-8")), assistant_id)
+
+    async def chat_completion(self, messages: List[Dict[str, str]], assistant_id: Optional[int] = None) -> Dict[str, Any]:
+        """Send messages to /chat/completions and return the full response"""
+        data = {
+            "model": self.llm_model,
+            "messages": messages,
+            "stream": False,
+            "n": 1,
+            "temperature": 0.7,
+        }
+        # Completions have no side effects upstream, so they are safe to retry
+        response = await self._request("POST", "/chat/completions", idempotent=True, assistant_id=assistant_id, json=data)
+        if response.status_code != 200:
+            print(f"Error: {response.status_code} - {response.text}")
+            raise ValueError(f"Request failed with status {response.status_code}")
+        result = response.json()
+        self._account_completion(messages, result, assistant_id)
+        return result
+
+    async def stream_chat_completion(self, messages: List[Dict[str, str]], assistant_id: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Send messages to /chat/completions with streaming enabled.
+
+        Yields:
+            Content deltas as they arrive from Albert AI
+        """
+        data = {
+            "model": self.llm_model,
+            "messages": messages,
+            "stream": True,
+            # Token usage comes in a last chunk with no choices
+            "stream_options": {"include_usage": True},
+            "n": 1,
+            "temperature": 0.7,
+        }
+        observe_size("prompt", messages_size(messages), assistant_id)
+        response_size = 0
+        async with self._stream("POST", "/chat/completions", idempotent=True, assistant_id=assistant_id, json=data) as response:
             if response.status_code != 200:
-                print(f"Error: {response.status_code} - {response.text}")
-                raise ValueError(f"Request failed with status {response.status_code}")
-            else:
-                print("request worked")
-                print(response.json())
-            return response.json()
-            
-          
-        
+                await response.aread()
+                raise ValueError(f"Request failed with status {response.status_code}: {response.text}")
+
+            async for line in response.aiter_lines():
+                # Server-sent events: only "data: ..." lines carry chunks
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                record_usage(chunk.get("usage"), chunk.get("model") or self.llm_model, assistant_id)
+                quota_tracker.record_usage(chunk.get("usage"), assistant_id)
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    response_size += len(delta.encode("utf-8"))
+                    yield delta
+        observe_size("response", response_size, assistant_id)
 
-    async def rephrase_with_tone(self, message: str, tone: str) -> str:
+    async def rephrase_with_tone(self, message: str, tone: str, assistant_id: Optional[int] = None) -> str:
         """
         Rephrase a message according to a specific tone using the AI model.
         
         Args:
             message: The message to rephrase
             tone: The tone to use (e.g., PROFESSIONAL, FRIENDLY, etc.)
+            assistant_id: Assistant the message is for (metrics label)
             
         Returns:
             The rephrased message
@@ -251,20 +552,20 @@ class AlbertAIService:
         """
 
         prompt = f"{tone_prompts.get(tone, tone_prompts['PROFESSIONAL'])} : {message}"
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
+        async def fetch():
+            response = await self._request(
+                "POST",
+                "/chat/completions",
+                idempotent=True,
+                assistant_id=assistant_id,
                 json={
                     "model": self.llm_model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
+                    "messages": messages,
                     "stream": False,
                     "n": 1,
                     "temperature": 0.7  # Add some randomness but not too much
@@ -275,8 +576,79 @@ class AlbertAIService:
                 raise ValueError(f"Failed to rephrase message: {response.text}")
 
             result = response.json()
+            self._account_completion(messages, result, assistant_id)
             # Clean up the response by removing quotes and extra whitespace
             response_text = result["choices"][0]["message"]["content"]
             response_text = response_text.strip('"\'').strip()
             return response_text
 
+        # Tokens are charged to the leader's assistant (and its owner), so
+        # only calls made for the same assistant share a completion
+        return await _flights["rephrase"].do((assistant_id, message, tone), fetch)
+
+
+    async def summarize_conversation(
+        self,
+        previous_summary: Optional[str],
+        turns: List[Dict[str, str]],
+        assistant_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Fold new conversation turns into a running summary.
+
+        Args:
+            previous_summary: The current summary, if any
+            turns: New role/content messages, oldest first
+            assistant_id: Assistant the chat belongs to (metrics label)
+
+        Returns:
+            The full /chat/completions response (summary text and usage)
+        """
+        system_prompt = """Tu mets à jour le résumé d'une conversation entre un usager et un assistant.
+        Instructions:
+        - Intègre les nouveaux échanges au résumé existant
+        - Conserve les demandes de l'usager, les faits utiles, les réponses données et les décisions
+        - Réponds uniquement avec le résumé mis à jour, en français, en moins de 200 mots
+        """
+
+        transcript = "\n".join(
+            f"{'Assistant' if turn['role'] == 'assistant' else 'Usager'} : {turn['content']}"
+            for turn in turns
+        )
+        prompt = f"Résumé actuel :\n{previous_summary or '(aucun)'}\n\nNouveaux échanges :\n{transcript}"
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+        response = await self._request(
+            "POST",
+            "/chat/completions",
+            idempotent=True,
+            assistant_id=assistant_id,
+            json={
+                "model": self.llm_model,
+                "messages": messages,
+                "stream": False,
+                "n": 1,
+                "temperature": 0.2
+            }
+        )
+
+        if response.status_code != 200:
+            raise ValueError(f"Failed to summarize conversation: {response.text}")
+        result = response.json()
+        self._account_completion(messages, result, assistant_id)
+        return result
+
+
+_albert_service: Optional[AlbertAIService] = None
+
+
+def get_albert_service() -> AlbertAIService:
+    """FastAPI dependency returning the process-wide Albert AI service"""
+    global _albert_service
+    if _albert_service is None:
+        _albert_service = AlbertAIService()
+    return _albert_service
+
@@ -1,93 +1,309 @@
-import os
-import shutil
+import asyncio
+import zipfile
+import aiofiles.os
 from fastapi import UploadFile
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select
 from db.models import AssistantFile
-from models.assistant_file import AssistantFileCreate
+from models.assistant_file import AssistantFileCreate, FileStatus
 from services.collection_service import CollectionService
-from services.external_api import AlbertAIService
+from services.external_api import AlbertAIService, get_albert_service
+from services.search_cache import search_cache
+from services.lexical_index import lexical_indexes
+from services.stage_timing import stage
+from services.monitoring import (
+    BULK_UPLOAD_FILES, ALBERT_DOCUMENT_ID_LOOKUPS, UPLOAD_DEDUP_FILES, UPLOAD_DEDUP_BYTES_SAVED
+)
+from services.blob_store import blob_store
+from services.albert_document_service import AlbertDocumentService
+from services.ingestion_queue import ingestion_queue
+from utils.exceptions import FileTooLargeException
+from utils.file_streams import copy_file, file_sha256, write_stream
+from config import settings
 import logging
 
-UPLOAD_DIR = Path(__file__).parent.parent / "uploads"
 ALLOWED_EXTENSIONS = {'.pdf', '.md', '.txt'}
+ARCHIVE_EXTENSIONS = {'.zip'}
 
 logger = logging.getLogger(__name__)
 
 class FileService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, albert_service: Optional[AlbertAIService] = None):
         self.db = db
-        self.collection_service = CollectionService(db)
-        self.albert_service = AlbertAIService()
-        UPLOAD_DIR.mkdir(exist_ok=True)
+        self.albert_service = albert_service or get_albert_service()
+        self.collection_service = CollectionService(db, self.albert_service)
+        self.document_service = AlbertDocumentService(db)
 
     def _is_allowed_file(self, filename: str) -> bool:
         return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
 
     async def save_file(self, file: UploadFile, help_assistant_id: int) -> AssistantFile:
-        """Save file locally and upload to Albert AI if collection exists"""
+        """Save file locally and queue its ingestion into Albert AI"""
         if not self._is_allowed_file(file.filename):
             raise ValueError("File type not allowed")
 
-        # Get collection for the assistant
-        collection = await self.collection_service.get_by_help_assistant(help_assistant_id)
-        
-        # Create assistant-specific directory
-        assistant_dir = UPLOAD_DIR / str(help_assistant_id)
-        assistant_dir.mkdir(exist_ok=True)
+        # Stream to a temporary file; size and hash are computed on the way
+        await blob_store.prepare()
+        temp_path = blob_store.temp_path()
+        with stage("write_file"):
+            file_size, sha256 = await write_stream(file, temp_path, settings.UPLOAD_MAX_FILE_BYTES)
+
+        file_type = Path(file.filename).suffix.lower()
+        blob_path, created = None, False
+        try:
+            with stage("persist_file"):
+                # Content already stored for any assistant is shared, not written again
+                blob_path, created = await blob_store.store(self.db, temp_path, sha256, file_type, file_size)
+                # The row and its ingestion job are committed together, so every
+                # pending file is picked up by a worker
+                db_file = AssistantFile(
+                    filename=file.filename,
+                    file_type=file_type,
+                    file_size=file_size,
+                    file_path=str(blob_path),
+                    sha256=sha256,
+                    help_assistant_id=help_assistant_id,
+                    status=FileStatus.PENDING.value
+                )
+                self.db.add(db_file)
+                await self.db.flush()
+                ingestion_queue.enqueue(self.db, db_file)
+                await self.db.commit()
+                await self.db.refresh(db_file)
+        except Exception as e:
+            await self.db.rollback()
+            if blob_path is None:
+                await blob_store.discard(temp_path)
+            elif created:
+                await blob_store.collect(self.db, sha256, file_type)
+            raise e
+
+        ingestion_queue.notify()
+        return db_file
+
+    async def ingest(self, db_file: AssistantFile, retry: bool = False):
+        """
+        Index a stored file lexically and upload it to the assistant's collection.
+
+        Run by the ingestion workers; the caller commits the file. The
+        collection is created on first use. The document id returned by the
+        upload is recorded in albert_documents and committed right away, so a
+        retry after a later failure reuses the document instead of uploading
+        the file again.
+
+        Args:
+            db_file: The file to ingest
+            retry: Whether an earlier attempt may have uploaded the file already
+        """
+        # Local lexical index; failures there must not fail the ingestion
+        try:
+            await lexical_indexes.add_file(db_file.help_assistant_id, db_file.id, db_file.filename, db_file.file_path)
+        except Exception as e:
+            logger.error(f"Failed to index {db_file.file_path} lexically: {e}")
+
+        collection = await self.collection_service.get_by_help_assistant(db_file.help_assistant_id)
+        db_file.assistant_collection_id = collection.albert_id
+
+        if retry:
+            existing = await self.document_service.find_for_file(collection.albert_id, db_file.id)
+            if existing:
+                db_file.albert_ai_id = existing.document_id
+                return
 
-        # Save file locally
-        file_path = assistant_dir / file.filename
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Files saved before hashes were recorded are hashed now
+        sha256 = db_file.sha256 or await asyncio.to_thread(file_sha256, db_file.file_path)
+
+        # Identical content already in the collection (hence embedded with the
+        # same model) is linked to the existing document instead of re-uploaded
+        duplicate = await self.document_service.find_by_hash(collection.albert_id, sha256)
+        if duplicate:
+            db_file.albert_ai_id = duplicate.document_id
+            UPLOAD_DEDUP_FILES.labels(layer="albert", result="duplicate").inc()
+            UPLOAD_DEDUP_BYTES_SAVED.labels(layer="albert").inc(db_file.file_size)
+            return
 
         try:
-            # Create database record
-            db_file = AssistantFile(
-                filename=file.filename,
-                file_type=Path(file.filename).suffix.lower(),
-                file_size=os.path.getsize(file_path),
-                file_path=str(file_path),
-                help_assistant_id=help_assistant_id,
-                assistant_collection_id=collection.albert_id if collection else None
+            response = await self.albert_service.upload_file(
+                file_path=db_file.file_path,
+                collection_id=collection.albert_id,
+                assistant_id=db_file.help_assistant_id,
+                filename=db_file.filename
+            )
+        finally:
+            # The collection may have changed even if the call failed midway
+            await search_cache.invalidate_collection(collection.albert_id)
+
+        document_id = response.get("id")
+        if document_id is None:
+            # Older deployments do not return the id: fall back to listing the collection
+            ALBERT_DOCUMENT_ID_LOOKUPS.labels(source="listing").inc()
+            document = await self._find_document(collection.albert_id, db_file.filename)
+            document_id = document["id"] if document else None
+        else:
+            ALBERT_DOCUMENT_ID_LOOKUPS.labels(source="upload").inc()
+
+        UPLOAD_DEDUP_FILES.labels(layer="albert", result="new").inc()
+        if document_id is not None:
+            db_file.albert_ai_id = str(document_id)
+            self.document_service.record(
+                collection_id=collection.albert_id,
+                document_id=str(document_id),
+                name=db_file.filename,
+                sha256=sha256,
+                file_id=db_file.id
             )
-            
-            self.db.add(db_file)
             await self.db.commit()
-            await self.db.refresh(db_file)
 
-            # Upload to Albert AI if collection exists
-            if collection:
-                try:
-                    await self.albert_service.upload_file(
-                        file_path=str(file_path),
-                        collection_id=collection.albert_id
-                    )
-                    
-                    # Get documents to find the ID of our newly uploaded file
-                    documents = await self.albert_service.get_documents(collection.albert_id)
-                    
-                    # Find the most recently created document with matching filename
-                    matching_docs = [
-                        doc for doc in documents 
-                        if doc["name"] == file.filename
+    async def _find_document(self, collection_id: str, filename: str) -> Optional[Dict[str, Any]]:
+        """The most recently created document of a collection with this name"""
+        documents = await self.albert_service.get_documents(collection_id)
+        matching_docs = [doc for doc in documents if doc["name"] == filename]
+        if not matching_docs:
+            return None
+        return max(matching_docs, key=lambda x: x["created_at"])
+
+    def _stage_uploads(self, uploads: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Write uploaded files and the allowed members of zip archives to temporary files.
+
+        Blocking; meant to run in a worker thread. Files are copied in chunks,
+        so neither uploads nor archive members are held in memory, and their
+        size and hash are computed during the copy.
+
+        Args:
+            uploads: (filename, binary file object) pairs
+
+        Returns:
+            One entry per file: "filename", then "path", "size" and "sha256"
+            when it was written or "error" when it was rejected
+        """
+        entries: List[Dict[str, Any]] = []
+        seen = set()
+
+        def stage_one(filename: str, source) -> Dict[str, Any]:
+            if not self._is_allowed_file(filename):
+                return {"filename": filename, "error": "File type not allowed"}
+            if filename in seen:
+                return {"filename": filename, "error": "Duplicate file name in upload"}
+            if len(seen) >= settings.BULK_UPLOAD_MAX_FILES:
+                return {"filename": filename, "error": f"More than {settings.BULK_UPLOAD_MAX_FILES} files in upload"}
+            seen.add(filename)
+            file_path = blob_store.temp_path()
+            try:
+                size, sha256 = copy_file(source, file_path, settings.UPLOAD_MAX_FILE_BYTES)
+            except FileTooLargeException as e:
+                return {"filename": filename, "error": e.detail}
+            except (OSError, zipfile.BadZipFile) as e:
+                return {"filename": filename, "error": f"Failed to store file: {str(e)}"}
+            return {"filename": filename, "path": file_path, "size": size, "sha256": sha256}
+
+        for filename, source in uploads:
+            filename = Path(filename or "").name
+            if Path(filename).suffix.lower() not in ARCHIVE_EXTENSIONS:
+                entries.append(stage_one(filename, source))
+                continue
+            try:
+                with zipfile.ZipFile(source) as archive:
+                    members = [
+                        member for member in archive.infolist()
+                        if not member.is_dir()
+                        and not member.filename.startswith("__MACOSX/")
+                        and not Path(member.filename).name.startswith(".")
                     ]
-                    if matching_docs:
-                        newest_doc = max(matching_docs, key=lambda x: x["created_at"])
-                        db_file.albert_ai_id = newest_doc["id"]
-                        await self.db.commit()
+                    # Declared sizes are enforced while reading, which guards
+                    # against archives that expand far beyond their upload size
+                    extracted_size = sum(member.file_size for member in members)
+                    if extracted_size > settings.BULK_UPLOAD_MAX_EXTRACTED_BYTES:
+                        entries.append({"filename": filename, "error": "Archive is too large once extracted"})
+                        continue
+                    for member in members:
+                        with archive.open(member) as member_file:
+                            entries.append(stage_one(Path(member.filename).name, member_file))
+            except zipfile.BadZipFile:
+                entries.append({"filename": filename, "error": "Invalid zip archive"})
+        return entries
 
-                except Exception as e:
-                    raise ValueError(f"Failed to upload file to Albert AI: {str(e)}")
+    async def save_files(self, files: List[UploadFile], help_assistant_id: int) -> Dict[str, Any]:
+        """
+        Save several files (zip archives are expanded) and queue their ingestion.
 
-            return db_file
+        Files are stored in the blob store and their rows and ingestion jobs
+        committed in batches of BULK_UPLOAD_COMMIT_SIZE. A file that is
+        rejected is reported without affecting the others.
 
-        except Exception as e:
-            if file_path.exists():
-                file_path.unlink()
-            raise e
+        Args:
+            files: Uploaded files
+            help_assistant_id: The assistant the files belong to
+
+        Returns:
+            "files": per-file "filename", "status" ("pending" or "failed"),
+            "file_id" and "error"; plus "pending" and "failed" counts
+        """
+        await blob_store.prepare()
+        with stage("write_file"):
+            entries = await asyncio.to_thread(
+                self._stage_uploads, [(file.filename, file.file) for file in files]
+            )
+
+        staged = [entry for entry in entries if "path" in entry]
+        with stage("persist_file"):
+            for start in range(0, len(staged), settings.BULK_UPLOAD_COMMIT_SIZE):
+                # Blob rows are locked in hash order, so concurrent batches cannot deadlock
+                batch = sorted(staged[start:start + settings.BULK_UPLOAD_COMMIT_SIZE], key=lambda entry: entry["sha256"])
+                try:
+                    for entry in batch:
+                        file_type = Path(entry["filename"]).suffix.lower()
+                        entry["path"], entry["created"] = await blob_store.store(
+                            self.db, entry["path"], entry["sha256"], file_type, entry["size"]
+                        )
+                        entry["stored"] = True
+                        entry["file"] = AssistantFile(
+                            filename=entry["filename"],
+                            file_type=file_type,
+                            file_size=entry["size"],
+                            file_path=str(entry["path"]),
+                            sha256=entry["sha256"],
+                            help_assistant_id=help_assistant_id,
+                            status=FileStatus.PENDING.value
+                        )
+                    self.db.add_all([entry["file"] for entry in batch])
+                    await self.db.flush()
+                    for entry in batch:
+                        ingestion_queue.enqueue(self.db, entry["file"])
+                    await self.db.commit()
+                except Exception as e:
+                    await self.db.rollback()
+                    logger.error(f"Failed to save a batch of files for assistant {help_assistant_id}: {e}")
+                    for entry in batch:
+                        entry.pop("file", None)
+                        entry["error"] = f"Failed to save file: {str(e)}"
+                        # Temporary files not stored yet, and blobs this batch created
+                        if not entry.get("stored"):
+                            await blob_store.discard(entry["path"])
+                        elif entry.get("created"):
+                            await blob_store.collect(
+                                self.db, entry["sha256"], Path(entry["filename"]).suffix.lower()
+                            )
+                else:
+                    ingestion_queue.notify()
+
+        results = []
+        for entry in entries:
+            status = "failed" if "error" in entry else FileStatus.PENDING.value
+            BULK_UPLOAD_FILES.labels(status=status).inc()
+            results.append({
+                "filename": entry["filename"],
+                "status": status,
+                "file_id": entry["file"].id if "file" in entry else None,
+                "error": entry.get("error")
+            })
+        return {
+            "files": results,
+            "pending": sum(result["status"] == FileStatus.PENDING.value for result in results),
+            "failed": sum(result["status"] == "failed" for result in results)
+        }
 
     async def get_assistant_files(self, help_assistant_id: int) -> List[AssistantFile]:
         result = await self.db.execute(
@@ -95,6 +311,17 @@ class FileService:
         )
         return result.scalars().all()
 
+    async def _document_shared(self, db_file: AssistantFile) -> bool:
+        """Whether another file is linked to the same Albert AI document"""
+        result = await self.db.execute(
+            select(func.count()).select_from(AssistantFile).filter(
+                AssistantFile.assistant_collection_id == db_file.assistant_collection_id,
+                AssistantFile.albert_ai_id == db_file.albert_ai_id,
+                AssistantFile.id != db_file.id
+            )
+        )
+        return result.scalar() > 0
+
     async def delete_file(self, file_id: int):
         result = await self.db.execute(
             select(AssistantFile).filter(AssistantFile.id == file_id)
@@ -103,8 +330,9 @@ class FileService:
         
         if db_file:
             try:
-                # Delete from Albert AI if it exists there
-                if db_file.assistant_collection_id and db_file.albert_ai_id:
+                # Delete from Albert AI if it exists there, unless deduplicated
+                # uploads of the same content still use the document
+                if db_file.assistant_collection_id and db_file.albert_ai_id and not await self._document_shared(db_file):
                     try:
                         await self.albert_service.delete_document(
                             collection_id=db_file.assistant_collection_id,
@@ -113,12 +341,25 @@ class FileService:
                     except Exception as e:
                         # Log error but continue with local deletion
                         print(f"Failed to delete file from Albert AI: {str(e)}")
+                    finally:
+                        await search_cache.invalidate_collection(db_file.assistant_collection_id)
+                    await self.document_service.remove(db_file.assistant_collection_id, db_file.albert_ai_id)
+
+                await lexical_indexes.remove_file(db_file.help_assistant_id, db_file.id)
+                await ingestion_queue.cancel(self.db, db_file.id)
 
-                # Delete physical file
-                os.remove(db_file.file_path)
+                # Delete physical file, or this file's reference to its blob
+                last_reference = False
+                if db_file.sha256 and blob_store.is_blob(db_file.file_path):
+                    last_reference = await blob_store.release(self.db, db_file.sha256, db_file.file_type)
+                else:
+                    await aiofiles.os.remove(db_file.file_path)
                 # Delete database record
                 await self.db.delete(db_file)
                 await self.db.commit()
+                # The blob file goes only once its row is gone for good
+                if last_reference:
+                    await blob_store.collect(self.db, db_file.sha256, db_file.file_type)
                 
             except Exception as e:
                 await self.db.rollback()
@@ -0,0 +1,121 @@
+import time
+import logging
+from typing import Optional
+
+import httpx
+
+from config import settings
+from services.monitoring import ALBERT_POOL_CONNECTIONS, ALBERT_POOL_IN_FLIGHT, ALBERT_POOL_WAIT_TIME
+
+logger = logging.getLogger(__name__)
+
+# First trace events emitted once the pool has handed a connection to the request:
+# either a fresh connection starts connecting, or an existing one starts sending.
+_CONNECTION_ACQUIRED_EVENTS = (
+    "connection.connect_tcp.started",
+    "connection.connect_unix_socket.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport that reports in-flight requests and pool wait time"""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start_time = time.perf_counter()
+        acquired = False
+        upstream_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict):
+            nonlocal acquired
+            if not acquired and event_name in _CONNECTION_ACQUIRED_EVENTS:
+                acquired = True
+                ALBERT_POOL_WAIT_TIME.observe(time.perf_counter() - start_time)
+            if upstream_trace is not None:
+                await upstream_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        ALBERT_POOL_IN_FLIGHT.inc()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            ALBERT_POOL_IN_FLIGHT.dec()
+
+    def connection_counts(self) -> dict:
+        """Count pooled connections by state"""
+        counts = {"active": 0, "idle": 0}
+        for connection in self._pool.connections:
+            if connection.is_closed():
+                continue
+            counts["idle" if connection.is_idle() else "active"] += 1
+        return counts
+
+
+class AlbertHTTPClient:
+    """Process-wide keep-alive HTTP client shared by every Albert AI call.
+
+    The client is opened and closed by the application lifespan; services
+    obtain it through get_client() instead of creating their own.
+    """
+
+    _client: Optional[httpx.AsyncClient] = None
+    _transport: Optional[InstrumentedTransport] = None
+
+    @classmethod
+    def _build(cls) -> httpx.AsyncClient:
+        cls._transport = InstrumentedTransport(
+            http2=settings.ALBERT_AI_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.ALBERT_AI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ALBERT_AI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.ALBERT_AI_KEEPALIVE_EXPIRY
+            )
+        )
+        timeout = httpx.Timeout(
+            settings.ALBERT_AI_READ_TIMEOUT,
+            connect=settings.ALBERT_AI_CONNECT_TIMEOUT,
+            pool=settings.ALBERT_AI_POOL_TIMEOUT
+        )
+        return httpx.AsyncClient(transport=cls._transport, timeout=timeout)
+
+    @classmethod
+    async def start(cls) -> httpx.AsyncClient:
+        """Open the shared client (called from the application lifespan)"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = cls._build()
+            logger.info(
+                f"Albert AI HTTP pool started (http2={settings.ALBERT_AI_HTTP2}, "
+                f"max_connections={settings.ALBERT_AI_MAX_CONNECTIONS})"
+            )
+        return cls._client
+
+    @classmethod
+    async def stop(cls):
+        """Close the shared client and release all pooled connections"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            logger.info("Albert AI HTTP pool closed")
+        cls._client = None
+        cls._transport = None
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """Return the shared client, opening it lazily outside of the lifespan (scripts, shells)"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = cls._build()
+        return cls._client
+
+    @classmethod
+    def connection_counts(cls) -> dict:
+        if cls._transport is None:
+            return {"active": 0, "idle": 0}
+        return cls._transport.connection_counts()
+
+
+ALBERT_POOL_CONNECTIONS.labels(state="active").set_function(
+    lambda: AlbertHTTPClient.connection_counts()["active"]
+)
+ALBERT_POOL_CONNECTIONS.labels(state="idle").set_function(
+    lambda: AlbertHTTPClient.connection_counts()["idle"]
+)
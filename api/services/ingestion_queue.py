@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import settings
+from db.database import AsyncSessionLocal
+from db.models import AssistantFile
+from models.assistant_file import FileStatus
+from models.ingestion_job import IngestionJob, JobStatus
+from services.monitoring import (
+    INGESTION_QUEUE_DEPTH, INGESTION_JOBS, INGESTION_JOB_DURATION, INGESTION_JOB_LATENCY
+)
+from services.resilience import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# How often queue depth is sampled into the gauge
+DEPTH_REPORT_INTERVAL_SECONDS = 15
+# How often abandoned jobs are failed and finished jobs pruned
+SWEEP_INTERVAL_SECONDS = 60
+
+
+def retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Delay before re-running a job after failed attempt number `attempt` (1-based).
+
+    Exponential backoff with equal jitter, capped at INGESTION_RETRY_MAX_SECONDS;
+    a Retry-After sent by Albert AI is used as a floor.
+    """
+    ceiling = min(settings.INGESTION_RETRY_MAX_SECONDS, settings.INGESTION_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class IngestionQueue:
+    """Durable queue of file ingestions, stored in ingestion_jobs.
+
+    Uploads commit a job with the file row; workers in any API process (or in
+    `python -m worker`) claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so
+    each job runs once without the workers coordinating otherwise. At most
+    INGESTION_MAX_PER_ASSISTANT jobs of one assistant run at a time (checked
+    when claiming, so concurrent claims may briefly exceed it). A job whose
+    worker died is taken over once INGESTION_JOB_TIMEOUT_SECONDS have passed,
+    unless it has used its INGESTION_MAX_ATTEMPTS: the sweep then marks it
+    and its file failed. Finished jobs are deleted by the sweep after
+    INGESTION_JOB_RETENTION_SECONDS.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+
+    @staticmethod
+    def enqueue(session: AsyncSession, db_file: AssistantFile) -> IngestionJob:
+        """Add the ingestion job of a flushed file to the caller's transaction"""
+        job = IngestionJob(file_id=db_file.id, help_assistant_id=db_file.help_assistant_id)
+        session.add(job)
+        return job
+
+    def notify(self):
+        """Wake this process's idle workers after committing jobs"""
+        self._wakeup.set()
+
+    @staticmethod
+    async def cancel(session: AsyncSession, file_id: int):
+        """Drop the jobs of a deleted file (in the caller's transaction)"""
+        await session.execute(delete(IngestionJob).where(IngestionJob.file_id == file_id))
+
+    async def claim(self) -> Optional[IngestionJob]:
+        """Lock the oldest runnable job, mark it running and return it (None if there is none)"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.INGESTION_JOB_TIMEOUT_SECONDS)
+        running = aliased(IngestionJob)
+        busy = (
+            select(func.count())
+            .select_from(running)
+            .where(
+                running.help_assistant_id == IngestionJob.help_assistant_id,
+                running.status == JobStatus.RUNNING.value,
+                running.locked_at >= stale_before
+            )
+            .scalar_subquery()
+        )
+        query = (
+            select(IngestionJob)
+            .where(or_(
+                and_(IngestionJob.status == JobStatus.QUEUED.value, IngestionJob.run_after <= now),
+                and_(
+                    IngestionJob.status == JobStatus.RUNNING.value,
+                    IngestionJob.locked_at < stale_before,
+                    IngestionJob.attempts < settings.INGESTION_MAX_ATTEMPTS
+                )
+            ))
+            .where(busy < settings.INGESTION_MAX_PER_ASSISTANT)
+            .order_by(IngestionJob.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True, of=IngestionJob)
+        )
+        async with AsyncSessionLocal() as session:
+            job = (await session.execute(query)).scalar_one_or_none()
+            if job is None:
+                return None
+            job.status = JobStatus.RUNNING.value
+            job.locked_at = now
+            job.attempts += 1
+            await session.commit()
+            return job
+
+    async def process(self, job: IngestionJob):
+        """Run one attempt of a claimed job and record its outcome"""
+        # Imported here: file_service enqueues jobs through this module
+        from services.file_service import FileService
+
+        start_time = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            db_file = await session.get(AssistantFile, job.file_id)
+            if db_file is None:
+                # Deleted while queued
+                await self._finish(session, job, JobStatus.DONE)
+                await session.commit()
+                return
+
+            db_file.status = FileStatus.INDEXING.value
+            await session.commit()
+            try:
+                await FileService(session).ingest(db_file, retry=job.attempts > 1)
+                db_file.status = FileStatus.READY.value
+                db_file.error = None
+                await self._finish(session, job, JobStatus.DONE)
+                await session.commit()
+                INGESTION_JOBS.labels(outcome="done").inc()
+                self._observe_latency(job)
+            except Exception as e:
+                await session.rollback()
+                await self._fail(session, job, e)
+            finally:
+                INGESTION_JOB_DURATION.observe(time.perf_counter() - start_time)
+
+    async def _fail(self, session: AsyncSession, job: IngestionJob, error: Exception):
+        detail = getattr(error, "detail", None) or str(error) or type(error).__name__
+        # A file missing from disk will not come back by retrying
+        retryable = not isinstance(error, FileNotFoundError)
+        if retryable and job.attempts < settings.INGESTION_MAX_ATTEMPTS:
+            headers = getattr(error, "headers", None) or {}
+            delay = retry_delay(job.attempts, parse_retry_after(headers.get("Retry-After")))
+            logger.warning(f"Ingestion of file {job.file_id} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {detail}")
+            await session.execute(
+                update(IngestionJob).where(IngestionJob.id == job.id).values(
+                    status=JobStatus.QUEUED.value,
+                    run_after=datetime.utcnow() + timedelta(seconds=delay),
+                    locked_at=None,
+                    last_error=detail
+                )
+            )
+            file_status = FileStatus.PENDING.value
+            INGESTION_JOBS.labels(outcome="retried").inc()
+        else:
+            logger.error(f"Ingestion of file {job.file_id} failed after {job.attempts} attempts: {detail}")
+            await self._finish(session, job, JobStatus.FAILED, detail)
+            file_status = FileStatus.FAILED.value
+            INGESTION_JOBS.labels(outcome="failed").inc()
+            self._observe_latency(job)
+        await session.execute(
+            update(AssistantFile).where(AssistantFile.id == job.file_id).values(status=file_status, error=detail)
+        )
+        await session.commit()
+
+    @staticmethod
+    async def _finish(session: AsyncSession, job: IngestionJob, status: JobStatus, error: Optional[str] = None):
+        await session.execute(
+            update(IngestionJob).where(IngestionJob.id == job.id).values(
+                status=status.value,
+                locked_at=None,
+                finished_at=datetime.utcnow(),
+                last_error=error
+            )
+        )
+
+    @staticmethod
+    def _observe_latency(job: IngestionJob):
+        if job.created_at is not None:
+            INGESTION_JOB_LATENCY.observe((datetime.utcnow() - job.created_at).total_seconds())
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim an ingestion job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.INGESTION_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                await self.process(job)
+            except Exception as e:
+                # The job stays running and is taken over after the timeout
+                logger.error(f"Failed to record the outcome of ingestion job {job.id}: {e}")
+
+    async def _report_depth(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    rows = (await session.execute(
+                        select(IngestionJob.status, func.count())
+                        .where(IngestionJob.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value]))
+                        .group_by(IngestionJob.status)
+                    )).all()
+                counts = dict(rows)
+                for status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                    INGESTION_QUEUE_DEPTH.labels(status=status.value).set(counts.get(status.value, 0))
+            except Exception as e:
+                logger.error(f"Failed to sample ingestion queue depth: {e}")
+            await asyncio.sleep(DEPTH_REPORT_INTERVAL_SECONDS)
+
+    async def sweep(self, session: AsyncSession):
+        """Fail abandoned jobs that used all their attempts, and delete old finished jobs"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.INGESTION_JOB_TIMEOUT_SECONDS)
+        abandoned = (await session.execute(
+            select(IngestionJob)
+            .where(
+                IngestionJob.status == JobStatus.RUNNING.value,
+                IngestionJob.locked_at < stale_before,
+                IngestionJob.attempts >= settings.INGESTION_MAX_ATTEMPTS
+            )
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        for job in abandoned:
+            detail = f"Ingestion timed out after {job.attempts} attempts"
+            logger.error(f"Ingestion of file {job.file_id} failed: {detail}")
+            await self._finish(session, job, JobStatus.FAILED, detail)
+            await session.execute(
+                update(AssistantFile).where(AssistantFile.id == job.file_id).values(
+                    status=FileStatus.FAILED.value, error=detail
+                )
+            )
+            INGESTION_JOBS.labels(outcome="failed").inc()
+            self._observe_latency(job)
+        await session.execute(
+            delete(IngestionJob).where(
+                IngestionJob.status.in_([JobStatus.DONE.value, JobStatus.FAILED.value]),
+                IngestionJob.finished_at < now - timedelta(seconds=settings.INGESTION_JOB_RETENTION_SECONDS)
+            )
+        )
+        await session.commit()
+
+    async def _sweeper(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    await self.sweep(session)
+            except Exception as e:
+                logger.error(f"Failed to sweep the ingestion queue: {e}")
+            await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+
+    async def run(self, workers: int):
+        """Run worker coroutines, the sweep and the queue depth sampler until cancelled"""
+        await asyncio.gather(self._report_depth(), self._sweeper(), *(self._worker() for _ in range(workers)))
+
+
+ingestion_queue = IngestionQueue()
@@ -0,0 +1,452 @@
+import asyncio
+import fcntl
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from pypdf import PdfReader
+from sqlalchemy import select
+
+from config import settings
+from db.database import AsyncSessionLocal
+from db.models import AssistantFile
+from utils.background import spawn
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".lexical_index.bin"
+INDEX_FORMAT_VERSION = 1
+
+# Chunking of file text into indexed passages (in words)
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Compact postings once this share of chunks has been deleted
+COMPACTION_RATIO = 0.25
+
+# Keeps identifiers such as "cerfa 12345*01", "L.123-4" or "2024/15" as one token
+TOKEN_RE = re.compile(r"\w+(?:[.\-/*]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-insensitive tokens"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text.lower())
+
+
+def extract_text(file_path: str) -> str:
+    """Read the text of an uploaded file (.pdf, .md, .txt)"""
+    if Path(file_path).suffix.lower() == ".pdf":
+        reader = PdfReader(file_path)
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def chunk_text(text: str) -> List[str]:
+    """Split text into overlapping passages of CHUNK_WORDS words"""
+    words = text.split()
+    if not words:
+        return []
+    step = CHUNK_WORDS - CHUNK_OVERLAP
+    return [
+        " ".join(words[start:start + CHUNK_WORDS])
+        for start in range(0, max(len(words) - CHUNK_OVERLAP, 1), step)
+    ]
+
+
+def prepare_file(file_path: str) -> List[Tuple[str, Counter, int]]:
+    """Extract, chunk and tokenize a file: (text, term frequencies, length) per chunk.
+
+    CPU-bound; meant to run in a worker thread.
+    """
+    prepared = []
+    for chunk in chunk_text(extract_text(file_path)):
+        tokens = tokenize(chunk)
+        if tokens:
+            prepared.append((chunk, Counter(tokens), len(tokens)))
+    return prepared
+
+
+class LexicalIndex:
+    """BM25 inverted index over the chunks of one assistant's files.
+
+    Postings are kept per term in two parallel typed arrays (chunk ids and term
+    frequencies), so the index pickles to little more than raw bytes and loads
+    without rebuilding any per-posting objects. Deleted files are tombstoned
+    and the postings compacted once enough chunks are dead.
+    """
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.postings_chunks: List[array] = []
+        self.postings_tfs: List[array] = []
+        self.chunk_lengths = array("I")
+        self.chunk_files = array("q")  # file id per chunk, -1 once deleted
+        self.chunk_texts: List[str] = []
+        self.files: Dict[int, Dict[str, Any]] = {}  # file id -> name and chunk ids
+        self.live_chunks = 0
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return self.live_chunks
+
+    def add_file(self, file_id: int, name: str, prepared: List[Tuple[str, Counter, int]]):
+        """Index the prepared chunks of a file, replacing any previous version"""
+        if file_id in self.files:
+            self.remove_file(file_id)
+
+        chunk_ids = array("I")
+        for text, frequencies, length in prepared:
+            chunk_id = len(self.chunk_texts)
+            self.chunk_texts.append(text)
+            self.chunk_lengths.append(length)
+            self.chunk_files.append(file_id)
+            chunk_ids.append(chunk_id)
+            for term, tf in frequencies.items():
+                term_id = self.vocabulary.get(term)
+                if term_id is None:
+                    term_id = len(self.postings_chunks)
+                    self.vocabulary[term] = term_id
+                    self.postings_chunks.append(array("I"))
+                    self.postings_tfs.append(array("I"))
+                self.postings_chunks[term_id].append(chunk_id)
+                self.postings_tfs[term_id].append(tf)
+            self.live_chunks += 1
+            self.total_length += length
+
+        self.files[file_id] = {"name": name, "chunks": chunk_ids}
+
+    def remove_file(self, file_id: int) -> bool:
+        entry = self.files.pop(file_id, None)
+        if entry is None:
+            return False
+        for chunk_id in entry["chunks"]:
+            self.chunk_files[chunk_id] = -1
+            self.chunk_texts[chunk_id] = ""
+            self.total_length -= self.chunk_lengths[chunk_id]
+            self.live_chunks -= 1
+
+        dead = len(self.chunk_texts) - self.live_chunks
+        if dead and dead >= COMPACTION_RATIO * len(self.chunk_texts):
+            self.compact()
+        return True
+
+    def compact(self):
+        """Drop tombstoned chunks and renumber postings"""
+        remap = array("q", [-1]) * len(self.chunk_texts)
+        chunk_lengths, chunk_files, chunk_texts = array("I"), array("q"), []
+        for old_id, file_id in enumerate(self.chunk_files):
+            if file_id < 0:
+                continue
+            remap[old_id] = len(chunk_texts)
+            chunk_lengths.append(self.chunk_lengths[old_id])
+            chunk_files.append(file_id)
+            chunk_texts.append(self.chunk_texts[old_id])
+
+        vocabulary, postings_chunks, postings_tfs = {}, [], []
+        for term, term_id in self.vocabulary.items():
+            chunks, tfs = array("I"), array("I")
+            for chunk_id, tf in zip(self.postings_chunks[term_id], self.postings_tfs[term_id]):
+                new_id = remap[chunk_id]
+                if new_id >= 0:
+                    chunks.append(new_id)
+                    tfs.append(tf)
+            if chunks:
+                vocabulary[term] = len(postings_chunks)
+                postings_chunks.append(chunks)
+                postings_tfs.append(tfs)
+
+        for entry in self.files.values():
+            entry["chunks"] = array("I", (remap[chunk_id] for chunk_id in entry["chunks"]))
+
+        self.vocabulary, self.postings_chunks, self.postings_tfs = vocabulary, postings_chunks, postings_tfs
+        self.chunk_lengths, self.chunk_files, self.chunk_texts = chunk_lengths, chunk_files, chunk_texts
+
+    def search(self, query: str, k: int = 6) -> List[Dict[str, Any]]:
+        """Top-k chunks by BM25 score, shaped like Albert AI search results"""
+        if not self.live_chunks:
+            return []
+
+        n = self.live_chunks
+        avg_length = self.total_length / n
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            live = [
+                (chunk_id, tf)
+                for chunk_id, tf in zip(self.postings_chunks[term_id], self.postings_tfs[term_id])
+                if self.chunk_files[chunk_id] >= 0
+            ]
+            if not live:
+                continue
+            idf = math.log(1 + (n - len(live) + 0.5) / (len(live) + 0.5))
+            for chunk_id, tf in live:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.chunk_lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        results = []
+        for chunk_id, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            file_id = self.chunk_files[chunk_id]
+            results.append({
+                "content": self.chunk_texts[chunk_id],
+                "metadata": {
+                    "document_name": self.files[file_id]["name"],
+                    "file_id": file_id,
+                    "chunk_id": chunk_id
+                },
+                "score": score
+            })
+        return results
+
+    def to_bytes(self) -> bytes:
+        return pickle.dumps({
+            "version": INDEX_FORMAT_VERSION,
+            "terms": list(self.vocabulary),
+            "postings_chunks": self.postings_chunks,
+            "postings_tfs": self.postings_tfs,
+            "chunk_lengths": self.chunk_lengths,
+            "chunk_files": self.chunk_files,
+            "chunk_texts": self.chunk_texts,
+            "files": self.files,
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LexicalIndex":
+        state = pickle.loads(data)
+        if state.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported lexical index format {state.get('version')}")
+        index = cls()
+        index.vocabulary = {term: term_id for term_id, term in enumerate(state["terms"])}
+        index.postings_chunks = state["postings_chunks"]
+        index.postings_tfs = state["postings_tfs"]
+        index.chunk_lengths = state["chunk_lengths"]
+        index.chunk_files = state["chunk_files"]
+        index.chunk_texts = state["chunk_texts"]
+        index.files = state["files"]
+        index.live_chunks = sum(1 for file_id in index.chunk_files if file_id >= 0)
+        index.total_length = sum(
+            length for length, file_id in zip(index.chunk_lengths, index.chunk_files) if file_id >= 0
+        )
+        return index
+
+
+class LexicalIndexRegistry:
+    """Per-assistant lexical indexes, persisted under uploads/<assistant_id>/.
+
+    Searches, mutations (compaction included), serialization and disk I/O
+    run in worker threads, as do text extraction and tokenization. An index
+    is never changed once loaded: a mutation applies to a copy freshly read
+    from disk and then replaces it, so searches in flight keep reading a
+    consistent index.
+
+    API processes and ingestion workers share the persisted files. Each
+    loaded index remembers the inode and mtime of the file it came from and is
+    reloaded when another process has replaced that file. Mutations hold an
+    exclusive lock on a lock file next to the index (flock) while they reload,
+    change and write the index, so processes never overwrite each other's
+    changes.
+    """
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self._indexes: Dict[int, LexicalIndex] = {}
+        self._stamps: Dict[int, Optional[Tuple[int, int]]] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        # Assistants whose index was checked for files stored before it existed
+        self._backfilled: Set[int] = set()
+
+    def _path(self, help_assistant_id: int) -> Path:
+        return self.base_dir / str(help_assistant_id) / INDEX_FILENAME
+
+    def _lock(self, help_assistant_id: int) -> asyncio.Lock:
+        return self._locks.setdefault(help_assistant_id, asyncio.Lock())
+
+    @staticmethod
+    def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+        """Identity of the persisted file; each write replaces it with a new inode"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @staticmethod
+    def _read(path: Path) -> Tuple[Optional[LexicalIndex], Optional[Tuple[int, int]]]:
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                data = f.read()
+        except FileNotFoundError:
+            return None, None
+        return LexicalIndex.from_bytes(data), (stat.st_ino, stat.st_mtime_ns)
+
+    @classmethod
+    def _write(cls, path: Path, index: LexicalIndex) -> Optional[Tuple[int, int]]:
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(index.to_bytes())
+        os.replace(tmp_path, path)
+        return cls._stamp(path)
+
+    @staticmethod
+    def _lock_file(path: Path) -> int:
+        """Open and exclusively lock the index's lock file (blocking); closing the descriptor unlocks it"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    async def _read_fresh(self, help_assistant_id: int) -> Tuple[LexicalIndex, Optional[Tuple[int, int]]]:
+        """A new copy of the persisted index, empty if it is missing or unreadable"""
+        try:
+            index, stamp = await asyncio.to_thread(self._read, self._path(help_assistant_id))
+        except Exception as e:
+            logger.error(f"Discarding unreadable lexical index of assistant {help_assistant_id}: {e}")
+            index, stamp = None, None
+        return index or LexicalIndex(), stamp
+
+    async def _load(self, help_assistant_id: int) -> LexicalIndex:
+        """The index as last persisted, reloaded if another process wrote it (call with the assistant's lock held)"""
+        stamp = self._stamp(self._path(help_assistant_id))
+        index = self._indexes.get(help_assistant_id)
+        if index is not None and self._stamps.get(help_assistant_id) == stamp:
+            return index
+        index, stamp = await self._read_fresh(help_assistant_id)
+        self._indexes[help_assistant_id] = index
+        self._stamps[help_assistant_id] = stamp
+        return index
+
+    async def get(self, help_assistant_id: int) -> LexicalIndex:
+        index = self._indexes.get(help_assistant_id)
+        if index is not None and self._stamps.get(help_assistant_id) == self._stamp(self._path(help_assistant_id)):
+            return index
+        async with self._lock(help_assistant_id):
+            return await self._load(help_assistant_id)
+
+    async def _update(
+        self,
+        help_assistant_id: int,
+        mutate: Callable[[LexicalIndex], Optional[LexicalIndex]]
+    ) -> LexicalIndex:
+        """
+        Change the latest persisted index of an assistant and write it back.
+
+        Args:
+            help_assistant_id: Assistant whose index changes
+            mutate: Changes the index in place and returns it, or returns a
+                replacement; returning None leaves the index unchanged. Runs
+                in a worker thread, on a private copy of the index.
+
+        Returns:
+            The current index
+        """
+        path = self._path(help_assistant_id)
+        async with self._lock(help_assistant_id):
+            lock_fd = await asyncio.to_thread(self._lock_file, path)
+            try:
+                index, stamp = await self._read_fresh(help_assistant_id)
+                updated = await asyncio.to_thread(mutate, index)
+                if updated is not None:
+                    stamp = await asyncio.to_thread(self._write, path, updated)
+                    index = updated
+                self._indexes[help_assistant_id] = index
+                self._stamps[help_assistant_id] = stamp
+                return index
+            finally:
+                os.close(lock_fd)
+
+    async def add_file(self, help_assistant_id: int, file_id: int, name: str, file_path: str):
+        prepared = await asyncio.to_thread(prepare_file, file_path)
+
+        def mutate(index: LexicalIndex) -> LexicalIndex:
+            index.add_file(file_id, name, prepared)
+            return index
+
+        await self._update(help_assistant_id, mutate)
+
+    async def remove_file(self, help_assistant_id: int, file_id: int):
+        await self._update(help_assistant_id, lambda index: index if index.remove_file(file_id) else None)
+
+    async def backfill(self, help_assistant_id: int, files: List[Any]) -> int:
+        """Index the files (AssistantFile rows) missing from an assistant's index; returns how many were added"""
+        index = await self.get(help_assistant_id)
+        prepared = []
+        for db_file in files:
+            if db_file.id in index.files:
+                continue
+            try:
+                prepared.append((db_file.id, db_file.filename, await asyncio.to_thread(prepare_file, db_file.file_path)))
+            except Exception as e:
+                logger.error(f"Skipping {db_file.file_path} in lexical index: {e}")
+        if not prepared:
+            return 0
+
+        def mutate(index: LexicalIndex) -> Optional[LexicalIndex]:
+            # Another process may have indexed some of them meanwhile
+            missing = [entry for entry in prepared if entry[0] not in index.files]
+            for file_id, name, chunks in missing:
+                index.add_file(file_id, name, chunks)
+            return index if missing else None
+
+        await self._update(help_assistant_id, mutate)
+        return len(prepared)
+
+    def schedule_backfill(self, help_assistant_id: int):
+        """Index in the background, once per process, the stored files missing from an assistant's index"""
+        if help_assistant_id in self._backfilled:
+            return
+        self._backfilled.add(help_assistant_id)
+        spawn(self._backfill_stored(help_assistant_id), name=f"lexical-backfill:{help_assistant_id}")
+
+    async def _backfill_stored(self, help_assistant_id: int):
+        try:
+            async with AsyncSessionLocal() as session:
+                files = (await session.execute(
+                    select(AssistantFile).filter(AssistantFile.help_assistant_id == help_assistant_id)
+                )).scalars().all()
+            added = await self.backfill(help_assistant_id, files)
+            if added:
+                logger.info(f"Backfilled {added} files into the lexical index of assistant {help_assistant_id}")
+        except Exception as e:
+            self._backfilled.discard(help_assistant_id)
+            logger.error(f"Failed to backfill the lexical index of assistant {help_assistant_id}: {e}")
+
+    async def available(self, help_assistant_id: int) -> bool:
+        """Whether an assistant's index has chunks to search; schedules its backfill on first use"""
+        self.schedule_backfill(help_assistant_id)
+        return len(await self.get(help_assistant_id)) > 0
+
+    async def search(self, help_assistant_id: int, query: str, k: int = 6) -> List[Dict[str, Any]]:
+        index = await self.get(help_assistant_id)
+        return await asyncio.to_thread(index.search, query, k)
+
+    async def load_all(self):
+        """Warm every persisted index into memory (run at startup)"""
+        if not self.base_dir.exists():
+            return
+        for path in self.base_dir.glob(f"*/{INDEX_FILENAME}"):
+            if path.parent.name.isdigit():
+                await self.get(int(path.parent.name))
+
+
+# Process-wide registry
+lexical_indexes = LexicalIndexRegistry(Path(settings.UPLOAD_DIR))
@@ -29,17 +29,331 @@ PROCESS_CPU = Gauge(
     "CPU usage percent"
 )
 
+# Albert AI connection pool metrics
+ALBERT_POOL_CONNECTIONS = Gauge(
+    "albert_http_pool_connections",
+    "Connections held by the shared Albert AI HTTP pool",
+    ["state"]
+)
+
+ALBERT_POOL_IN_FLIGHT = Gauge(
+    "albert_http_pool_in_flight_requests",
+    "Requests currently in flight on the shared Albert AI HTTP pool"
+)
+
+ALBERT_POOL_WAIT_TIME = Histogram(
+    "albert_http_pool_wait_seconds",
+    "Time spent waiting for a connection from the Albert AI HTTP pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# Chat streaming metrics
+CHAT_TIME_TO_FIRST_TOKEN = Histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from receiving a chat message to relaying the first generated token",
+    ["mode"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0)
+)
+
+# Search result cache metrics
+SEARCH_CACHE_REQUESTS = Counter(
+    "search_cache_requests_total",
+    "Search cache lookups",
+    ["result"]
+)
+
+SEARCH_CACHE_EVICTIONS = Counter(
+    "search_cache_evictions_total",
+    "Search cache entries evicted",
+    ["reason"]
+)
+
+SEARCH_CACHE_ENTRIES = Gauge(
+    "search_cache_entries",
+    "Search results currently cached"
+)
+
+# Retrieval metrics
+RETRIEVAL_LEG_DURATION = Histogram(
+    "retrieval_leg_duration_seconds",
+    "Duration of each retrieval leg",
+    ["leg"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+RETRIEVAL_RESULT_SIZE = Histogram(
+    "retrieval_result_size",
+    "Number of chunks returned by each retrieval leg and after fusion",
+    ["leg"],
+    buckets=(0, 1, 2, 4, 6, 8, 10, 15, 20, 30, 50)
+)
+
+# Prompt size metrics
+PROMPT_TOKENS = Histogram(
+    "chat_prompt_tokens",
+    "Estimated prompt tokens of a chat turn, before and after fitting the token budget",
+    ["stage"],
+    buckets=(250, 500, 1000, 2000, 3000, 4000, 6000, 8000, 12000, 16000, 32000, 64000)
+)
+
+# Conversation summary metrics
+CHAT_SUMMARY_LAG = Histogram(
+    "chat_summary_lag_messages",
+    "Messages older than the live window not yet folded into the chat summary",
+    buckets=(0, 1, 2, 5, 10, 15, 20, 30, 50, 100)
+)
+
+CHAT_SUMMARY_DURATION = Histogram(
+    "chat_summary_generation_seconds",
+    "Time spent generating a chat summary update",
+    buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+
+CHAT_SUMMARY_TOKENS = Counter(
+    "chat_summary_tokens_total",
+    "Tokens consumed generating chat summaries",
+    ["kind"]
+)
+
+CHAT_SUMMARY_REFRESHES = Counter(
+    "chat_summary_refreshes_total",
+    "Chat summary refreshes",
+    ["status"]
+)
+
+# Context selection metrics
+CONTEXT_SAVED_BYTES = Histogram(
+    "context_selection_saved_bytes",
+    "Bytes of retrieved chunks dropped from a chat turn prompt",
+    buckets=(0, 500, 1000, 2500, 5000, 10000, 20000, 50000)
+)
+
+CONTEXT_SAVED_TOKENS = Histogram(
+    "context_selection_saved_tokens",
+    "Estimated tokens of retrieved chunks dropped from a chat turn prompt",
+    buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000)
+)
+
+CONTEXT_DROPPED_CHUNKS = Counter(
+    "context_selection_dropped_chunks_total",
+    "Retrieved chunks dropped before prompt assembly",
+    ["reason"]
+)
+
+# Albert AI single-flight metrics (coalesce ratio = follower / (leader + follower))
+ALBERT_SINGLE_FLIGHT_CALLS = Counter(
+    "albert_single_flight_calls_total",
+    "Albert AI calls by whether they went upstream (leader) or joined an identical in-flight call (follower)",
+    ["endpoint", "role"]
+)
+
+# Albert AI resilience metrics
+ALBERT_CIRCUIT_STATE = Gauge(
+    "albert_circuit_breaker_state",
+    "Circuit breaker state per Albert AI endpoint (0 closed, 1 half-open, 2 open)",
+    ["endpoint"]
+)
+
+ALBERT_CIRCUIT_REJECTIONS = Counter(
+    "albert_circuit_breaker_rejections_total",
+    "Albert AI calls failed fast by an open circuit breaker",
+    ["endpoint"]
+)
+
+ALBERT_RETRIES = Counter(
+    "albert_retries_total",
+    "Albert AI request retries by endpoint and cause",
+    ["endpoint", "reason"]
+)
+
+ALBERT_HEDGED_REQUESTS = Counter(
+    "albert_hedged_requests_total",
+    "Hedged Albert AI requests launched, won by the hedge, or skipped for lack of a concurrency slot",
+    ["endpoint", "outcome"]
+)
+
+# Albert AI adaptive concurrency limiter metrics
+ALBERT_LIMITER_LIMIT = Gauge(
+    "albert_limiter_limit",
+    "Current adaptive concurrency limit per Albert AI endpoint class",
+    ["endpoint_class"]
+)
+
+ALBERT_LIMITER_IN_FLIGHT = Gauge(
+    "albert_limiter_in_flight",
+    "Albert AI calls holding a concurrency slot per endpoint class",
+    ["endpoint_class"]
+)
+
+ALBERT_LIMITER_QUEUE_DEPTH = Gauge(
+    "albert_limiter_queue_depth",
+    "Albert AI calls waiting for a concurrency slot per endpoint class",
+    ["endpoint_class"]
+)
+
+ALBERT_LIMITER_WAIT_TIME = Histogram(
+    "albert_limiter_wait_seconds",
+    "Time spent waiting for a concurrency slot per endpoint class",
+    ["endpoint_class"],
+    buckets=(0, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+ALBERT_LIMITER_REJECTIONS = Counter(
+    "albert_limiter_rejections_total",
+    "Albert AI calls rejected by the concurrency limiter (queue full or wait timed out)",
+    ["endpoint_class", "reason"]
+)
+
+# Per-stage request latency (also returned in the Server-Timing header)
+PIPELINE_STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Duration of each stage of the chat, chat init and upload pipelines",
+    ["pipeline", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+# Albert AI call metrics; "assistant" is bounded by ALBERT_METRICS_MAX_ASSISTANTS
+ALBERT_REQUEST_DURATION = Histogram(
+    "albert_request_duration_seconds",
+    "Albert AI call latency per attempt (streams: until the response starts)",
+    ["endpoint", "model", "assistant"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+)
+
+ALBERT_REQUESTS = Counter(
+    "albert_requests_total",
+    "Albert AI call attempts by response status (error: no response)",
+    ["endpoint", "model", "assistant", "status"]
+)
+
+ALBERT_TOKENS = Counter(
+    "albert_tokens_total",
+    "LLM tokens reported in the usage block of Albert AI completions",
+    ["model", "assistant", "kind"]
+)
+
+ALBERT_PAYLOAD_SIZE = Histogram(
+    "albert_payload_size_bytes",
+    "Size of prompts sent, chunks retrieved and responses generated",
+    ["kind", "assistant"],
+    buckets=(256, 1024, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+)
+
+# Quota metrics
+QUOTA_REJECTIONS = Counter(
+    "quota_rejections_total",
+    "Requests rejected for exceeding a user or assistant quota",
+    ["scope", "limit"]
+)
+
+QUOTA_FLUSH_DURATION = Histogram(
+    "quota_flush_duration_seconds",
+    "Time to flush pending usage counters to the database",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# Batch query metrics
+BATCH_ITEMS = Counter(
+    "batch_items_total",
+    "Items processed by the batch query endpoint",
+    ["mode", "status"]
+)
+
+BATCH_ITEM_DURATION = Histogram(
+    "batch_item_duration_seconds",
+    "Time to process one batch item, including the wait for a concurrency slot",
+    ["mode"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+
+# Bulk upload metrics
+BULK_UPLOAD_FILES = Counter(
+    "bulk_upload_files_total",
+    "Files received by the bulk upload endpoint",
+    ["status"]
+)
+
+# Ingestion queue metrics
+INGESTION_QUEUE_DEPTH = Gauge(
+    "ingestion_queue_depth",
+    "Ingestion jobs by status (queued, running)",
+    ["status"]
+)
+
+INGESTION_JOBS = Counter(
+    "ingestion_jobs_total",
+    "Ingestion job attempts by outcome (done, retried, failed)",
+    ["outcome"]
+)
+
+INGESTION_JOB_DURATION = Histogram(
+    "ingestion_job_duration_seconds",
+    "Time to run one ingestion job attempt",
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+
+INGESTION_JOB_LATENCY = Histogram(
+    "ingestion_job_latency_seconds",
+    "Time from upload to the file being ready or failed",
+    buckets=(1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0)
+)
+
+ALBERT_DOCUMENT_ID_LOOKUPS = Counter(
+    "albert_document_id_lookups_total",
+    "How the Albert AI id of an uploaded document was found (upload response or collection listing)",
+    ["source"]
+)
+
+# Upload deduplication metrics
+UPLOAD_DEDUP_FILES = Counter(
+    "upload_dedup_files_total",
+    "Stored files by dedup layer (disk blobs, Albert AI documents) and result (new, duplicate)",
+    ["layer", "result"]
+)
+
+UPLOAD_DEDUP_BYTES_SAVED = Counter(
+    "upload_dedup_bytes_saved_total",
+    "Bytes not written to disk or not sent to Albert AI thanks to deduplication",
+    ["layer"]
+)
+
+# Reconciliation metrics
+RECONCILE_COLLECTIONS = Counter(
+    "reconcile_collections_total",
+    "Collections visited by reconciliation by result (skipped, clean, repaired, error)",
+    ["result"]
+)
+
+RECONCILE_REPAIRS = Counter(
+    "reconcile_repairs_total",
+    "Drift repaired by reconciliation (requeued uploads, deleted remote orphans, dropped stale index rows)",
+    ["action"]
+)
+
+RECONCILE_DURATION = Histogram(
+    "reconcile_duration_seconds",
+    "Time to reconcile all collections",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+)
+
+
 class MonitoringService:
     @staticmethod
     def init_monitoring(app):
+        # Imported here: stage_timing itself imports the metrics defined above
+        from services.stage_timing import start_request
+
         @app.middleware("http")
         async def metrics_middleware(request, call_next):
             start_time = time.time()
+            timings = start_request()
             
             response = await call_next(request)
             
             # Record request duration
             duration = time.time() - start_time
+            # Stages finished before the response started (streamed bodies end later)
+            response.headers["Server-Timing"] = timings.server_timing(duration)
             REQUEST_TIME.labels(
                 method=request.method,
                 endpoint=request.url.path
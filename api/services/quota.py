@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from config import settings
+from db.database import AsyncSessionLocal
+from models.usage import UsageRecord
+from services.monitoring import QUOTA_REJECTIONS, QUOTA_FLUSH_DURATION
+from utils.exceptions import QuotaExceededException
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# User on whose behalf Albert AI completions run in the current context; tasks
+# spawned from a request (e.g. summary refreshes) are charged to the same user
+_current_user: ContextVar[Optional[int]] = ContextVar("quota_user", default=None)
+
+Subject = Tuple[str, int]
+
+
+class SlidingWindow:
+    """Amounts in fixed-size time buckets; total() covers the buckets of the last window"""
+
+    def __init__(self, window_seconds: int, bucket_seconds: int):
+        self.bucket_seconds = bucket_seconds
+        self.size = window_seconds // bucket_seconds
+        self.buckets: Dict[int, int] = {}
+
+    def _prune(self, now: float):
+        oldest = int(now // self.bucket_seconds) - self.size + 1
+        for index in [i for i in self.buckets if i < oldest]:
+            del self.buckets[index]
+
+    def add(self, amount: int, now: float):
+        index = int(now // self.bucket_seconds)
+        self.buckets[index] = self.buckets.get(index, 0) + amount
+
+    def set_bucket(self, index: int, value: int):
+        self.buckets[index] = value
+
+    def total(self, now: float) -> int:
+        self._prune(now)
+        return sum(self.buckets.values())
+
+    def retry_after(self, now: float, limit: int) -> float:
+        """Seconds until enough old buckets leave the window to get under limit"""
+        total = self.total(now)
+        for index in sorted(self.buckets):
+            total -= self.buckets[index]
+            if total < limit:
+                return max((index + self.size) * self.bucket_seconds - now, 0.0)
+        return 0.0
+
+
+class _Usage:
+    __slots__ = ("requests", "tokens")
+
+    def __init__(self):
+        # Request rate is enforced per process; token totals are kept in hourly
+        # buckets matching the usage_records rows, so they can be refreshed
+        # from the database and include other workers' consumption
+        self.requests = SlidingWindow(MINUTE, 1)
+        self.tokens = SlidingWindow(DAY, HOUR)
+
+
+def _hour_start(now: float) -> datetime:
+    return datetime.utcfromtimestamp(now - now % HOUR)
+
+
+def _hour_index(period_start: datetime) -> int:
+    return int((period_start - datetime(1970, 1, 1)).total_seconds() // HOUR)
+
+
+class QuotaTracker:
+    """Per-user and per-assistant request and token quotas.
+
+    Checks only read in-memory sliding windows, so admitting a request needs no
+    database round trip. Consumption is accumulated per subject and hour and
+    flushed to usage_records in one upsert every QUOTA_FLUSH_INTERVAL_SECONDS;
+    each flush then reloads the day's totals of the flushed subjects, which
+    brings in what other workers consumed. A limit of 0 disables that quota.
+    """
+
+    def __init__(self):
+        self._usage: Dict[Subject, _Usage] = {}
+        # (scope, subject id, hour start) -> [requests, prompt tokens, completion tokens]
+        self._pending: Dict[Tuple[str, int, datetime], List[int]] = {}
+
+    @staticmethod
+    def limits(scope: str) -> Dict[str, int]:
+        if scope == "user":
+            return {
+                "requests_per_minute": settings.QUOTA_USER_REQUESTS_PER_MINUTE,
+                "tokens_per_day": settings.QUOTA_USER_TOKENS_PER_DAY,
+            }
+        return {
+            "requests_per_minute": settings.QUOTA_ASSISTANT_REQUESTS_PER_MINUTE,
+            "tokens_per_day": settings.QUOTA_ASSISTANT_TOKENS_PER_DAY,
+        }
+
+    def _get(self, subject: Subject) -> _Usage:
+        usage = self._usage.get(subject)
+        if usage is None:
+            usage = _Usage()
+            self._usage[subject] = usage
+        return usage
+
+    @staticmethod
+    def _subjects(user_id: Optional[int], assistant_id: Optional[int]) -> List[Subject]:
+        subjects = []
+        if user_id is not None:
+            subjects.append(("user", user_id))
+        if assistant_id is not None:
+            subjects.append(("assistant", assistant_id))
+        return subjects
+
+    def check(self, user_id: Optional[int], assistant_id: Optional[int], requests: int = 1):
+        """Raise QuotaExceededException if the user or the assistant cannot make `requests` more requests"""
+        now = time.time()
+        for scope, subject_id in self._subjects(user_id, assistant_id):
+            usage = self._get((scope, subject_id))
+            limits = self.limits(scope)
+            rpm = limits["requests_per_minute"]
+            if rpm and usage.requests.total(now) + requests > rpm:
+                QUOTA_REJECTIONS.labels(scope=scope, limit="requests_per_minute").inc()
+                raise QuotaExceededException(
+                    scope, f"{rpm} requests per minute", usage.requests.retry_after(now, rpm - requests + 1)
+                )
+            tpd = limits["tokens_per_day"]
+            if tpd and usage.tokens.total(now) >= tpd:
+                QUOTA_REJECTIONS.labels(scope=scope, limit="tokens_per_day").inc()
+                raise QuotaExceededException(scope, f"{tpd} tokens per day", usage.tokens.retry_after(now, tpd))
+
+    def admit(self, user_id: int, assistant_id: Optional[int], requests: int = 1):
+        """
+        Check quotas before any upstream call, then count the request(s).
+
+        Several requests (e.g. a batch) are admitted all or none. Also binds
+        the user to the current context, so completion tokens used while
+        handling the request are charged to them.
+        """
+        self.check(user_id, assistant_id, requests)
+        now = time.time()
+        for subject in self._subjects(user_id, assistant_id):
+            self._get(subject).requests.add(requests, now)
+            self._add_pending(subject, now, requests=requests)
+        _current_user.set(user_id)
+
+    def record_usage(self, usage: Optional[Dict[str, Any]], assistant_id: Optional[int]):
+        """Charge the tokens of a completion to the bound user and to the assistant"""
+        if not usage:
+            return
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        now = time.time()
+        for subject in self._subjects(_current_user.get(), assistant_id):
+            self._get(subject).tokens.add(prompt_tokens + completion_tokens, now)
+            self._add_pending(subject, now, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def _add_pending(self, subject: Subject, now: float, requests: int = 0, prompt_tokens: int = 0, completion_tokens: int = 0):
+        key = (subject[0], subject[1], _hour_start(now))
+        pending = self._pending.setdefault(key, [0, 0, 0])
+        pending[0] += requests
+        pending[1] += prompt_tokens
+        pending[2] += completion_tokens
+
+    def usage(self, scope: str, subject_id: int) -> Dict[str, Any]:
+        """Current consumption and limits of a user or assistant"""
+        now = time.time()
+        usage = self._get((scope, subject_id))
+        limits = self.limits(scope)
+        return {
+            "scope": scope,
+            "id": subject_id,
+            "requests_last_minute": usage.requests.total(now),
+            "requests_per_minute_limit": limits["requests_per_minute"] or None,
+            "tokens_last_day": usage.tokens.total(now),
+            "tokens_per_day_limit": limits["tokens_per_day"] or None,
+        }
+
+    def bind_user(self, user_id: Optional[int]):
+        _current_user.set(user_id)
+
+    def _apply_totals(self, rows):
+        """Replace hourly token buckets with database totals plus what is not flushed yet"""
+        for scope, subject_id, period_start, tokens in rows:
+            pending = self._pending.get((scope, subject_id, period_start))
+            unflushed = pending[1] + pending[2] if pending else 0
+            self._get((scope, subject_id)).tokens.set_bucket(_hour_index(period_start), tokens + unflushed)
+
+    def _totals_query(self, subjects=None):
+        query = select(
+            UsageRecord.scope,
+            UsageRecord.subject_id,
+            UsageRecord.period_start,
+            UsageRecord.prompt_tokens + UsageRecord.completion_tokens
+        ).where(UsageRecord.period_start >= _hour_start(time.time()) - timedelta(seconds=DAY - HOUR))
+        if subjects is not None:
+            query = query.where(tuple_(UsageRecord.scope, UsageRecord.subject_id).in_(list(subjects)))
+        return query
+
+    async def load(self):
+        """Warm the token windows with the last day of usage (e.g. after a restart)"""
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(self._totals_query())).all()
+        self._apply_totals(rows)
+        logger.info(f"Loaded {len(rows)} usage records into quota windows")
+
+    async def flush(self):
+        """Upsert pending consumption into usage_records in one statement"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        start_time = time.perf_counter()
+        try:
+            statement = insert(UsageRecord).values([
+                {
+                    "scope": scope,
+                    "subject_id": subject_id,
+                    "period_start": period_start,
+                    "requests": requests,
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "updated_at": datetime.utcnow(),
+                }
+                for (scope, subject_id, period_start), (requests, prompt_tokens, completion_tokens) in pending.items()
+            ])
+            statement = statement.on_conflict_do_update(
+                constraint="uq_usage_records_subject_period",
+                set_={
+                    "requests": UsageRecord.requests + statement.excluded.requests,
+                    "prompt_tokens": UsageRecord.prompt_tokens + statement.excluded.prompt_tokens,
+                    "completion_tokens": UsageRecord.completion_tokens + statement.excluded.completion_tokens,
+                    "updated_at": statement.excluded.updated_at,
+                }
+            )
+            subjects = {(scope, subject_id) for scope, subject_id, _ in pending}
+            async with AsyncSessionLocal() as session:
+                await session.execute(statement)
+                await session.commit()
+                rows = (await session.execute(self._totals_query(subjects))).all()
+        except Exception:
+            # Keep the consumption for the next flush
+            for key, values in pending.items():
+                current = self._pending.setdefault(key, [0, 0, 0])
+                for i, value in enumerate(values):
+                    current[i] += value
+            raise
+        finally:
+            QUOTA_FLUSH_DURATION.observe(time.perf_counter() - start_time)
+        self._apply_totals(rows)
+        self._forget_idle()
+
+    def _forget_idle(self):
+        now = time.time()
+        for subject in [s for s, u in self._usage.items() if not u.requests.total(now) and not u.tokens.total(now)]:
+            del self._usage[subject]
+
+    async def run(self):
+        """Background loop: warm up, then flush periodically (started by the app lifespan)"""
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Failed to load usage records: {e}")
+        while True:
+            await asyncio.sleep(settings.QUOTA_FLUSH_INTERVAL_SECONDS)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush usage records: {e}")
+
+
+quota_tracker = QuotaTracker()
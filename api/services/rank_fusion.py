@@ -0,0 +1,68 @@
+from typing import Any, Dict, List
+
+# Standard RRF damping constant (Cormack et al.)
+RRF_K = 60
+
+
+def _chunk_key(result: Dict[str, Any]) -> tuple:
+    metadata = result.get("metadata") or {}
+    return (metadata.get("document_name"), " ".join(result["content"].split()))
+
+
+def _document_key(result: Dict[str, Any]) -> tuple:
+    # Local and Albert AI chunks of a file share its name, not their boundaries
+    name = (result.get("metadata") or {}).get("document_name")
+    return ("document", name) if name else ("chunk",) + _chunk_key(result)
+
+
+def reciprocal_rank_fusion(ranked_lists: Dict[str, List[Dict[str, Any]]], k: int, rrf_k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Sources chunk documents differently (Albert AI and the local BM25 index
+    cut passages at different offsets), so agreement is measured per
+    document: each source ranks documents by their best chunk, and every
+    chunk of a document gets the document's fused score. Chunks of the same
+    document are ordered by their best rank in any source.
+
+    Args:
+        ranked_lists: Results of each source, best first, keyed by source name
+        k: Number of fused results to return
+        rrf_k: Damping constant; higher values flatten the rank contribution
+
+    Returns:
+        Fused results, best first. "score" is the fused score of the chunk's
+        document; "scores" and "ranks" hold each source's original score and
+        1-based rank of the chunk.
+    """
+    document_scores: Dict[tuple, float] = {}
+    fused: Dict[tuple, Dict[str, Any]] = {}
+    for source, results in ranked_lists.items():
+        document_ranks: Dict[tuple, int] = {}
+        for rank, result in enumerate(results, start=1):
+            document = _document_key(result)
+            if document not in document_ranks:
+                document_ranks[document] = len(document_ranks) + 1
+
+            key = _chunk_key(result)
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {
+                    "content": result["content"],
+                    "metadata": result.get("metadata", {}),
+                    "document": document,
+                    "scores": {},
+                    "ranks": {}
+                }
+            entry["scores"][source] = result.get("score")
+            entry["ranks"][source] = rank
+
+        for document, document_rank in document_ranks.items():
+            document_scores[document] = document_scores.get(document, 0.0) + 1.0 / (rrf_k + document_rank)
+
+    for entry in fused.values():
+        entry["score"] = document_scores[entry.pop("document")]
+    return sorted(
+        fused.values(),
+        key=lambda entry: (-entry["score"], min(entry["ranks"].values()))
+    )[:k]
@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, text
+
+from config import settings
+from db.database import AsyncSessionLocal, engine
+from db.models import AssistantFile, Collection
+from models.albert_document import AlbertDocument
+from models.assistant_file import FileStatus
+from models.collection_sync_state import CollectionSyncState
+from models.ingestion_job import IngestionJob, JobStatus
+from services.albert_document_service import AlbertDocumentService
+from services.external_api import AlbertAIService, get_albert_service
+from services.ingestion_queue import ingestion_queue
+from services.monitoring import RECONCILE_COLLECTIONS, RECONCILE_REPAIRS, RECONCILE_DURATION
+from services.search_cache import search_cache
+
+logger = logging.getLogger(__name__)
+
+# Session-level advisory lock held by the node running a reconciliation
+ADVISORY_LOCK_KEY = 0x616C62657274  # "albert"
+
+IN_FLIGHT_STATUSES = (FileStatus.PENDING.value, FileStatus.INDEXING.value)
+
+
+def local_fingerprint(files: List[AssistantFile]) -> str:
+    """Hash of what the file rows expect of the collection"""
+    digest = hashlib.sha256()
+    for db_file in sorted(files, key=lambda f: f.id):
+        digest.update(f"{db_file.id}:{db_file.albert_ai_id}:{db_file.status}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def document_age(created_at: Any, now: datetime) -> Optional[float]:
+    """Seconds since a document was created (epoch seconds or ISO 8601); None if unknown"""
+    try:
+        if isinstance(created_at, (int, float)):
+            created = datetime.utcfromtimestamp(created_at)
+        else:
+            created = datetime.fromisoformat(str(created_at).replace("Z", "+00:00"))
+            if created.tzinfo is not None:
+                created = created.replace(tzinfo=None) - created.utcoffset()
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return (now - created).total_seconds()
+
+
+class Reconciler:
+    """Repair drift between AssistantFile rows and Albert AI documents.
+
+    Runs every RECONCILE_INTERVAL_SECONDS on one node at a time (guarded by a
+    Postgres advisory lock). For each collection, a fingerprint of its file
+    rows and the document count Albert AI reports for it are compared with the
+    values stored when it was last found in sync: unchanged collections are
+    skipped without listing their documents, up to
+    RECONCILE_FULL_INTERVAL_SECONDS after their last full check. Otherwise
+    the documents are paged through and compared with the rows:
+
+    - ready files whose document is missing are re-queued for ingestion
+    - documents no file refers to are deleted from Albert AI, once older than
+      RECONCILE_ORPHAN_GRACE_SECONDS and while no upload is in progress
+    - albert_documents rows of documents that no longer exist are dropped
+
+    Repairs are committed in batches of RECONCILE_BATCH_SIZE, and at most
+    RECONCILE_CONCURRENCY collections are processed at once.
+    """
+
+    def __init__(self, albert_service: Optional[AlbertAIService] = None):
+        self._albert_service = albert_service
+
+    @property
+    def albert_service(self) -> AlbertAIService:
+        return self._albert_service or get_albert_service()
+
+    async def _remote_documents(self, collection_id: str) -> Dict[str, Dict[str, Any]]:
+        documents: Dict[str, Dict[str, Any]] = {}
+        offset = 0
+        while True:
+            page = await self.albert_service.get_documents_page(collection_id, settings.RECONCILE_PAGE_SIZE, offset)
+            for document in page:
+                documents[str(document["id"])] = document
+            if len(page) < settings.RECONCILE_PAGE_SIZE:
+                return documents
+            offset += len(page)
+
+    async def reconcile_collection(self, collection: Collection, remote_count: Optional[int]) -> str:
+        """Reconcile one collection; returns "skipped", "clean" or "repaired" """
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            files = (await session.execute(
+                select(AssistantFile).filter(AssistantFile.help_assistant_id == collection.help_assistant_id)
+            )).scalars().all()
+            fingerprint = local_fingerprint(files)
+            state = await session.get(CollectionSyncState, collection.albert_id)
+            if (
+                state is not None
+                and state.local_fingerprint == fingerprint
+                and remote_count is not None
+                and state.remote_documents == remote_count
+                and state.checked_at > now - timedelta(seconds=settings.RECONCILE_FULL_INTERVAL_SECONDS)
+            ):
+                return "skipped"
+
+            remote = await self._remote_documents(collection.albert_id)
+            document_service = AlbertDocumentService(session)
+            referenced = {db_file.albert_ai_id for db_file in files if db_file.albert_ai_id}
+
+            missing = [
+                db_file for db_file in files
+                if db_file.status == FileStatus.READY.value
+                and (db_file.albert_ai_id is None or db_file.albert_ai_id not in remote)
+            ]
+            # An upload in progress may have created a document it has not recorded yet
+            uploading = any(db_file.status in IN_FLIGHT_STATUSES for db_file in files)
+            orphans = [] if uploading else [
+                document_id for document_id, document in remote.items()
+                if document_id not in referenced
+                and (document_age(document.get("created_at"), now) or 0) > settings.RECONCILE_ORPHAN_GRACE_SECONDS
+            ]
+            stale = (await session.execute(
+                select(AlbertDocument.document_id).filter(
+                    AlbertDocument.collection_id == collection.albert_id,
+                    AlbertDocument.document_id.not_in(list(remote))
+                )
+            )).scalars().all()
+
+            repairs = 0
+            if missing:
+                active = set((await session.execute(
+                    select(IngestionJob.file_id).filter(
+                        IngestionJob.file_id.in_([db_file.id for db_file in missing]),
+                        IngestionJob.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value])
+                    )
+                )).scalars().all())
+                for start in range(0, len(missing), settings.RECONCILE_BATCH_SIZE):
+                    for db_file in missing[start:start + settings.RECONCILE_BATCH_SIZE]:
+                        logger.info(f"Re-queuing file {db_file.id}: document {db_file.albert_ai_id} is missing from {collection.albert_id}")
+                        db_file.albert_ai_id = None
+                        db_file.status = FileStatus.PENDING.value
+                        db_file.error = None
+                        if db_file.id not in active:
+                            ingestion_queue.enqueue(session, db_file)
+                    await session.commit()
+                    ingestion_queue.notify()
+                RECONCILE_REPAIRS.labels(action="requeued").inc(len(missing))
+                repairs += len(missing)
+
+            for start in range(0, len(orphans), settings.RECONCILE_BATCH_SIZE):
+                batch = orphans[start:start + settings.RECONCILE_BATCH_SIZE]
+                try:
+                    for document_id in batch:
+                        logger.info(f"Deleting orphan document {document_id} from {collection.albert_id}")
+                        await self.albert_service.delete_document(collection.albert_id, document_id)
+                        await document_service.remove(collection.albert_id, document_id)
+                        RECONCILE_REPAIRS.labels(action="orphan_deleted").inc()
+                        repairs += 1
+                finally:
+                    await search_cache.invalidate_collection(collection.albert_id)
+                    await session.commit()
+
+            for document_id in stale:
+                await document_service.remove(collection.albert_id, document_id)
+            if stale:
+                await session.commit()
+                RECONCILE_REPAIRS.labels(action="stale_index_row").inc(len(stale))
+                repairs += len(stale)
+
+            # The watermark is only recorded once the collection is found in
+            # sync, so repaired collections are compared again on the next run
+            state = state or CollectionSyncState(collection_id=collection.albert_id)
+            state.local_fingerprint = fingerprint if not repairs else None
+            state.remote_documents = remote_count if not repairs else None
+            state.checked_at = now
+            session.add(state)
+            await session.commit()
+            return "repaired" if repairs else "clean"
+
+    async def reconcile_all(self) -> Dict[str, int]:
+        """Reconcile every collection unless another node is already doing it"""
+        start_time = time.perf_counter()
+        results: Dict[str, int] = {}
+        async with engine.connect() as lock_connection:
+            locked = (await lock_connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+            )).scalar()
+            if not locked:
+                logger.info("Reconciliation already running on another node, skipping")
+                return results
+            try:
+                async with AsyncSessionLocal() as session:
+                    # Collections left behind by a deleted assistant have no rows to compare with
+                    collections = (await session.execute(
+                        select(Collection).filter(Collection.help_assistant_id.is_not(None))
+                    )).scalars().all()
+                try:
+                    remote_counts = {
+                        str(collection["id"]): collection.get("documents")
+                        for collection in await self.albert_service.list_collections()
+                    }
+                except Exception as e:
+                    # Without counts every collection gets a full comparison
+                    logger.error(f"Failed to list Albert AI collections: {e}")
+                    remote_counts = {}
+
+                semaphore = asyncio.Semaphore(max(settings.RECONCILE_CONCURRENCY, 1))
+
+                async def reconcile(collection: Collection):
+                    async with semaphore:
+                        try:
+                            result = await self.reconcile_collection(collection, remote_counts.get(collection.albert_id))
+                        except Exception as e:
+                            logger.error(f"Failed to reconcile collection {collection.albert_id}: {e}")
+                            result = "error"
+                    RECONCILE_COLLECTIONS.labels(result=result).inc()
+                    results[result] = results.get(result, 0) + 1
+
+                await asyncio.gather(*(reconcile(collection) for collection in collections))
+            finally:
+                await lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                RECONCILE_DURATION.observe(time.perf_counter() - start_time)
+        logger.info(f"Reconciled {len(collections)} collections: {results}")
+        return results
+
+    async def run(self):
+        """Background loop reconciling every RECONCILE_INTERVAL_SECONDS (started by the app lifespan)"""
+        while True:
+            await asyncio.sleep(settings.RECONCILE_INTERVAL_SECONDS)
+            try:
+                await self.reconcile_all()
+            except Exception as e:
+                logger.error(f"Reconciliation failed: {e}")
+
+
+reconciler = Reconciler()
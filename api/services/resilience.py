@@ -0,0 +1,150 @@
+import math
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+import httpx
+
+from config import settings
+from services.monitoring import ALBERT_CIRCUIT_STATE, ALBERT_CIRCUIT_REJECTIONS
+from utils.exceptions import UpstreamUnavailableException
+
+# Albert AI refused the request without processing it: safe to retry anything
+REFUSED_STATUSES = (429, 503)
+# The request may have been processed: only retried when idempotent
+TRANSIENT_STATUSES = (502, 504)
+# Failed before the request reached Albert AI
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retry number `attempt` (1-based).
+
+    Exponential backoff with full jitter, capped at ALBERT_AI_RETRY_MAX_DELAY;
+    a Retry-After sent by Albert AI is used as a floor.
+    """
+    ceiling = min(settings.ALBERT_AI_RETRY_MAX_DELAY, settings.ALBERT_AI_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, settings.ALBERT_AI_RETRY_AFTER_MAX))
+    return delay
+
+
+class CircuitBreaker:
+    """Fail fast while an Albert AI endpoint is degraded.
+
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets a single probe through (half-open),
+    closing again if it succeeds and reopening if it fails.
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int, reset_timeout: float):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        ALBERT_CIRCUIT_STATE.labels(endpoint=endpoint).set(0)
+
+    def _set_state(self, state: str):
+        self.state = state
+        ALBERT_CIRCUIT_STATE.labels(endpoint=self.endpoint).set(_STATE_VALUES[state])
+
+    def retry_in(self) -> float:
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def before_call(self):
+        """Raise UpstreamUnavailableException if the call must not go upstream"""
+        if self.state == "open":
+            if self.retry_in() > 0:
+                ALBERT_CIRCUIT_REJECTIONS.labels(endpoint=self.endpoint).inc()
+                raise UpstreamUnavailableException(retry_after=self.retry_in())
+            self._set_state("half_open")
+        if self.state == "half_open":
+            if self._probing:
+                ALBERT_CIRCUIT_REJECTIONS.labels(endpoint=self.endpoint).inc()
+                raise UpstreamUnavailableException(retry_after=self.reset_timeout)
+            self._probing = True
+
+    def record_success(self):
+        self._probing = False
+        self.failures = 0
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state("open")
+
+    def release(self):
+        """The call ended without a verdict (e.g. cancelled): free the probe slot"""
+        self._probing = False
+
+
+class LatencyTracker:
+    """Recent call durations of one endpoint, for hedging decisions"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, duration: float):
+        self._samples.append(duration)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(math.ceil(q * len(ordered)) - 1, len(ordered) - 1)]
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyTracker] = {}
+
+
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            endpoint,
+            failure_threshold=settings.ALBERT_AI_BREAKER_FAILURES,
+            reset_timeout=settings.ALBERT_AI_BREAKER_RESET_SECONDS
+        )
+        _breakers[endpoint] = breaker
+    return breaker
+
+
+def latency_for(endpoint: str) -> LatencyTracker:
+    tracker = _latencies.get(endpoint)
+    if tracker is None:
+        tracker = LatencyTracker()
+        _latencies[endpoint] = tracker
+    return tracker
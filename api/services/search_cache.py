@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from config import settings
+from db.database import engine
+from services.monitoring import SEARCH_CACHE_REQUESTS, SEARCH_CACHE_EVICTIONS, SEARCH_CACHE_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel carrying collection invalidations between processes
+INVALIDATION_CHANNEL = "search_cache_invalidation"
+# How often the listening connection is checked, and the delay before reconnecting it
+LISTEN_HEARTBEAT_SECONDS = 15
+LISTEN_RETRY_SECONDS = 5
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used in cache keys"""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class SearchCache:
+    """Bounded TTL + LRU cache of Albert AI search results.
+
+    Keys embed a per-collection version counter. Bumping the version whenever a
+    collection's documents change makes every older entry unreachable, so results
+    computed before an upload or delete are never served again; they simply age
+    out through LRU/TTL eviction.
+
+    Collections change in whichever process ingests or deletes files (API nodes
+    or `python -m worker`), so invalidate_collection() also publishes the bump
+    with Postgres NOTIFY, and listen() applies bumps published elsewhere. While
+    a process that listens is not connected, it neither serves nor stores
+    cached results, since it could miss bumps.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        # False while listen() is not receiving other processes' bumps
+        self.synced = True
+
+    def collection_version(self, collection_id: str) -> int:
+        return self._versions.get(collection_id, 0)
+
+    def bump_collection(self, collection_id: str) -> int:
+        """Invalidate every cached result of a collection"""
+        version = self._versions.get(collection_id, 0) + 1
+        self._versions[collection_id] = version
+        return version
+
+    async def invalidate_collection(self, collection_id: str):
+        """Invalidate every cached result of a collection, in every process"""
+        self.bump_collection(collection_id)
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text("SELECT pg_notify(:channel, :collection_id)"),
+                    {"channel": INVALIDATION_CHANNEL, "collection_id": collection_id}
+                )
+        except Exception as e:
+            logger.error(f"Failed to publish the invalidation of collection {collection_id}: {e}")
+
+    def _on_invalidation(self, connection, pid, channel, collection_id):
+        self.bump_collection(collection_id)
+
+    async def listen(self):
+        """Apply invalidations published by other processes until cancelled (started by the app lifespan)"""
+        self.synced = False
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    driver = (await conn.get_raw_connection()).driver_connection
+                    try:
+                        await driver.add_listener(INVALIDATION_CHANNEL, self._on_invalidation)
+                        # Bumps may have been missed while disconnected
+                        self.clear()
+                        self.synced = True
+                        while True:
+                            await asyncio.sleep(LISTEN_HEARTBEAT_SECONDS)
+                            await driver.execute("SELECT 1")
+                    finally:
+                        self.synced = False
+                        # Never hand a connection with a listener back to the pool
+                        await conn.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Search cache invalidation listener failed, reconnecting: {e}")
+                await asyncio.sleep(LISTEN_RETRY_SECONDS)
+
+    def make_key(self, collection_id: str, query: str, k: int, method: str) -> Tuple:
+        return (collection_id, self.collection_version(collection_id), normalize_query(query), k, method)
+
+    def get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(key) if self.synced else None
+        if entry is None:
+            SEARCH_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+
+        expires_at, results = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            SEARCH_CACHE_EVICTIONS.labels(reason="ttl").inc()
+            SEARCH_CACHE_ENTRIES.set(len(self._entries))
+            SEARCH_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+
+        self._entries.move_to_end(key)
+        SEARCH_CACHE_REQUESTS.labels(result="hit").inc()
+        return list(results)
+
+    def put(self, key: Tuple, results: List[Dict[str, Any]]):
+        if self.max_entries <= 0 or not self.synced:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, list(results))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            SEARCH_CACHE_EVICTIONS.labels(reason="lru").inc()
+        SEARCH_CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self):
+        self._entries.clear()
+        SEARCH_CACHE_ENTRIES.set(0)
+
+
+# Process-wide cache shared by every AlbertAIService instance
+search_cache = SearchCache(
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS
+)
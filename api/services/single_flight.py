@@ -0,0 +1,72 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from services.monitoring import ALBERT_SINGLE_FLIGHT_CALLS
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one upstream request.
+
+    The first caller for a key (the leader) starts the call in its own task;
+    callers arriving while it is in flight (followers) await the same task and
+    get the same result or exception. Each caller awaits through a shield, so
+    one caller being cancelled does not cancel the call for the others; the
+    shared task is only cancelled when the last waiting caller goes away.
+
+    Only use this for idempotent calls whose result may be shared as-is.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() for this key, or join the identical call already in flight.
+
+        Args:
+            key: Identifies the call; must cover every input of fn
+            fn: Zero-argument coroutine function performing the call
+
+        Returns:
+            The result of the shared call
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn(), name=f"single-flight:{self.endpoint}"))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            ALBERT_SINGLE_FLIGHT_CALLS.labels(endpoint=self.endpoint, role="leader").inc()
+        else:
+            ALBERT_SINGLE_FLIGHT_CALLS.labels(endpoint=self.endpoint, role="follower").inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Nobody else is waiting: stop the call, and let a new caller start afresh
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call):
+        # A cancelled-then-restarted key may already map to a newer call
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Retrieve the exception so an unawaited failure is not reported as lost
+        if call.task.done() and not call.task.cancelled():
+            call.task.exception()
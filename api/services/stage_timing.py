@@ -0,0 +1,83 @@
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.monitoring import PIPELINE_STAGE_DURATION
+
+_METRIC_NAME_RE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class StageTimings:
+    """Stage durations of one request.
+
+    The middleware puts one instance in a context variable; tasks spawned while
+    handling the request (e.g. TaskGraph stages) inherit the variable and
+    append to the same instance, so concurrent stages are all reported.
+    """
+
+    def __init__(self):
+        self.pipeline = "other"
+        self.stages: List[Tuple[str, float]] = []
+
+    def add(self, name: str, duration: float):
+        self.stages.append((name, duration))
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """Server-Timing header value; repeated stages are summed, in first-seen order"""
+        durations: Dict[str, float] = {}
+        for name, duration in self.stages:
+            durations[name] = durations.get(name, 0.0) + duration
+        entries = [f"{_METRIC_NAME_RE.sub('_', name)};dur={duration * 1000:.1f}" for name, duration in durations.items()]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_timings: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+def start_request() -> StageTimings:
+    """Start collecting stage timings for the current request"""
+    timings = StageTimings()
+    _timings.set(timings)
+    return timings
+
+
+def set_pipeline(name: str):
+    """Name the pipeline the current request's stages belong to (histogram label)"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.pipeline = name
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as a stage of the current request's pipeline"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start_time
+        timings = _timings.get()
+        pipeline = timings.pipeline if timings is not None else "other"
+        PIPELINE_STAGE_DURATION.labels(pipeline=pipeline, stage=name).observe(duration)
+        if timings is not None:
+            timings.add(name, duration)
+
+
+def timed_stage(name: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Wrap a TaskGraph stage function so it is timed under its stage name"""
+    async def run(**kwargs):
+        with stage(name):
+            return await fn(**kwargs)
+    return run
+
+
+def pipeline(name: str) -> Callable[[], Awaitable[None]]:
+    """Route dependency naming the pipeline; listed in the route decorator it runs
+    before the other dependencies, so auth is labelled too"""
+    async def set_current_pipeline():
+        set_pipeline(name)
+    return set_current_pipeline
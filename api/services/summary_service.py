@@ -0,0 +1,81 @@
+import logging
+import time
+from datetime import datetime
+from typing import Set
+from sqlalchemy import select
+from config import settings
+from db.database import AsyncSessionLocal
+from models.chat import Chat, EmitterType
+from services.chat_service import ChatService
+from services.external_api import get_albert_service
+from services.monitoring import CHAT_SUMMARY_LAG, CHAT_SUMMARY_DURATION, CHAT_SUMMARY_TOKENS, CHAT_SUMMARY_REFRESHES
+from utils.background import spawn
+
+logger = logging.getLogger(__name__)
+
+
+def summary_context(summary: str) -> str:
+    """System prompt section carrying the summary of older turns"""
+    return f"\n\nRésumé des échanges précédents de cette conversation : {summary}"
+
+
+class ConversationSummaryService:
+    """Keep a rolling summary of the turns that fell out of the live history window.
+
+    After each turn a background task counts the messages that are older than
+    the window and not yet summarized; once there are CHAT_SUMMARY_REFRESH_EVERY
+    of them they are folded into the existing summary in one LLM call. The
+    summary is only ever extended incrementally, and never on the request path.
+    """
+
+    _in_progress: Set[int] = set()
+
+    @classmethod
+    def schedule_refresh(cls, chat_id: int):
+        if chat_id in cls._in_progress:
+            return
+        cls._in_progress.add(chat_id)
+        spawn(cls._refresh(chat_id), name=f"chat-summary:{chat_id}")
+
+    @classmethod
+    async def _refresh(cls, chat_id: int):
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(select(Chat).where(Chat.id == chat_id))
+                chat = result.scalar_one_or_none()
+                if chat is None:
+                    return
+
+                chat_service = ChatService(session)
+                unsummarized = await chat_service.count_messages(chat_id, after_id=chat.summary_message_id)
+                lag = max(unsummarized - settings.CHAT_HISTORY_MAX_MESSAGES, 0)
+                CHAT_SUMMARY_LAG.observe(lag)
+                if lag < settings.CHAT_SUMMARY_REFRESH_EVERY:
+                    return
+
+                turns = await chat_service.get_messages_after(chat_id, chat.summary_message_id, limit=lag)
+                start_time = time.perf_counter()
+                response = await get_albert_service().summarize_conversation(
+                    chat.summary,
+                    [
+                        {"role": "assistant" if turn.emitter == EmitterType.ASSISTANT else "user", "content": turn.content}
+                        for turn in turns
+                    ],
+                    assistant_id=chat.assistant_id
+                )
+                CHAT_SUMMARY_DURATION.observe(time.perf_counter() - start_time)
+                usage = response.get("usage") or {}
+                CHAT_SUMMARY_TOKENS.labels(kind="prompt").inc(usage.get("prompt_tokens", 0))
+                CHAT_SUMMARY_TOKENS.labels(kind="completion").inc(usage.get("completion_tokens", 0))
+
+                chat.summary = response["choices"][0]["message"]["content"].strip()
+                chat.summary_message_id = turns[-1].id
+                chat.summary_updated_at = datetime.utcnow()
+                await session.commit()
+                CHAT_SUMMARY_REFRESHES.labels(status="success").inc()
+                logger.info(f"Folded {len(turns)} messages into the summary of chat {chat_id}")
+        except Exception as e:
+            CHAT_SUMMARY_REFRESHES.labels(status="error").inc()
+            logger.error(f"Error refreshing summary of chat {chat_id}: {e}")
+        finally:
+            cls._in_progress.discard(chat_id)
@@ -0,0 +1,51 @@
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+from services.monitoring import (
+    ALBERT_REQUEST_DURATION, ALBERT_REQUESTS, ALBERT_TOKENS, ALBERT_PAYLOAD_SIZE
+)
+
+# Assistants given their own label value; later ones are reported as "other"
+_labelled_assistants: Set[str] = set()
+
+
+def assistant_label(assistant_id: Optional[int]) -> str:
+    """Bounded-cardinality label for an assistant id.
+
+    The first ALBERT_METRICS_MAX_ASSISTANTS assistants seen by the process get
+    their own value; calls not made for an assistant are labelled "none".
+    """
+    if assistant_id is None:
+        return "none"
+    label = str(assistant_id)
+    if label in _labelled_assistants:
+        return label
+    if len(_labelled_assistants) < settings.ALBERT_METRICS_MAX_ASSISTANTS:
+        _labelled_assistants.add(label)
+        return label
+    return "other"
+
+
+def observe_request(endpoint: str, model: Optional[str], assistant_id: Optional[int], status: str, duration: float):
+    """Record one attempt of an Albert AI call ("error" status when no response came back)"""
+    labels = {"endpoint": endpoint, "model": model or "none", "assistant": assistant_label(assistant_id)}
+    ALBERT_REQUEST_DURATION.labels(**labels).observe(duration)
+    ALBERT_REQUESTS.labels(status=status, **labels).inc()
+
+
+def record_usage(usage: Optional[Dict[str, Any]], model: Optional[str], assistant_id: Optional[int]):
+    """Count tokens from the usage block of a completion response"""
+    if not usage:
+        return
+    labels = {"model": model or "none", "assistant": assistant_label(assistant_id)}
+    ALBERT_TOKENS.labels(kind="prompt", **labels).inc(usage.get("prompt_tokens") or 0)
+    ALBERT_TOKENS.labels(kind="completion", **labels).inc(usage.get("completion_tokens") or 0)
+
+
+def observe_size(kind: str, size: int, assistant_id: Optional[int]):
+    """Record a payload size in bytes (prompt, chunks or response)"""
+    ALBERT_PAYLOAD_SIZE.labels(kind=kind, assistant=assistant_label(assistant_id)).observe(size)
+
+
+def messages_size(messages: List[Dict[str, str]]) -> int:
+    return sum(len(message.get("content", "").encode("utf-8")) for message in messages)
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+from typing import Dict
+from sqlalchemy import select
+from db.database import AsyncSessionLocal
+from db.models import HelpAssistant
+from models.help_assistant import ToneType
+from services.external_api import get_albert_service
+from services.quota import quota_tracker
+from utils.background import spawn
+
+logger = logging.getLogger(__name__)
+
+
+def _tone_of(help_assistant) -> str:
+    tone = getattr(help_assistant, "tone", None) or ToneType.PROFESSIONAL
+    return getattr(tone, "value", tone)
+
+
+def build_raw_welcome(help_assistant) -> str:
+    """Welcome message template, before tone adjustment"""
+    return (
+        f"Bonjour ! Je suis {help_assistant.operator_name} de {help_assistant.name}. "
+        f"Ma mission est {help_assistant.mission}. "
+        "Comment puis-je vous aider aujourd'hui ?"
+    )
+
+
+def welcome_fingerprint(help_assistant) -> str:
+    """Hash of the only fields the welcome message depends on"""
+    source = "\x1f".join([
+        help_assistant.operator_name or "",
+        help_assistant.name or "",
+        help_assistant.mission or "",
+        _tone_of(help_assistant)
+    ])
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class WelcomeMessageService:
+    """Precompute tone-adjusted welcome messages when an assistant is written.
+
+    The rephrasing LLM call runs in the background after create/update, so
+    opening a chat never waits on it.
+    """
+
+    # assistant id -> fingerprint currently being generated
+    _in_progress: Dict[int, str] = {}
+
+    @classmethod
+    def schedule(cls, help_assistant) -> bool:
+        """Regenerate the welcome message in the background if its inputs changed"""
+        fingerprint = welcome_fingerprint(help_assistant)
+        if help_assistant.welcome_message and help_assistant.welcome_fingerprint == fingerprint:
+            return False
+        if cls._in_progress.get(help_assistant.id) == fingerprint:
+            return False
+
+        cls._in_progress[help_assistant.id] = fingerprint
+        spawn(
+            cls._refresh(
+                help_assistant.id,
+                help_assistant.user_id,
+                fingerprint,
+                build_raw_welcome(help_assistant),
+                _tone_of(help_assistant)
+            ),
+            name=f"welcome:{help_assistant.id}"
+        )
+        return True
+
+    @classmethod
+    async def _refresh(cls, help_assistant_id: int, user_id: int, fingerprint: str, raw_welcome: str, tone: str):
+        try:
+            # Over quota: keep serving the raw template; the next get_welcome retries
+            quota_tracker.check(user_id, help_assistant_id)
+            quota_tracker.bind_user(user_id)
+            welcome_message = await get_albert_service().rephrase_with_tone(raw_welcome, tone, assistant_id=help_assistant_id)
+
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(HelpAssistant).where(HelpAssistant.id == help_assistant_id)
+                )
+                help_assistant = result.scalar_one_or_none()
+                # Skip if the assistant was deleted or edited again meanwhile;
+                # the newer edit scheduled its own refresh
+                if help_assistant is None or welcome_fingerprint(help_assistant) != fingerprint:
+                    return
+                help_assistant.welcome_message = welcome_message
+                help_assistant.welcome_fingerprint = fingerprint
+                await session.commit()
+            logger.info(f"Precomputed welcome message for help assistant {help_assistant_id}")
+        except Exception as e:
+            logger.error(f"Error precomputing welcome message for help assistant {help_assistant_id}: {e}")
+        finally:
+            if cls._in_progress.get(help_assistant_id) == fingerprint:
+                del cls._in_progress[help_assistant_id]
+
+    @classmethod
+    def get_welcome(cls, help_assistant) -> str:
+        """Stored welcome message if it is current, otherwise the raw template.
+
+        Falling back also (re)schedules the precompute, e.g. for assistants
+        created before welcome messages were stored.
+        """
+        if help_assistant.welcome_message and help_assistant.welcome_fingerprint == welcome_fingerprint(help_assistant):
+            return help_assistant.welcome_message
+        cls.schedule(help_assistant)
+        return build_raw_welcome(help_assistant)
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+
+from sqlalchemy.sql.dml import Insert
+
+from models.file_blob import FileBlob
+from services.blob_store import BlobStore
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class FakeSession:
+    """Just enough of an AsyncSession for the blob store's statements, over a dict of file_blobs rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    @staticmethod
+    def _key(statement):
+        params = statement.compile().params
+        value = lambda prefix: next(v for k, v in params.items() if k.startswith(prefix))
+        return value("sha256"), value("extension")
+
+    async def execute(self, statement, params=None):
+        if "pg_advisory_xact_lock" in str(statement):
+            self.statements.append("lock")
+            return FakeResult(None)
+        key = self._key(statement)
+        if isinstance(statement, Insert):
+            self.statements.append("upsert")
+            blob = self.rows.get(key)
+            if blob is None:
+                self.rows[key] = FileBlob(sha256=key[0], extension=key[1], size=0, ref_count=1)
+            else:
+                blob.ref_count += 1
+            return FakeResult(None)
+        self.statements.append("select")
+        return FakeResult(self.rows.get(key))
+
+    async def delete(self, blob):
+        del self.rows[(blob.sha256, blob.extension)]
+
+    async def commit(self):
+        self.statements.append("commit")
+
+    async def rollback(self):
+        self.statements.append("rollback")
+
+
+def stage(store: BlobStore, content: bytes):
+    temp_path = store.temp_path()
+    temp_path.write_bytes(content)
+    return temp_path, hashlib.sha256(content).hexdigest()
+
+
+def test_blob_is_removed_only_when_collected_without_references(tmp_path):
+    store = BlobStore(tmp_path)
+    rows = {}
+
+    async def scenario():
+        await store.prepare()
+        first, sha256 = stage(store, b"guide des demarches")
+        second, _ = stage(store, b"guide des demarches")
+        session = FakeSession(rows)
+
+        blob_path, created = await store.store(session, first, sha256, ".txt", 19)
+        assert created
+        _, created = await store.store(session, second, sha256, ".txt", 19)
+        assert not created and not second.exists()
+        assert rows[(sha256, ".txt")].ref_count == 2
+        # The content lock is taken before every upsert
+        assert session.statements == ["lock", "upsert", "lock", "upsert"]
+
+        assert not await store.release(session, sha256, ".txt")
+        assert await store.release(session, sha256, ".txt")
+        # Released, but the file stays until the transaction is over
+        assert blob_path.exists()
+
+        await store.collect(session, sha256, ".txt")
+        assert not blob_path.exists()
+
+    asyncio.run(scenario())
+
+
+def test_collect_keeps_a_blob_adopted_by_another_upload(tmp_path):
+    store = BlobStore(tmp_path)
+    rows = {}
+
+    async def scenario():
+        await store.prepare()
+        failed, sha256 = stage(store, b"formulaire")
+        adopted, _ = stage(store, b"formulaire")
+
+        # The first upload creates the blob, then its transaction rolls back
+        blob_path, created = await store.store(FakeSession({}), failed, sha256, ".pdf", 10)
+        assert created
+        # Meanwhile another upload committed a reference to it
+        _, created = await store.store(FakeSession(rows), adopted, sha256, ".pdf", 10)
+        assert not created
+
+        session = FakeSession(rows)
+        await store.collect(session, sha256, ".pdf")
+        assert blob_path.exists()
+        assert session.statements == ["lock", "select", "commit"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+import random
+
+from services.concurrency_limiter import AdaptiveLimiter
+
+
+def make_limiter(latency_backoff: bool) -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        "chat", initial_limit=10, min_limit=2, max_limit=80, queue_size=200, max_wait=10.0,
+        latency_backoff=latency_backoff
+    )
+
+
+def test_variable_length_completions_do_not_shrink_chat_limit():
+    limiter = make_limiter(latency_backoff=False)
+    limiter.in_flight = 10
+    rng = random.Random(0)
+    for _ in range(1000):
+        # Short and long answers: latency spans two orders of magnitude
+        limiter.on_sample(rng.uniform(0.2, 20.0), overloaded=False)
+    assert limiter.limit >= 10
+
+
+def test_overload_still_shrinks_chat_limit():
+    limiter = make_limiter(latency_backoff=False)
+    for _ in range(3):
+        limiter.on_sample(1.0, overloaded=True)
+    assert limiter.limit < 10
+
+
+def test_latency_backoff_applies_to_other_classes():
+    limiter = make_limiter(latency_backoff=True)
+    limiter.on_sample(0.1, overloaded=False)
+    limiter.on_sample(1.0, overloaded=False)
+    assert limiter.limit < 10
@@ -0,0 +1,60 @@
+from services.context_selection import adaptive_k, select_context
+from services.rank_fusion import reciprocal_rank_fusion
+
+TOPICS = [
+    "renouvellement du passeport en mairie avec rendez-vous",
+    "demande de carte grise en ligne sur le site officiel",
+    "inscription sur les listes electorales avant le scrutin",
+    "declaration de revenus et avis d'imposition annuel",
+    "allocation logement versee par la caisse familiale",
+    "permis de conduire perdu et declaration de perte",
+    "acte de naissance demande aupres de la commune",
+    "changement d'adresse signale aux administrations",
+]
+
+
+def chunk(topic: int, score: float):
+    return {"content": f"{TOPICS[topic]} {topic}", "metadata": {"document_name": f"doc{topic}.pdf"}, "score": score}
+
+
+def test_hybrid_scores_keep_more_than_min_k():
+    # Only the top chunk is found by both sources, so its fused score is about
+    # twice that of every other chunk
+    semantic = [chunk(0, 0.82), chunk(1, 0.80), chunk(2, 0.79), chunk(3, 0.77)]
+    lexical = [chunk(0, 12.0), chunk(4, 11.5), chunk(5, 10.8), chunk(6, 10.2)]
+    fused = reciprocal_rank_fusion({"semantic": semantic, "lexical": lexical}, k=8)
+    assert fused[0]["score"] > 1.9 * fused[1]["score"]
+
+    # Each source keeps what it would keep on its own: semantic 0-2, lexical 0 and 4
+    selected = select_context(fused, min_k=2, max_k=8)
+    assert sorted(c["metadata"]["document_name"] for c in selected) == ["doc0.pdf", "doc1.pdf", "doc2.pdf", "doc4.pdf"]
+
+
+def test_hybrid_weak_tail_is_still_cut():
+    semantic = [chunk(0, 0.82), chunk(1, 0.80), chunk(2, 0.20)]
+    lexical = [chunk(3, 12.0), chunk(4, 11.5), chunk(5, 1.0)]
+    fused = reciprocal_rank_fusion({"semantic": semantic, "lexical": lexical}, k=6)
+
+    selected = select_context(fused, min_k=2, max_k=6)
+    assert sorted(c["metadata"]["document_name"] for c in selected) == ["doc0.pdf", "doc1.pdf", "doc3.pdf", "doc4.pdf"]
+
+
+def test_relative_cutoff_skipped_for_negative_scores():
+    # With a negative tail, "half of the best score" does not measure closeness
+    assert adaptive_k([0.2, 0.09, 0.05, -0.1], min_k=1, max_k=4) == 3
+
+
+def test_fusion_matches_sources_by_document():
+    # The local index and Albert AI cut the same file into different passages
+    semantic = [chunk(1, 0.81), chunk(0, 0.80)]
+    lexical = [
+        {"content": "passage local du passeport", "metadata": {"document_name": "doc0.pdf"}, "score": 9.0},
+        chunk(2, 8.0),
+    ]
+    fused = reciprocal_rank_fusion({"semantic": semantic, "lexical": lexical}, k=4)
+
+    # doc0 is found by both sources, and both of its passages are kept
+    assert [c["metadata"]["document_name"] for c in fused[:2]] == ["doc0.pdf", "doc0.pdf"]
+    assert fused[0]["content"] == "passage local du passeport"
+    assert fused[0]["score"] == fused[1]["score"] > fused[2]["score"]
+    assert fused[1]["ranks"] == {"semantic": 2}
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.sql.dml import Delete, Update
+
+from config import settings
+from models.ingestion_job import IngestionJob, JobStatus
+from services import ingestion_queue as queue_module
+from services.ingestion_queue import IngestionQueue, retry_delay
+
+
+class FakeResult:
+    def __init__(self, jobs):
+        self.jobs = jobs
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.jobs
+
+    def scalar_one_or_none(self):
+        return self.jobs[0] if self.jobs else None
+
+
+class FakeSession:
+    """Records statements; selects return the given jobs"""
+
+    def __init__(self, jobs=()):
+        self.jobs = list(jobs)
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.jobs)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def of(self, kind, table):
+        return [s for s in self.statements if isinstance(s, kind) and s.table.name == table]
+
+
+def values(statement):
+    return {column.key: value.value for column, value in statement._values.items()}
+
+
+def running_job(attempts: int) -> IngestionJob:
+    return IngestionJob(
+        id=3, file_id=11, help_assistant_id=2, status=JobStatus.RUNNING.value, attempts=attempts,
+        locked_at=datetime.utcnow() - timedelta(hours=1), created_at=datetime.utcnow() - timedelta(hours=1)
+    )
+
+
+def test_retry_delay_backs_off_with_a_ceiling(monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_RETRY_BASE_SECONDS", 5.0)
+    monkeypatch.setattr(settings, "INGESTION_RETRY_MAX_SECONDS", 60.0)
+    assert 2.5 <= retry_delay(1) <= 5.0
+    assert 10.0 <= retry_delay(3) <= 20.0
+    assert 30.0 <= retry_delay(10) <= 60.0
+    # Retry-After is a floor
+    assert retry_delay(1, retry_after=30.0) == 30.0
+
+
+@pytest.mark.parametrize("attempts, error, job_status, file_status", [
+    (1, ValueError("Albert AI unavailable"), "queued", "pending"),
+    (5, ValueError("Albert AI unavailable"), "failed", "failed"),
+    (1, FileNotFoundError("uploads/blobs/ab/abcd.pdf"), "failed", "failed"),
+])
+def test_failed_attempt_is_retried_until_the_last(monkeypatch, attempts, error, job_status, file_status):
+    monkeypatch.setattr(settings, "INGESTION_MAX_ATTEMPTS", 5)
+    session = FakeSession()
+    asyncio.run(IngestionQueue()._fail(session, running_job(attempts), error))
+
+    [job_update] = session.of(Update, "ingestion_jobs")
+    [file_update] = session.of(Update, "assistant_files")
+    assert values(job_update)["status"] == job_status
+    assert values(file_update)["status"] == file_status
+    assert session.commits == 1
+
+
+def test_stale_jobs_are_only_taken_over_while_attempts_remain(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(queue_module, "AsyncSessionLocal", lambda: session)
+    assert asyncio.run(IngestionQueue().claim()) is None
+    claim_sql = str(session.statements[0])
+    assert "ingestion_jobs.attempts <" in claim_sql
+
+
+def test_sweep_fails_abandoned_jobs_and_prunes_finished_ones(monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_MAX_ATTEMPTS", 5)
+    session = FakeSession([running_job(attempts=5)])
+    asyncio.run(IngestionQueue().sweep(session))
+
+    [job_update] = session.of(Update, "ingestion_jobs")
+    [file_update] = session.of(Update, "assistant_files")
+    [prune] = session.of(Delete, "ingestion_jobs")
+    assert values(job_update)["status"] == JobStatus.FAILED.value
+    assert values(file_update)["status"] == "failed"
+    assert "finished_at <" in str(prune)
+    assert session.commits == 1
@@ -0,0 +1,46 @@
+import asyncio
+
+from services.lexical_index import LexicalIndexRegistry
+
+
+def write_file(tmp_path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_mutations_leave_searched_index_unchanged(tmp_path):
+    registry = LexicalIndexRegistry(tmp_path)
+    passport = write_file(tmp_path, "passeport.txt", "renouvellement du passeport en mairie")
+    license = write_file(tmp_path, "permis.txt", "permis de conduire perdu et passeport")
+
+    async def scenario():
+        await registry.add_file(1, 10, "passeport.txt", passport)
+        before = await registry.get(1)
+        await registry.add_file(1, 11, "permis.txt", license)
+        after = await registry.get(1)
+        return before, after, await registry.search(1, "passeport", k=5)
+
+    before, after, results = asyncio.run(scenario())
+
+    # An index already handed out is never changed by later mutations
+    assert before is not after
+    assert list(before.files) == [10]
+    assert sorted(after.files) == [10, 11]
+    assert {result["metadata"]["document_name"] for result in results} == {"passeport.txt", "permis.txt"}
+
+
+def test_index_is_reloaded_after_another_process_writes_it(tmp_path):
+    reader = LexicalIndexRegistry(tmp_path)
+    writer = LexicalIndexRegistry(tmp_path)
+    passport = write_file(tmp_path, "passeport.txt", "renouvellement du passeport en mairie")
+
+    async def scenario():
+        assert not await reader.search(1, "passeport")
+        await writer.add_file(1, 10, "passeport.txt", passport)
+        await writer.remove_file(1, 10)
+        await writer.add_file(1, 12, "passeport.txt", passport)
+        return await reader.search(1, "passeport")
+
+    results = asyncio.run(scenario())
+    assert [result["metadata"]["file_id"] for result in results] == [12]
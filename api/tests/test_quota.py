@@ -0,0 +1,72 @@
+import pytest
+
+from config import settings
+from services.quota import QuotaTracker, SlidingWindow
+from utils.exceptions import QuotaExceededException
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "QUOTA_USER_REQUESTS_PER_MINUTE", 5)
+    monkeypatch.setattr(settings, "QUOTA_USER_TOKENS_PER_DAY", 1000)
+    monkeypatch.setattr(settings, "QUOTA_ASSISTANT_REQUESTS_PER_MINUTE", 8)
+    monkeypatch.setattr(settings, "QUOTA_ASSISTANT_TOKENS_PER_DAY", 0)
+
+
+def test_sliding_window_forgets_old_buckets():
+    window = SlidingWindow(60, 1)
+    window.add(3, now=100.0)
+    window.add(2, now=130.0)
+    assert window.total(now=150.0) == 5
+    # The first bucket leaves the window at 160, which brings the total under 4
+    assert window.retry_after(now=150.0, limit=4) == pytest.approx(10.0)
+    assert window.total(now=165.0) == 2
+
+
+def test_batch_is_admitted_all_or_none(limits):
+    tracker = QuotaTracker()
+    tracker.admit(1, 7, requests=3)
+    with pytest.raises(QuotaExceededException) as rejected:
+        tracker.admit(1, 7, requests=3)
+    assert rejected.value.status_code == 429
+    assert int(rejected.value.headers["Retry-After"]) >= 1
+
+    # Nothing was counted for the rejected batch
+    assert tracker.usage("user", 1)["requests_last_minute"] == 3
+    tracker.admit(1, 7, requests=2)
+    assert tracker.usage("user", 1)["requests_last_minute"] == 5
+
+
+def test_items_of_an_admitted_batch_are_not_counted_again(limits):
+    tracker = QuotaTracker()
+    tracker.admit(1, 7, requests=5)
+    tracker.check(1, 7, requests=0)
+    with pytest.raises(QuotaExceededException):
+        tracker.check(1, 7)
+
+
+def test_assistant_quota_is_shared_by_its_users(limits):
+    tracker = QuotaTracker()
+    tracker.admit(1, 7, requests=4)
+    tracker.admit(2, 7, requests=4)
+    with pytest.raises(QuotaExceededException) as rejected:
+        tracker.admit(3, 7)
+    assert "Assistant" in rejected.value.detail
+    # Another assistant is not affected
+    tracker.admit(3, 8)
+
+
+def test_tokens_are_charged_to_the_bound_user(limits):
+    tracker = QuotaTracker()
+    tracker.bind_user(1)
+    tracker.record_usage({"prompt_tokens": 600, "completion_tokens": 400}, assistant_id=7)
+    assert tracker.usage("user", 1)["tokens_last_day"] == 1000
+    assert tracker.usage("assistant", 7)["tokens_last_day"] == 1000
+    with pytest.raises(QuotaExceededException):
+        tracker.check(1, None)
+    # The assistant has no token limit
+    tracker.check(None, 7)
+
+    # Requests and tokens wait for the next flush, per subject and hour
+    pending = {key[:2]: values for key, values in tracker._pending.items()}
+    assert pending[("user", 1)] == [0, 600, 400]
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from services.resilience import CircuitBreaker, parse_retry_after
+from utils.exceptions import UpstreamUnavailableException
+
+
+def open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("/test", failure_threshold=2, reset_timeout=30.0)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def expire(breaker: CircuitBreaker):
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def test_open_breaker_rejects_until_reset_timeout():
+    breaker = open_breaker()
+    with pytest.raises(UpstreamUnavailableException):
+        breaker.before_call()
+    assert 0 < breaker.retry_in() <= 30.0
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = open_breaker()
+    expire(breaker)
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    # Concurrent calls are rejected while the probe is in flight
+    with pytest.raises(UpstreamUnavailableException):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_immediately():
+    breaker = open_breaker()
+    expire(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.retry_in() > 29.0
+
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = open_breaker()
+    expire(breaker)
+    breaker.before_call()
+    # Cancelled without a verdict
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
@@ -0,0 +1,70 @@
+import asyncio
+
+from services import search_cache as search_cache_module
+from services.search_cache import SearchCache
+
+RESULTS = [{"content": "Renouveler un passeport", "metadata": {}, "score": 0.8}]
+
+
+def test_equivalent_queries_share_a_key():
+    cache = SearchCache(max_entries=10, ttl_seconds=60)
+    cache.put(cache.make_key("c1", "Passeport  perdu ", 6, "semantic"), RESULTS)
+    assert cache.get(cache.make_key("c1", "passeport perdu", 6, "semantic")) == RESULTS
+    assert cache.get(cache.make_key("c1", "passeport perdu", 4, "semantic")) is None
+
+
+def test_bumped_collection_no_longer_serves_old_results():
+    cache = SearchCache(max_entries=10, ttl_seconds=60)
+    cache.put(cache.make_key("c1", "passeport", 6, "semantic"), RESULTS)
+    cache.put(cache.make_key("c2", "passeport", 6, "semantic"), RESULTS)
+
+    cache.bump_collection("c1")
+    assert cache.get(cache.make_key("c1", "passeport", 6, "semantic")) is None
+    # Other collections keep their entries
+    assert cache.get(cache.make_key("c2", "passeport", 6, "semantic")) == RESULTS
+
+
+def test_invalidation_from_another_process_bumps_the_version():
+    cache = SearchCache(max_entries=10, ttl_seconds=60)
+    key = cache.make_key("c1", "passeport", 6, "semantic")
+    cache.put(key, RESULTS)
+    cache._on_invalidation(None, 1234, "search_cache_invalidation", "c1")
+    assert cache.collection_version("c1") == 1
+    assert cache.get(cache.make_key("c1", "passeport", 6, "semantic")) is None
+
+
+def test_failed_publication_still_invalidates_locally(monkeypatch):
+    class DownEngine:
+        def begin(self):
+            raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(search_cache_module, "engine", DownEngine())
+    cache = SearchCache(max_entries=10, ttl_seconds=60)
+    asyncio.run(cache.invalidate_collection("c1"))
+    assert cache.collection_version("c1") == 1
+
+
+def test_unsynced_cache_is_bypassed():
+    cache = SearchCache(max_entries=10, ttl_seconds=60)
+    key = cache.make_key("c1", "passeport", 6, "semantic")
+    cache.put(key, RESULTS)
+    cache.synced = False
+    assert cache.get(key) is None
+    cache.put(cache.make_key("c1", "carte grise", 6, "semantic"), RESULTS)
+    cache.synced = True
+    assert cache.get(cache.make_key("c1", "carte grise", 6, "semantic")) is None
+
+
+def test_entries_expire_and_are_evicted_least_recently_used():
+    cache = SearchCache(max_entries=2, ttl_seconds=60)
+    keys = [cache.make_key("c1", query, 6, "semantic") for query in ("a", "b", "c")]
+    cache.put(keys[0], RESULTS)
+    cache.put(keys[1], RESULTS)
+    cache.get(keys[0])
+    cache.put(keys[2], RESULTS)
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == RESULTS
+
+    expired = SearchCache(max_entries=2, ttl_seconds=0)
+    expired.put(keys[0], RESULTS)
+    assert expired.get(keys[0]) is None
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+class Upstream:
+    """A slow call that counts how often it ran and whether it was cancelled"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def fetch(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return ["chunk"]
+
+
+def test_followers_share_the_leader_call():
+    async def scenario():
+        flight, upstream = SingleFlight("/search"), Upstream()
+        callers = [asyncio.create_task(flight.do("key", upstream.fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return upstream, await asyncio.gather(*callers)
+
+    upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert results == [["chunk"]] * 3
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        flight, upstream = SingleFlight("/search"), Upstream()
+        leader = asyncio.create_task(flight.do("key", upstream.fetch))
+        followers = [asyncio.create_task(flight.do("key", upstream.fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        followers[0].cancel()
+        await asyncio.sleep(0)
+        assert upstream.cancelled == 0
+        assert flight.in_flight() == 1
+
+        upstream.release.set()
+        assert await followers[1] == ["chunk"]
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return flight, upstream
+
+    flight, upstream = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert flight.in_flight() == 0
+
+
+def test_call_is_cancelled_with_its_last_waiter():
+    async def scenario():
+        flight, upstream = SingleFlight("/search"), Upstream()
+        callers = [asyncio.create_task(flight.do("key", upstream.fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert upstream.cancelled == 1
+        assert flight.in_flight() == 0
+
+        # A new caller starts a fresh call
+        upstream.release.set()
+        return upstream, await flight.do("key", upstream.fetch)
+
+    upstream, result = asyncio.run(scenario())
+    assert result == ["chunk"]
+    assert upstream.calls == 2
@@ -1,5 +1,14 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+import time
 from services.external_api import AlbertAIService
+from services.lexical_index import lexical_indexes
+from services.rank_fusion import reciprocal_rank_fusion
+from services.monitoring import RETRIEVAL_LEG_DURATION, RETRIEVAL_RESULT_SIZE
+from models.help_assistant import RetrievalMethod
+
+logger = logging.getLogger(__name__)
 
 class CollectionTool:
     """Tool for interacting with document collections"""
@@ -7,7 +16,14 @@ class CollectionTool:
     def __init__(self, albert_service: AlbertAIService):
         self.albert_service = albert_service
 
-    async def search_collection(self, collection_id: str, query: str, k: int = 6) -> List[str]:
+    async def search_collection(
+        self,
+        collection_id: str,
+        query: str,
+        k: int = 6,
+        method: str = "semantic",
+        help_assistant_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         Search a collection for relevant chunks based on a query.
         
@@ -15,29 +31,99 @@ class CollectionTool:
             collection_id: The ID of the collection to search
             query: The search query
             k: Number of results to return (default: 6)
+            method: "semantic" (Albert AI) or "local_lexical" (BM25 over the
+                assistant's uploaded files, requires help_assistant_id)
+            help_assistant_id: The assistant owning the collection
             
         Returns:
             List of relevant text chunks from the collection
         """
+        if method == "local_lexical":
+            if help_assistant_id is None:
+                raise ValueError("help_assistant_id is required for local lexical search")
+            return await lexical_indexes.search(help_assistant_id, query, k)
+
         return await self.albert_service.search_collection(
             collection_id=collection_id,
             query=query,
-            k=k
+            k=k,
+            method=method,
+            assistant_id=help_assistant_id
         )
 
-    async def chat_with_context(self, collection_id: str, prompt: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _timed_leg(self, leg: str, collection_id: str, query: str, k: int, help_assistant_id: Optional[int]):
+        method = "local_lexical" if leg == "local_lexical" else leg.replace("albert_", "")
+        start_time = time.perf_counter()
+        try:
+            return await self.search_collection(
+                collection_id=collection_id,
+                query=query,
+                k=k,
+                method=method,
+                help_assistant_id=help_assistant_id
+            )
+        finally:
+            RETRIEVAL_LEG_DURATION.labels(leg=leg).observe(time.perf_counter() - start_time)
+
+    async def _lexical_leg(self, help_assistant_id: Optional[int]) -> str:
+        """Prefer the local BM25 index when the assistant has one, else Albert lexical search"""
+        if help_assistant_id is None:
+            return "albert_lexical"
+        if await lexical_indexes.available(help_assistant_id):
+            return "local_lexical"
+        return "albert_lexical"
+
+    async def retrieve(
+        self,
+        collection_id: str,
+        query: str,
+        k: int = 6,
+        retrieval_method: str = RetrievalMethod.SEMANTIC,
+        help_assistant_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Search collection and use relevant chunks to answer the prompt.
-        
+        Retrieve chunks with the assistant's retrieval method.
+
         Args:
             collection_id: The ID of the collection to search
-            prompt: The user's question
-            
+            query: The search query
+            k: Number of results to return (default: 6)
+            retrieval_method: SEMANTIC, LEXICAL or HYBRID. HYBRID runs both legs
+                concurrently and fuses them with reciprocal rank fusion; fused
+                results carry per-source "scores" and "ranks".
+            help_assistant_id: The assistant owning the collection
+
         Returns:
-            Dict containing the AI response, source documents, and context chunks
+            Ranked list of chunks
         """
-        return await self.albert_service.chat_with_context(
-            collection_id=collection_id,
-            prompt=prompt,
-            context=context
-        ) 
+        if retrieval_method == RetrievalMethod.SEMANTIC:
+            legs = ["albert_semantic"]
+        elif retrieval_method == RetrievalMethod.LEXICAL:
+            legs = [await self._lexical_leg(help_assistant_id)]
+        else:
+            legs = ["albert_semantic", await self._lexical_leg(help_assistant_id)]
+
+        outcomes = await asyncio.gather(
+            *(self._timed_leg(leg, collection_id, query, k, help_assistant_id) for leg in legs),
+            return_exceptions=True
+        )
+
+        ranked_lists = {}
+        for leg, outcome in zip(legs, outcomes):
+            if isinstance(outcome, BaseException):
+                # A hybrid search degrades to its remaining leg
+                if len(legs) == 1:
+                    raise outcome
+                logger.error(f"Retrieval leg {leg} failed: {outcome}")
+                continue
+            RETRIEVAL_RESULT_SIZE.labels(leg=leg).observe(len(outcome))
+            ranked_lists[leg.split("_")[-1]] = outcome
+
+        if not ranked_lists:
+            raise outcomes[0]
+        if len(legs) == 1:
+            return ranked_lists.popitem()[1]
+
+        fused = reciprocal_rank_fusion(ranked_lists, k)
+        RETRIEVAL_RESULT_SIZE.labels(leg="fused").observe(len(fused))
+        return fused
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+from typing import Coroutine, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Strong references to fire-and-forget tasks; the event loop only keeps weak ones
+_tasks: Set[asyncio.Task] = set()
+
+
+def _on_done(task: asyncio.Task):
+    _tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error(f"Background task {task.get_name()} failed: {exc}", exc_info=exc)
+
+
+def spawn(coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+    """Run a coroutine in the background, off the request path"""
+    task = asyncio.create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def cancel_all():
+    """Cancel pending background tasks (called on application shutdown)"""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
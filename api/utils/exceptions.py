@@ -36,4 +36,27 @@ class InvalidTokenException(HTTPException):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
             headers={"WWW-Authenticate": "Bearer"}
-        ) 
\ No newline at end of file
+        ) 
+
+class UpstreamUnavailableException(HTTPException):
+    def __init__(self, retry_after: float = None):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Albert AI is temporarily unavailable, please retry later",
+            headers={"Retry-After": str(max(int(retry_after + 0.999), 1))} if retry_after is not None else None
+        )
+
+class QuotaExceededException(HTTPException):
+    def __init__(self, scope: str, limit: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"{scope.capitalize()} quota exceeded ({limit})",
+            headers={"Retry-After": str(max(int(retry_after + 0.999), 1))}
+        )
+
+class FileTooLargeException(HTTPException):
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the maximum size of {max_size // (1024 * 1024)} MB"
+        )
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+
+from utils.exceptions import FileTooLargeException
+
+# Bytes read and written at a time; bounds the memory used per file
+CHUNK_SIZE = 1024 * 1024
+
+
+async def write_stream(source, file_path: Path, max_size: Optional[int] = None) -> Tuple[int, str]:
+    """
+    Copy an async-readable source (e.g. an UploadFile) to disk in chunks.
+
+    The size and SHA-256 are computed while writing, so the file is read once.
+
+    Args:
+        source: Object with an async read(size) method
+        file_path: Destination
+        max_size: Largest size accepted in bytes; None for no limit
+
+    Returns:
+        (size in bytes, hex SHA-256)
+
+    Raises:
+        FileTooLargeException: the source is larger than max_size; the
+            partial file is removed
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(file_path, "wb") as target:
+            while True:
+                chunk = await source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise FileTooLargeException(max_size)
+                digest.update(chunk)
+                await target.write(chunk)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return size, digest.hexdigest()
+
+
+def copy_file(source: BinaryIO, file_path: Path, max_size: Optional[int] = None) -> Tuple[int, str]:
+    """Blocking counterpart of write_stream, for code already running in a worker thread"""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, "wb") as target:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise FileTooLargeException(max_size)
+                digest.update(chunk)
+                target.write(chunk)
+    except BaseException:
+        file_path.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+
+def file_sha256(file_path: str) -> str:
+    """Hex SHA-256 of a file, read in chunks (blocking)"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def multipart_file_upload(
+    file_path: str,
+    content_type: str,
+    fields: Dict[str, Any],
+    filename: Optional[str] = None
+) -> Tuple[Dict[str, str], Callable[[], Dict[str, Any]]]:
+    """
+    Streaming multipart/form-data body with a file part read from disk in chunks.
+
+    Args:
+        file_path: File sent as the "file" part
+        content_type: Content type of the file part
+        fields: Other parts, sent first as JSON ("request" for Albert AI uploads)
+        filename: Name given to the file part (default: the file's name on disk)
+
+    Returns:
+        (headers, request_factory): the Content-Type and Content-Length
+        headers, and a factory giving fresh request kwargs for each attempt
+    """
+    boundary = uuid.uuid4().hex
+    preamble = b"".join(
+        (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n'
+            "Content-Type: application/json\r\n\r\n"
+            f"{json.dumps(value)}\r\n"
+        ).encode("utf-8")
+        for name, value in fields.items()
+    )
+    filename = (filename or os.path.basename(file_path)).replace('"', "%22")
+    preamble += (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    epilogue = f"\r\n--{boundary}--\r\n".encode("utf-8")
+    file_size = (await aiofiles.os.stat(file_path)).st_size
+
+    async def body() -> AsyncIterator[bytes]:
+        yield preamble
+        async with aiofiles.open(file_path, "rb") as f:
+            while True:
+                chunk = await f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        yield epilogue
+
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(preamble) + file_size + len(epilogue)),
+    }
+    return headers, lambda: {"content": body()}
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+
+class TaskGraph:
+    """Run named async stages concurrently, each as soon as its dependencies finish.
+
+    A stage is a coroutine function receiving the results of its dependencies as
+    keyword arguments. If any stage fails, every pending stage is cancelled and
+    the first error is raised.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, tuple] = {}
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]], depends_on: Iterable[str] = ()) -> "TaskGraph":
+        if name in self._stages:
+            raise ValueError(f"Stage {name} already defined")
+        self._stages[name] = (fn, tuple(depends_on))
+        return self
+
+    def _check(self):
+        """Reject unknown dependencies and cycles before anything is scheduled"""
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage {name}")
+            visiting.add(name)
+            for dep in self._stages[name][1]:
+                if dep not in self._stages:
+                    raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self._stages:
+            visit(name)
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every stage and return their results by name"""
+        self._check()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str):
+            fn, deps = self._stages[name]
+            kwargs = {dep: await tasks[dep] for dep in deps}
+            return await fn(**kwargs)
+
+        # Tasks only start on the next loop iteration, so every dependency
+        # exists in `tasks` by the time a stage looks it up
+        for name in self._stages:
+            tasks[name] = asyncio.create_task(run_stage(name), name=f"stage:{name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
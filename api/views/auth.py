@@ -12,6 +12,7 @@ from fastapi import HTTPException
 from jose import JWTError, jwt
 from sqlalchemy import select
 from config import settings
+from services.stage_timing import stage
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
@@ -36,7 +37,8 @@ async def login(
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
     auth_service = AuthService(db)
-    return await auth_service.get_current_user(token)
+    with stage("auth"):
+        return await auth_service.get_current_user(token)
 
 @router.post("/logout")
 async def logout(
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any, Optional
-from db.database import get_db
+from typing import List, Dict, Any
+from db.database import get_db, AsyncSessionLocal
 from models import (
     HelpAssistant, 
     HelpAssistantCreate, 
@@ -10,21 +10,37 @@ from models import (
     User,
     Chat,
     EmitterType,
-    ToneType
+    ToneType,
+    RetrievalMethod
 )
 from controllers.help_assistant import HelpAssistantController
 from views.auth import get_current_user
 from models.assistant_file import AssistantFile
 from services.file_service import FileService
-from services.external_api import AlbertAIService
-from models.collection import Collection, CollectionResponse
+from services.external_api import AlbertAIService, get_albert_service
+from models.collection import CollectionResponse
 from services.collection_service import CollectionService
 from tools.collection_tool import CollectionTool
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 import os
+import json
+import logging
+import time
 from services.chat_service import ChatService
+from services.chat_pipeline import ChatTurnPipeline
+from services.welcome_service import WelcomeMessageService
+from services.summary_service import ConversationSummaryService
 from sqlalchemy import select
 from models.message import MessageCreate, MessageResponse
+from models.batch import BatchRequest
+from services.batch_service import BatchQueryService
+from config import settings
+from services.monitoring import CHAT_TIME_TO_FIRST_TOKEN
+from services.stage_timing import stage, pipeline
+from services.quota import quota_tracker
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/help-assistant", tags=["help-assistant"])
 
@@ -49,8 +65,7 @@ async def get_my_help_assistants(
     return await HelpAssistantController.get_user_help_assistants(current_user.id, db)
 
 @router.get("/models")
-async def list_models():
-    ai_service = AlbertAIService()
+async def list_models(ai_service: AlbertAIService = Depends(get_albert_service)):
     response = await ai_service.list_models()
     return response.get('data', [])  # Extract only data key when present 
 
@@ -89,21 +104,57 @@ async def delete_help_assistant(
     await HelpAssistantController.delete_help_assistant(help_assistant_id, db)
     return {"message": "Assistant deleted successfully"}
 
-@router.post("/{help_assistant_id}/files", response_model=AssistantFile)
+@router.post("/{help_assistant_id}/files", response_model=AssistantFile, dependencies=[Depends(pipeline("file_upload"))])
 async def upload_file(
     help_assistant_id: int,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    albert_service: AlbertAIService = Depends(get_albert_service)
 ):
     # Check if user owns the assistant
-    help_assistant = await HelpAssistantController.get_help_assistant(help_assistant_id, db)
+    with stage("assistant_lookup"):
+        help_assistant = await HelpAssistantController.get_help_assistant(help_assistant_id, db)
     if help_assistant.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to upload files to this assistant")
 
-    file_service = FileService(db)
+    file_service = FileService(db, albert_service)
     return await file_service.save_file(file, help_assistant_id)
 
+@router.post("/{help_assistant_id}/files/bulk", response_model=Dict[str, Any], dependencies=[Depends(pipeline("file_bulk_upload"))])
+async def upload_files(
+    help_assistant_id: int,
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    albert_service: AlbertAIService = Depends(get_albert_service)
+):
+    """Upload several files at once; zip archives are expanded.
+
+    Each file gets its own status, so files that fail do not prevent the
+    others from being stored and ingested.
+    """
+    with stage("assistant_lookup"):
+        help_assistant = await HelpAssistantController.get_help_assistant(help_assistant_id, db)
+    if help_assistant.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to upload files to this assistant")
+    if len(files) > settings.BULK_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_UPLOAD_MAX_FILES} files can be uploaded at once"
+        )
+
+    file_service = FileService(db, albert_service)
+    try:
+        return await file_service.save_files(files, help_assistant_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload files: {str(e)}"
+        )
+
 @router.get("/{help_assistant_id}/files", response_model=List[AssistantFile])
 async def get_assistant_files(
     help_assistant_id: int,
@@ -122,41 +173,56 @@ async def delete_file(
     help_assistant_id: int,
     file_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    albert_service: AlbertAIService = Depends(get_albert_service)
 ):
     help_assistant = await HelpAssistantController.get_help_assistant(help_assistant_id, db)
     if help_assistant.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this file")
 
-    file_service = FileService(db)
+    file_service = FileService(db, albert_service)
     await file_service.delete_file(file_id)
     return {"message": "File deleted successfully"}
 
+@router.get("/{help_assistant_id}/usage", response_model=Dict[str, Any])
+async def get_assistant_usage(
+    help_assistant_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Albert AI consumption of the assistant against its quotas"""
+    help_assistant = await HelpAssistantController.get_help_assistant(help_assistant_id, db)
+    if help_assistant.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this assistant's usage")
+    return quota_tracker.usage("assistant", help_assistant_id)
+
 @router.get("/{help_assistant_id}/collection", response_model=CollectionResponse)
 async def get_assistant_collection(
     help_assistant_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    albert_service: AlbertAIService = Depends(get_albert_service)
 ):
     help_assistant = await HelpAssistantController.get_help_assistant(help_assistant_id, db)
     if help_assistant.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this assistant's collection")
     
-    collection_service = CollectionService(db)
+    collection_service = CollectionService(db, albert_service)
     return await collection_service.get_by_help_assistant(help_assistant_id)
 
 @router.post("/{assistant_id}/agent/search", response_model=Dict[str, Any])
 async def agent_search(
     assistant_id: int,
     query: dict,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    albert_service: AlbertAIService = Depends(get_albert_service)
 ):
     """
     Search assistant's collection using AI agent
     """
     try:
         # Get collection for the assistant
-        collection_service = CollectionService(db)
+        collection_service = CollectionService(db, albert_service)
         collection = await collection_service.get_by_help_assistant(assistant_id)
         
         if not collection:
@@ -165,15 +231,18 @@ async def agent_search(
                 detail="No collection found for this assistant"
             )
 
+        help_assistant = await HelpAssistantController.get_help_assistant(assistant_id, db)
+
         # Initialize tools
-        albert_service = AlbertAIService()
         collection_tool = CollectionTool(albert_service)
         
-        # Search collection
-        search_results = await collection_tool.search_collection(
+        # Search collection with the assistant's retrieval method
+        search_results = await collection_tool.retrieve(
             collection_id=collection.albert_id,
             query=query["query"],
-            k=10
+            k=10,
+            retrieval_method=help_assistant.retrieval_method or RetrievalMethod.SEMANTIC,
+            help_assistant_id=assistant_id
         )
         
         return {
@@ -181,12 +250,62 @@ async def agent_search(
             "collection_id": collection.albert_id
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to search collection: {str(e)}"
         )
 
+@router.post("/{assistant_id}/batch", dependencies=[Depends(pipeline("batch"))])
+async def batch_query(
+    assistant_id: int,
+    batch: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    albert_service: AlbertAIService = Depends(get_albert_service)
+):
+    """Search the collection or answer several questions in one request.
+
+    Results are streamed as NDJSON, one line per query in completion order
+    (each line carries the query's index in the request), followed by a
+    summary line {"done": true, "count": ..., "errors": ...}.
+
+    An answer batch counts one request per distinct question against the
+    requests-per-minute quotas, all admitted before it starts (429 otherwise).
+    Items that hit the daily token quota midway fail individually with a 429
+    status in their line.
+    """
+    try:
+        batch_service = BatchQueryService(db, albert_service)
+        help_assistant, collection = await batch_service.prepare(assistant_id, current_user, batch)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process batch: {str(e)}"
+        )
+
+    async def result_stream():
+        count = errors = 0
+        try:
+            async for result in batch_service.run(help_assistant, collection, batch, current_user):
+                count += 1
+                errors += result["status"] != "ok"
+                yield json.dumps(jsonable_encoder(result)) + "\n"
+        except Exception as e:
+            logger.exception(f"Error in batch stream: {e}")
+            yield json.dumps({"error": f"Failed to process batch: {str(e)}"}) + "\n"
+        yield json.dumps({"done": True, "count": count, "errors": errors}) + "\n"
+
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{help_assistant_id}/files/{file_id}/download")
 async def get_assistant_file(
     help_assistant_id: int,
@@ -221,7 +340,7 @@ async def get_assistant_file(
         media_type="application/octet-stream"
     )
 
-@router.post("/{assistant_id}/chat/init", response_model=Dict)
+@router.post("/{assistant_id}/chat/init", response_model=Dict, dependencies=[Depends(pipeline("chat_init"))])
 async def init_chat(
     assistant_id: int,
     current_user: User = Depends(get_current_user),
@@ -234,7 +353,8 @@ async def init_chat(
         
         # Verify user exists in database
         user_query = select(User).where(User.id == current_user.id)
-        result = await db.execute(user_query)
+        with stage("user_lookup"):
+            result = await db.execute(user_query)
         user = result.scalar_one_or_none()
         
         if not user:
@@ -245,39 +365,29 @@ async def init_chat(
             )
 
         # Check if assistant exists and user has access
-        help_assistant = await HelpAssistantController.get_help_assistant(assistant_id, db)
+        with stage("assistant_lookup"):
+            help_assistant = await HelpAssistantController.get_help_assistant(assistant_id, db)
         
-        # Get tone with fallback
-        tone = getattr(help_assistant, 'tone', None) or ToneType.PROFESSIONAL
-        print(f"Assistant details - ID: {assistant_id}, User ID: {help_assistant.user_id}, Tone: {tone}")
+        print(f"Assistant details - ID: {assistant_id}, User ID: {help_assistant.user_id}, Tone: {help_assistant.tone}")
         
         if help_assistant.user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized to access this assistant")
 
         # Create new chat
         chat_service = ChatService(db)
-        chat = await chat_service.create_chat(assistant_id, current_user.id)
-
-        # Create initial welcome message
-        raw_welcome = (
-            f"Bonjour ! Je suis {help_assistant.operator_name} de {help_assistant.name}. "
-            f"Ma mission est {help_assistant.mission}. "
-            "Comment puis-je vous aider aujourd'hui ?"
-        )
-
-        # Rephrase welcome message according to assistant's tone
-        ai_service = AlbertAIService()
-        try:
-            welcome_message = await ai_service.rephrase_with_tone(raw_welcome, tone)
-        except Exception as e:
-            print(f"Error rephrasing welcome message: {str(e)}")
-            welcome_message = raw_welcome
-
-        await chat_service.add_message(
-            chat_id=chat.id,
-            content=welcome_message,
-            emitter=EmitterType.ASSISTANT
-        )
+        with stage("create_chat"):
+            chat = await chat_service.create_chat(assistant_id, current_user.id)
+
+        # Welcome message precomputed at assistant write time (raw template until ready)
+        with stage("welcome"):
+            welcome_message = WelcomeMessageService.get_welcome(help_assistant)
+
+        with stage("persist_welcome"):
+            await chat_service.add_message(
+                chat_id=chat.id,
+                content=welcome_message,
+                emitter=EmitterType.ASSISTANT
+            )
 
         return {
             "chat_id": chat.id,
@@ -304,86 +414,39 @@ async def init_chat(
             detail=f"Failed to initialize chat: {str(e)}"
         )
 
-@router.post("/{assistant_id}/chat/{chat_id}/message", response_model=Dict)
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@router.post("/{assistant_id}/chat/{chat_id}/message", response_model=Dict, dependencies=[Depends(pipeline("chat_turn"))])
 async def add_chat_message(
     assistant_id: int,
     chat_id: int,
     message: MessageCreate,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    ai_service: AlbertAIService = Depends(get_albert_service)
 ):
     """Add a message to the chat and get AI response with context"""
     try:
-        # Verify user has access to this chat
-        chat_service = ChatService(db)
-        chat = await chat_service.get_chat(chat_id)
-        
-        if not chat or chat.user_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not authorized to access this chat")
-            
-        # Get the assistant
-        help_assistant = await HelpAssistantController.get_help_assistant(assistant_id, db)
-        
-        # Save user message
-        await chat_service.add_message(
-            chat_id=chat_id,
-            content=message.content,
-            emitter=EmitterType.USER
+        # Quotas are checked by prepare() once the chat is authorized
+        turn = await ChatTurnPipeline(db, ai_service).prepare(
+            assistant_id, chat_id, current_user, message.content
         )
-        
-        # Get chat history for context
-        chat_history = await chat_service.get_chat_messages(chat_id)
-        
-        # Format chat history as a list of dictionaries
-        formatted_history = [
-            {"role": "assistant" if msg.emitter == EmitterType.ASSISTANT else "user", "content": msg.content}
-            for msg in chat_history
-        ]
-        
-        # Build system context with assistant details
-        system_context = (
-            f"Tu es {help_assistant.operator_name}, un assistant virtuel de {help_assistant.name}. "
-            f"Ta mission est {help_assistant.mission}. "
-            f"Ton ton de communication est {help_assistant.tone or 'professionnel'}. "
-            "Réponds toujours en français de manière naturelle et cohérente avec ton rôle."
-        )
-        
-        # Get collection for knowledge base context
-        collection_service = CollectionService(db)
-        collection: Optional[Collection] = await collection_service.get_by_help_assistant(assistant_id)
-        
-        # Initialize tools
-        ai_service = AlbertAIService()
-        collection_tool = CollectionTool(ai_service)
-        
-        # Get response using chat_with_context
-        if collection:
-            print(f"Using collection: {collection.albert_id}")  # Debug print
-            response = await collection_tool.chat_with_context(
-                collection_id=collection.albert_id,
-                prompt=message.content,
-                context={
-                    "system": system_context,
-                    "chat_history": formatted_history
-                }
-            )
-        else:
-            print("No collection found, using fallback")  # Debug print
-            # Fallback if no collection exists
-            response = await ai_service.chat_completion(
-                messages=[
-                    {"role": "system", "content": system_context},
-                    {"role": "user", "content": formatted_history + "\n\nUser: " + message.content}
-                ]
-            )
+        help_assistant = turn.help_assistant
+        with stage("generation"):
+            response = await ai_service.chat_completion(turn.messages, assistant_id=help_assistant.id)
         print(f"AI response: {response}")  # Debug print
 
         # Save assistant response
-        assistant_message = await chat_service.add_message(
-            chat_id=chat_id,
-            content=response['choices'][0]['message']['content'],
-            emitter=EmitterType.ASSISTANT
-        )
+        chat_service = ChatService(db)
+        with stage("persist_assistant"):
+            assistant_message = await chat_service.add_message(
+                chat_id=chat_id,
+                content=response['choices'][0]['message']['content'],
+                emitter=EmitterType.ASSISTANT
+            )
+        ConversationSummaryService.schedule_refresh(chat_id)
         
         # Convert to response model
         message_response = MessageResponse(
@@ -414,3 +477,83 @@ async def add_chat_message(
             detail=f"Failed to process chat message: {str(e)}"
         )
 
+@router.post("/{assistant_id}/chat/{chat_id}/message/stream", dependencies=[Depends(pipeline("chat_turn_stream"))])
+async def stream_chat_message(
+    assistant_id: int,
+    chat_id: int,
+    message: MessageCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    ai_service: AlbertAIService = Depends(get_albert_service)
+):
+    """Add a message to the chat and stream the AI response as Server-Sent Events.
+
+    Emits "token" events with content deltas, then a single "done" event carrying
+    the persisted assistant message (or an "error" event if generation fails).
+    """
+    received_at = time.perf_counter()
+    try:
+        turn = await ChatTurnPipeline(db, ai_service).prepare(
+            assistant_id, chat_id, current_user, message.content
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in chat message: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process chat message: {str(e)}"
+        )
+
+    help_assistant = turn.help_assistant
+    mode = "collection" if turn.collection else "fallback"
+
+    async def event_stream():
+        parts = []
+        try:
+            # Stages after this point run once the headers are sent: they
+            # reach the histograms but not the Server-Timing header
+            with stage("generation"):
+                async for delta in ai_service.stream_chat_completion(turn.messages, assistant_id=help_assistant.id):
+                    if not parts:
+                        CHAT_TIME_TO_FIRST_TOKEN.labels(mode=mode).observe(time.perf_counter() - received_at)
+                    parts.append(delta)
+                    yield _sse_event("token", {"content": delta})
+
+            # The request-scoped session is released once the response starts,
+            # so the final message is persisted with a session of its own
+            with stage("persist_assistant"):
+                async with AsyncSessionLocal() as session:
+                    assistant_message = await ChatService(session).add_message(
+                        chat_id=chat_id,
+                        content="".join(parts),
+                        emitter=EmitterType.ASSISTANT
+                    )
+            ConversationSummaryService.schedule_refresh(chat_id)
+
+            message_response = MessageResponse(
+                id=assistant_message.id,
+                chat_id=assistant_message.chat_id,
+                content=assistant_message.content,
+                emitter=assistant_message.emitter,
+                created_at=assistant_message.created_at,
+                sources=assistant_message.sources
+            )
+            yield _sse_event("done", {
+                "message": message_response,
+                "chat_id": chat_id,
+                "assistant": {
+                    "id": help_assistant.id,
+                    "name": help_assistant.name,
+                    "operator_name": help_assistant.operator_name
+                }
+            })
+        except Exception as e:
+            logger.exception(f"Error in chat message stream: {e}")
+            yield _sse_event("error", {"detail": f"Failed to process chat message: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -4,6 +4,8 @@ from db.database import get_db
 from models import User, UserCreate, UserResponse  # Import from central models
 from controllers.user import UserController
 from views.auth import get_current_user
+from services.quota import quota_tracker
+from typing import Any, Dict
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -15,6 +17,11 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
 async def get_current_user_info(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     return current_user
 
+@router.get("/me/usage", response_model=Dict[str, Any])
+async def get_current_user_usage(current_user: User = Depends(get_current_user)):
+    """Albert AI consumption of the current user against their quotas"""
+    return quota_tracker.usage("user", current_user.id)
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     user = await UserController.get_user(user_id, db)
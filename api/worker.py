@@ -0,0 +1,33 @@
+"""
+Run ingestion workers in a process of their own.
+
+    python -m worker
+
+Use it with INGESTION_WORKERS=0 on the API processes to keep file ingestion
+off the API nodes, or next to them to add capacity; workers on any node share
+the ingestion_jobs queue. Runs max(INGESTION_WORKERS, 1) worker coroutines.
+"""
+import asyncio
+import logging
+
+from config import settings
+from db.database import init_db
+from services.http_client import AlbertHTTPClient
+from services.ingestion_queue import ingestion_queue
+
+
+async def main():
+    await init_db()
+    await AlbertHTTPClient.start()
+    try:
+        await ingestion_queue.run(max(settings.INGESTION_WORKERS, 1))
+    finally:
+        await AlbertHTTPClient.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main())